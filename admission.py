@@ -0,0 +1,232 @@
+"""Admission control and load shedding for Gemini-bound endpoints.
+
+Two gates run before a request does any work:
+
+1. A per-user token bucket, keyed on the JWT email, bounds how fast one user
+   can start requests, so one client cannot take every slot. An empty bucket
+   gives 429 with Retry-After set to the time until the next token.
+2. A per-process bound on in-flight requests. Service time is tracked as an
+   EWMA, and the expected wait for a slot is estimated from it and the queue
+   length. A request that could not start within its start budget (latency
+   budget minus expected service time) is rejected at once with 503 and a
+   computed Retry-After. Otherwise it waits at most that long for a slot.
+   A request shed here gets its rate-limit token back: it did no work.
+
+Shedding early keeps admitted requests inside the client timeout, so goodput
+holds up under overload instead of every queued request timing out.
+Routes admit with run() and turn Rejected into a response with
+rejected_response(). Where duplicates are coalesced (singleflight.py), run()
+goes inside the flight, so only the leader takes a slot and a token.
+Counters and queue-time figures are exposed by stats() (/api/metrics/admission).
+"""
+import math
+import threading
+import time
+
+from flask import jsonify
+
+import config
+
+# Upper bounds (seconds) of the queue-time histogram buckets
+QUEUE_TIME_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, math.inf)
+
+
+class Rejected(Exception):
+    def __init__(self, status, retry_after, reason):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+class TokenBuckets:
+    """Per-key token buckets refilled at `rate_per_minute`, holding up to `burst` tokens."""
+
+    def __init__(self, rate_per_minute, burst, max_keys=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = float(burst)
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, now=None):
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return wait
+
+    def refund(self, key):
+        """Give back the token a rejected request took."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            if key in self._buckets:
+                tokens, last = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + 1), last)
+
+    def _prune(self, now):
+        # Buckets that would have refilled completely carry no state worth keeping
+        full = [key for key, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for key in full:
+            del self._buckets[key]
+
+
+class AdmissionController:
+    def __init__(self, name, max_inflight=4, latency_budget=60.0, expected_service=15.0,
+                 rate_per_minute=6.0, burst=3, ewma_alpha=0.2):
+        self.name = name
+        self.max_inflight = max_inflight
+        self.latency_budget = latency_budget
+        self.buckets = TokenBuckets(rate_per_minute, burst)
+        self.ewma_alpha = ewma_alpha
+        self._service_time = expected_service
+        self._condition = threading.Condition()
+        self._inflight = 0
+        self._queued = 0
+        self._counters = {'admitted': 0, 'completed': 0, 'rejected_rate_limited': 0,
+                          'rejected_overloaded': 0, 'rejected_queue_timeout': 0}
+        self._queue_times = [0] * len(QUEUE_TIME_BUCKETS)
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+
+    @classmethod
+    def from_env(cls, name, prefix, **defaults):
+        """Controller configured from <prefix>_MAX_INFLIGHT, _LATENCY_BUDGET, _EXPECTED_SECONDS,
+        _USER_RATE (per minute) and _USER_BURST."""
+        return cls(
+            name,
+            max_inflight=config.env_int(f"{prefix}_MAX_INFLIGHT", defaults.get('max_inflight', 4)),
+            latency_budget=config.env_float(f"{prefix}_LATENCY_BUDGET", defaults.get('latency_budget', 60.0)),
+            expected_service=config.env_float(f"{prefix}_EXPECTED_SECONDS", defaults.get('expected_service', 15.0)),
+            rate_per_minute=config.env_float(f"{prefix}_USER_RATE", defaults.get('rate_per_minute', 6.0)),
+            burst=config.env_int(f"{prefix}_USER_BURST", defaults.get('burst', 3)),
+        )
+
+    def _count(self, name):
+        with self._condition:
+            self._counters[name] += 1
+
+    def _estimated_wait(self):
+        # Requests ahead of this one, drained max_inflight at a time
+        if self._inflight < self.max_inflight:
+            return 0.0
+        waves = (self._queued + self._inflight - self.max_inflight + 1) / self.max_inflight
+        return math.ceil(waves) * self._service_time
+
+    def _record_queue_time(self, seconds):
+        self._queue_time_total += seconds
+        self._queue_time_max = max(self._queue_time_max, seconds)
+        for i, bound in enumerate(QUEUE_TIME_BUCKETS):
+            if seconds <= bound:
+                self._queue_times[i] += 1
+                break
+
+    def acquire(self, user):
+        """Admit one request for `user` or raise Rejected. Pair with release()."""
+        wait = self.buckets.take(user)
+        if wait:
+            self._count('rejected_rate_limited')
+            raise Rejected(429, wait, "Too many generation requests; please retry later")
+
+        try:
+            self._wait_for_slot()
+        except Rejected:
+            self.buckets.refund(user)  # shed for capacity: the user's budget was not used
+            raise
+        return time.monotonic()
+
+    def _wait_for_slot(self):
+        start = time.monotonic()
+        with self._condition:
+            start_budget = self.latency_budget - self._service_time
+            estimated = self._estimated_wait()
+            if estimated > start_budget:
+                self._counters['rejected_overloaded'] += 1
+                raise Rejected(503, estimated - max(start_budget, 0),
+                               "Server is at capacity; please retry later")
+
+            deadline = start + max(start_budget, 0)
+            self._queued += 1
+            try:
+                while self._inflight >= self.max_inflight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['rejected_queue_timeout'] += 1
+                        raise Rejected(503, self._service_time, "Server is at capacity; please retry later")
+                    self._condition.wait(remaining)
+            finally:
+                self._queued -= 1
+
+            self._inflight += 1
+            self._counters['admitted'] += 1
+            self._record_queue_time(time.monotonic() - start)
+
+    def run(self, user, fn):
+        """fn() under admission for `user`, or raise Rejected.
+
+        fn returns a (payload, status) tuple or a response; 4xx/5xx results
+        are kept out of the service-time EWMA.
+        """
+        started = self.acquire(user)
+        status = 500
+        try:
+            result = fn()
+            status = result[1] if isinstance(result, tuple) else getattr(result, 'status_code', 200)
+            return result
+        finally:
+            self.release(started, record=status < 400)
+
+    def release(self, started, record=True):
+        """Free the slot. `record=False` keeps a failed (e.g. 400) request out of the service-time EWMA."""
+        with self._condition:
+            if record:
+                elapsed = time.monotonic() - started
+                self._service_time += self.ewma_alpha * (elapsed - self._service_time)
+            self._inflight -= 1
+            self._counters['completed'] += 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            admitted = self._counters['admitted']
+            return {
+                'name': self.name,
+                'max_inflight': self.max_inflight,
+                'latency_budget_seconds': self.latency_budget,
+                'inflight': self._inflight,
+                'queued': self._queued,
+                'service_time_ewma_seconds': round(self._service_time, 3),
+                **self._counters,
+                'queue_time': {
+                    'count': admitted,
+                    'mean_seconds': round(self._queue_time_total / admitted, 3) if admitted else 0.0,
+                    'max_seconds': round(self._queue_time_max, 3),
+                    'buckets': [{'le': '+Inf' if math.isinf(bound) else bound, 'count': count}
+                                for bound, count in zip(QUEUE_TIME_BUCKETS, self._queue_times)],
+                },
+            }
+
+
+def rejected_response(rejected):
+    """429/503 JSON response with Retry-After for a Rejected request."""
+    response = jsonify({"error": rejected.reason, "retry_after": rejected.retry_after})
+    response.status_code = rejected.status
+    response.headers['Retry-After'] = str(rejected.retry_after)
+    return response
+
+
+# Resume generation: Gemini extraction + structuring per request
+generation = AdmissionController.from_env("generate-resume", "GENERATION")
@@ -1,38 +1,59 @@
 import io
 import json
 import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
 
-import fitz  # PyMuPDF
-import google.generativeai as genai
-from PIL import Image
-from dotenv import load_dotenv
-from flask import Flask, request, jsonify, g
+import click
+from flask import Flask, request, jsonify, g, send_file
 
-from db import db, DATABASE_URL
+import config
+import model_routing
+import warmup
+from admission import Rejected, generation as generation_admission, rejected_response
+from db import db, DATABASE_URL, configure_engine, engine_options
 from jwt_auth import require_auth
-from models import CandidateProfile as User, Resume
+from leaderboards import CursorError, leaderboard_page, positions, rebuild_leaderboards
+from migrations import run_migrations
+from pdf_render import DEFAULT_TEMPLATE, RenderError, render_cached
+from attire_logs import pack_frame_logs
+from blobstore import get_blob_store, sniff_mime
+from emotion_charts import offload_chart_images
+from exporter import EXPORTS, export_tables, peak_rss_mb
+from fieldsets import FieldError, load_options, resolve_fields
+from grammar_aggregates import recompute_aggregates, skill_trends
+from idempotency import idempotent, purge_expired as purge_idempotency_keys
+from models import (AttireAnalysis, CandidateProfile as User, EmotionAnalysis, GrammarAnalysis, Resume,
+                    Transcription)
+from ranking import recompute_domain_ranks
+from reports import clear_report_cache, get_report
+from search import RANK_WINDOW, SearchQueryError, rebuild_search_index, search_resumes
+from serializers import load_profile, parse_include, serialize_profile
+from similarity import get_similarity_index, sync_index
+from skill_facets import (SkillQueryError, backfill as backfill_skills, candidates_with_skills, facet_counts,
+                          parse_skills, parse_time)
+from singleflight import generation as generation_flight, request_key
+from canonical_resumes import compact, expand, get_canonical
+from uploads import SpeculativeExtractor, TooManyUploads, get_upload, purge_expired as purge_uploads
+from github_ingest import SnapshotError, ingest_snapshot, load_snapshot
+from text_blobs import collect_garbage, dedupe_existing, recount, stored_bytes
 from flask_cors import CORS
 from sqlalchemy import text
 
-# Load environment
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# PyMuPDF, Gemini and Pillow are imported lazily through warmup.py so that a
+# cold instance can answer /api/health before they finish loading.
 SECRET_KEY = os.getenv("SECRET_KEY", "your-shared-secret-with-node")
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_size': 10,
-    'pool_recycle': 3600,
-    'pool_pre_ping': True,
-    'max_overflow': 20
-}
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DATABASE_URL)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 db.init_app(app)
+with app.app_context():
+    configure_engine(db.engine)
 frontend_url = os.getenv("ALLOWED_ORIGINS")
 
 if frontend_url:
@@ -55,15 +76,32 @@ else:
         }
     })
     print("⚠️ CORS unrestricted (local/dev)")
-# Initialize Gemini
-genai.configure(api_key=GEMINI_API_KEY)
 
 
 # Helper functions for text extraction
+def _ocr_text(text):
+    text = text.strip()
+    if not text:
+        raise ValueError("No text in model response")
+    return text
+
+
+def _parse_structured_resume(content):
+    content = content.strip()
+
+    # Clean up the response to extract JSON
+    if content.startswith("```json"):
+        content = content[7:-3]
+    elif content.startswith("```"):
+        content = content[3:-3]
+
+    return json.loads(content)
+
+
 def extract_text_from_pdf_gemini(pdf_bytes):
     try:
         # Load PDF from bytes
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = warmup.load_fitz().open(stream=pdf_bytes, filetype="pdf")
 
         # Convert first page to image (as PNG)
         page = doc.load_page(0)  # First page
@@ -71,14 +109,10 @@ def extract_text_from_pdf_gemini(pdf_bytes):
         img_bytes = pix.tobytes("png")
 
         # Send to Gemini Vision
-        image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
+        image = warmup.load_pil_image().open(io.BytesIO(img_bytes)).convert("RGB")
         prompt = "Extract all resume text from this image (converted from PDF)."
-        model = genai.GenerativeModel("gemini-2.0-flash-exp")
-        response = model.generate_content([
-            prompt,
-            image
-        ])
-        return response.text.strip()
+        features = model_routing.image_features(image, len(pdf_bytes), pages=doc.page_count)
+        return model_routing.generate("ocr_pdf", [prompt, image], features, parse=_ocr_text)
 
     except Exception as e:
         print("❌ Error processing PDF with Gemini:", e)
@@ -87,19 +121,38 @@ def extract_text_from_pdf_gemini(pdf_bytes):
 
 def extract_text_from_image_gemini(image_bytes):
     try:
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        image = warmup.load_pil_image().open(io.BytesIO(image_bytes)).convert("RGB")
         img_prompt = "Extract all resume text from this image."
-        model = genai.GenerativeModel("gemini-2.0-flash-exp")
-        response = model.generate_content([
-            img_prompt,
-            image
-        ])
-        return response.text.strip()
+        features = model_routing.image_features(image, len(image_bytes))
+        return model_routing.generate("ocr_image", [img_prompt, image], features, parse=_ocr_text)
     except Exception as e:
         print("❌ Error processing image with Gemini:", e)
         return ""
 
 
+def extract_resume_text(file_bytes, content_type):
+    """Resume text of an uploaded PDF or image ('' if none was found)."""
+    if content_type == "application/pdf":
+        return extract_text_from_pdf_gemini(file_bytes)
+    return extract_text_from_image_gemini(file_bytes)
+
+
+def _parse_upload(resume_text):
+    """Upload-time follow-up: the canonical parse of the extracted text, for an existing profile."""
+    user = User.query.filter_by(email=g.user_email).first()
+    if user:
+        try:
+            get_canonical(user.id, resume_text, parse_resume_text)
+        except Exception as e:
+            db.session.rollback()
+            print("⚠️ Could not parse uploaded resume ahead of generation:", e)
+
+
+# Extraction (then parsing) started at upload time, ahead of /api/generate-resume.
+# The upload is marked done once the text is extracted; the parse runs after that.
+upload_extraction = SpeculativeExtractor(extract_resume_text, follow_up=_parse_upload)
+
+
 # def get_structured_resume_with_feedback(resume_text, job_description):
 #     prompt = f"""
 # You are an expert resume writing assistant. Based on the following user resume and the job description, provide a structured, ATS-friendly resume and feedback.
@@ -210,54 +263,40 @@ def extract_text_from_image_gemini(image_bytes):
 #         }
 
 
-def get_structured_resume_with_feedback(resume_text, job_description):
+def parse_resume_text(resume_text):
+    """Canonical JSON of the raw resume text: complete and faithful, not tailored. Raises on failure."""
     prompt = f"""
-You are an expert resume writing assistant specializing in creating concise, impactful, ATS-friendly one-page resumes. 
+You are an expert resume parser. Convert the resume text below into structured data.
 
-CRITICAL REQUIREMENTS:
-- The resume MUST fit on ONE PAGE when formatted
-- Prioritize quality over quantity - be selective and impactful
-- Each bullet point should be concise yet powerful (1-2 lines max)
-- Limit entries to most recent/relevant items only
-- Focus on achievements with metrics, not duties
-
-Based on the user's resume and job description, provide a structured resume optimized for ONE PAGE layout.
+RULES:
+- Keep EVERYTHING in the resume: every position, bullet point, project, degree and certification
+- Do not rewrite, shorten, tailor or invent anything; keep metrics and wording as written
+- Use an empty string or empty list for anything the resume does not contain
 
 Return data in this EXACT JSON format:
 
 {{
-    "name": "Full Name (if found, otherwise empty string)",
-    "email": "email@example.com (if found, otherwise empty string)",
-    "phone": "Phone number (if found, otherwise empty string)",
-    "location": "City, State (if found, otherwise empty string)",
-    "professional_summary": "2-3 impactful sentences (40-60 words max) tailored to the job, highlighting key value proposition",
-    "skills": [
-        "Skill 1",
-        "Skill 2",
-        "Skill 3",
-        "Skill 4",
-        "Skill 5",
-        "Skill 6"
-    ],
+    "name": "Full Name",
+    "email": "email@example.com",
+    "phone": "Phone number",
+    "location": "City, State",
+    "professional_summary": "Summary or objective as written",
+    "skills": ["Skill 1", "Skill 2"],
     "work_experience": [
         {{
             "company": "Company Name",
             "position": "Job Title",
             "duration": "Start Date - End Date",
             "location": "City, State",
-            "responsibilities": [
-                "Achievement-focused bullet with quantifiable impact (1-2 lines)",
-                "Another impactful achievement with metrics (1-2 lines)",
-                "Third key accomplishment if highly relevant (1-2 lines)"
-            ]
+            "responsibilities": ["Bullet point as written"]
         }}
     ],
     "projects": [
         {{
             "title": "Project Name",
-            "technologies": ["Tech1", "Tech2", "Tech3"],
-            "description": "Concise description focusing on impact and results (1-2 lines max)",
-            "link": "github.com/link (if available)"
+            "technologies": ["Tech1", "Tech2"],
+            "description": "Description as written",
+            "link": "github.com/link"
         }}
     ],
     "education": [
@@ -266,7 +305,7 @@ Return data in this EXACT JSON format:
             "institution": "School Name",
             "graduation_year": "Year",
             "location": "City, State",
-            "relevant_coursework": ["Course1", "Course2", "Course3"]
+            "relevant_coursework": ["Course1"]
         }}
     ],
     "certifications": [
@@ -274,17 +313,48 @@ Return data in this EXACT JSON format:
             "name": "Certification Name",
             "issuer": "Issuing Organization",
             "date": "Date obtained",
-            "expiry": "Expiry date (if applicable)"
+            "expiry": "Expiry date"
         }}
-    ],
-    "ats_score": 85,
-    "feedback": [
-        "Feedback point 1: What was improved or optimized for one-page format",
-        "Feedback point 2: What was prioritized/removed and why",
-        "Feedback point 3: How content was tailored to job requirements"
     ]
 }}
 
+Resume Text:
+{resume_text}
+
+Return ONLY the JSON response, no additional text.
+"""
+    data = model_routing.generate("parse", prompt, model_routing.text_features(resume_text),
+                                  parse=_parse_structured_resume)
+    if not isinstance(data, dict):
+        raise ValueError("Parsed resume is not a JSON object")
+    return data
+
+
+def tailor_resume(canonical_data, job_description):
+    """One-page resume tailored to the job, with ATS score and feedback, from a canonical parse."""
+    prompt = f"""
+You are an expert resume writing assistant specializing in creating concise, impactful, ATS-friendly one-page resumes. 
+
+CRITICAL REQUIREMENTS:
+- The resume MUST fit on ONE PAGE when formatted
+- Prioritize quality over quantity - be selective and impactful
+- Each bullet point should be concise yet powerful (1-2 lines max)
+- Limit entries to most recent/relevant items only
+- Focus on achievements with metrics, not duties
+
+Based on the candidate's parsed resume (an outline: each section's header names the fields of its numbered `|`-separated rows) and the job description, provide a structured resume optimized for ONE PAGE layout. Use only facts present in the parsed resume.
+
+Return data in this EXACT JSON format. Pick entries by their [n] number in the parsed resume ("ref"); return only the fields shown, everything else (contact details, companies, titles, dates, links) is copied from the parsed resume:
+
+{{"professional_summary": "2-3 impactful sentences (40-60 words max) tailored to the job, highlighting key value proposition",
+ "skills": ["Skill 1", "Skill 2"],
+ "work_experience": [{{"ref": 0, "responsibilities": ["Achievement-focused bullet with quantifiable impact (1-2 lines)"]}}],
+ "projects": [{{"ref": 0, "technologies": ["Tech1"], "description": "Impact and results (1-2 lines max)"}}],
+ "education": [{{"ref": 0, "relevant_coursework": ["Course1"]}}],
+ "certifications": [0],
+ "ats_score": 85,
+ "feedback": ["What was improved or optimized for one-page format", "What was prioritized/removed and why", "How content was tailored to job requirements"]}}
+
 ONE-PAGE OPTIMIZATION GUIDELINES:
 1. **Skills**: Include 6-10 most relevant skills only (matching job description keywords)
 2. **Work Experience**: 
@@ -309,8 +379,8 @@ ATS SCORE CALCULATION:
 - Relevant skills coverage: 20%
 - Format and structure: 15%
 
-Original Resume:
-{resume_text}
+Candidate Resume (parsed):
+{compact(canonical_data)}
 
 Job Description:
 {job_description}
@@ -319,18 +389,9 @@ Return ONLY the JSON response, no additional text. Remember: ONE PAGE is mandato
 """
 
     try:
-        model_text = genai.GenerativeModel("gemini-2.0-flash-exp")
-        response = model_text.generate_content(prompt)
-        content = response.text.strip()
-
-        # Clean up the response to extract JSON
-        if content.startswith("```json"):
-            content = content[7:-3]
-        elif content.startswith("```"):
-            content = content[3:-3]
-
-        structured_data = json.loads(content)
-        return structured_data
+        features = model_routing.text_features(prompt)
+        tailored = model_routing.generate("tailor", prompt, features, parse=_parse_structured_resume)
+        return expand(canonical_data, tailored)
     except Exception as e:
         print("❌ Error generating structured resume with Gemini:", e)
         return {
@@ -408,80 +469,191 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "database": db_status,
+        "warm": warmup.is_warm(),
         "timestamp": datetime.utcnow().isoformat()
     }), 200
 
 
-@app.route('/api/generate-resume', methods=['POST'])
-@require_auth
-def generate_resume():
-    try:
-        # Check if file is present
-        if 'resume_file' not in request.files:
-            return jsonify({"error": "No resume file provided"}), 400
+@app.route('/api/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """Admission state (in-flight, queue, rejections, queue times) and single-flight dedupe rates."""
+    return jsonify({"controllers": [generation_admission.stats()],
+                    "coalescing": [generation_flight.stats()],
+                    "uploads": upload_extraction.stats()}), 200
 
-        file = request.files['resume_file']
-        job_description = request.form.get('job_description')
 
-        if not file or file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
+ALLOWED_RESUME_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 
-        if not job_description:
-            return jsonify({"error": "Job description is required"}), 400
 
-        # Validate file type
-        allowed_extensions = {'pdf', 'png', 'jpg', 'jpeg'}
-        if '.' not in file.filename or file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
+def _allowed_resume_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_RESUME_EXTENSIONS
+
+
+def _upload_response(upload):
+    return {
+        "upload_id": upload.id,
+        "status": upload.status,
+        "filename": upload.filename,
+        "size": upload.size,
+        "expires_at": upload.expires_at.isoformat()
+    }
+
+
+@app.route('/api/resume-uploads', methods=['POST'])
+@require_auth
+def upload_resume():
+    """Store a resume file and start extracting its text; pass the upload_id to /api/generate-resume."""
+    try:
+        file = request.files.get('resume_file')
+        if not file or file.filename == '':
+            return jsonify({"error": "No resume file provided"}), 400
+        if not _allowed_resume_file(file.filename):
             return jsonify({"error": "Invalid file type. Only PDF, PNG, JPG, JPEG allowed"}), 400
 
-        # Read file content
-        file_bytes = file.read()
-        file_type = file.content_type
+        upload = upload_extraction.submit(g.user_email, file.filename, file.content_type, file.read())
+        return jsonify(_upload_response(upload)), 202
 
-        # Extract text from file
-        if file_type == "application/pdf":
-            resume_text = extract_text_from_pdf_gemini(file_bytes)
-        else:
-            resume_text = extract_text_from_image_gemini(file_bytes)
+    except TooManyUploads as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 429
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in upload_resume: {str(e)}")
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
-        if not resume_text:
-            return jsonify({"error": "No text found in the uploaded file"}), 400
 
-        # Generate structured resume data with ATS score (FULL DATA - store everything)
-        structured_data = get_structured_resume_with_feedback(resume_text, job_description)
+@app.route('/api/resume-uploads/<upload_id>', methods=['GET'])
+@require_auth
+def get_resume_upload(upload_id):
+    upload = get_upload(upload_id, g.user_email)
+    if upload is None:
+        return jsonify({"error": "Upload not found or expired"}), 404
+    return jsonify(_upload_response(upload)), 200
 
-        if not structured_data or "feedback" not in structured_data:
-            return jsonify({"error": "Failed to generate structured resume"}), 500
 
-        # Get or create user
-        user = get_or_create_user(g.user_email, g.user_name)
+def _generation_fingerprint():
+    """Digest of the file bytes (or upload id) and job description, for Idempotency-Key reuse checks."""
+    upload_id = request.form.get('upload_id')
+    if upload_id:
+        return request_key('upload', upload_id, request.form.get('job_description') or '')
+    file = request.files.get('resume_file')
+    file_bytes = file.read() if file else b''
+    if file:
+        file.seek(0)
+    return request_key(file_bytes, request.form.get('job_description') or '')
 
-        # Prepare data for storage (convert to JSON string for SQLite)
-        resume_data = structured_data
-        if 'postgresql' not in DATABASE_URL:
-            resume_data = json.dumps(structured_data)
 
-        # Save resume to database (FULL DATA)
-        resume = Resume(
-            profile_id=user.id,
-            original_resume_text=resume_text,
-            structured_resume_data=resume_data,
-            job_description=job_description
-        )
+@app.route('/api/generate-resume', methods=['POST'])
+@require_auth
+@idempotent(_generation_fingerprint)
+def generate_resume():
+    try:
+        job_description = request.form.get('job_description')
+        upload_id = request.form.get('upload_id')
+        upload = None
+
+        if upload_id:
+            # File sent earlier to /api/resume-uploads; its text is usually extracted by now
+            upload = get_upload(upload_id, g.user_email)
+            if upload is None:
+                return jsonify({"error": "Upload not found or expired"}), 404
+        else:
+            # Check if file is present
+            if 'resume_file' not in request.files:
+                return jsonify({"error": "No resume file provided"}), 400
 
-        db.session.add(resume)
-        db.session.commit()
+            file = request.files['resume_file']
 
-        # Return basic response with resume_id for frontend to fetch with payment status
-        return jsonify({
-            "success": True,
-            "message": "Resume generated successfully",
-            "resume_id": resume.id,
-            "preview": {
-                "name": structured_data.get("name", ""),
-                "ats_score": structured_data.get("ats_score", 0)
-            }
-        }), 200
+            if not file or file.filename == '':
+                return jsonify({"error": "No file selected"}), 400
+
+        if not job_description:
+            return jsonify({"error": "Job description is required"}), 400
+
+        if upload is None:
+            # Validate file type
+            if not _allowed_resume_file(file.filename):
+                return jsonify({"error": "Invalid file type. Only PDF, PNG, JPG, JPEG allowed"}), 400
+
+            # Read file content
+            file_bytes = file.read()
+            file_type = file.content_type
+
+        def generate():
+            # Extract text from file, or take the upload's speculatively extracted text
+            if upload is not None:
+                try:
+                    resume_text = upload_extraction.text(upload)
+                except FutureTimeoutError:
+                    return {"error": "Resume text extraction is still running, please retry"}, 503
+            else:
+                resume_text = extract_resume_text(file_bytes, file_type)
+
+            if not resume_text:
+                return {"error": "No text found in the uploaded file"}, 400
+
+            # Get or create user
+            user = get_or_create_user(g.user_email, g.user_name)
+
+            # Reuse the upload's background parse if it is still running, rather than parsing twice
+            if upload is not None:
+                upload_extraction.settle(upload.id)
+
+            # Parse the resume text once per profile, then tailor the parse to this job
+            try:
+                canonical_id, canonical_data, _ = get_canonical(user.id, resume_text, parse_resume_text)
+            except Exception as e:
+                db.session.rollback()
+                print("❌ Error parsing resume with Gemini:", e)
+                return {"error": "Failed to generate structured resume"}, 500
+
+            # Generate structured resume data with ATS score (FULL DATA - store everything)
+            structured_data = tailor_resume(canonical_data, job_description)
+
+            if not structured_data or "feedback" not in structured_data:
+                return {"error": "Failed to generate structured resume"}, 500
+
+            # Prepare data for storage (convert to JSON string for SQLite)
+            resume_data = structured_data
+            if 'postgresql' not in DATABASE_URL:
+                resume_data = json.dumps(structured_data)
+
+            # Save resume to database (FULL DATA)
+            resume = Resume(
+                profile_id=user.id,
+                original_resume_text=resume_text,
+                structured_resume_data=resume_data,
+                job_description=job_description,
+                canonical_resume_id=canonical_id
+            )
+
+            db.session.add(resume)
+            db.session.commit()
+
+            # Return basic response with resume_id for frontend to fetch with payment status
+            return {
+                "success": True,
+                "message": "Resume generated successfully",
+                "resume_id": resume.id,
+                "preview": {
+                    "name": structured_data.get("name", ""),
+                    "ats_score": structured_data.get("ats_score", 0)
+                }
+            }, 200
+
+        # Concurrent duplicates (double-clicks, retries, second tab) share one generation.
+        # Only the flight's leader goes through admission control (slot and rate-limit token);
+        # a rejection is shared with the duplicates like any other outcome.
+        if upload is not None:
+            key = request_key(g.user_email, 'upload', upload.id, job_description)
+        else:
+            key = request_key(g.user_email, file_bytes, job_description)
+        try:
+            (payload, status), _ = generation_flight.do(
+                key, lambda: generation_admission.run(g.user_email, generate))
+        except Rejected as e:
+            return rejected_response(e)
+        return jsonify(payload), status
 
     except Exception as e:
         db.session.rollback()
@@ -546,6 +718,47 @@ def get_resume(resume_id):
         return jsonify({"error": f"Error fetching resume: {str(e)}"}), 500
 
 
+@app.route('/api/resume/<int:resume_id>/pdf', methods=['GET'])
+@require_auth
+def get_resume_pdf(resume_id):
+    """The resume rendered server-side as a one-page PDF.
+
+    ?template=classic|modern|compact&payment=1. Responses carry an ETag
+    derived from the resume content and template, so clients can revalidate
+    with If-None-Match instead of downloading again.
+    """
+    try:
+        if request.args.get('payment', '0') != '1':
+            return jsonify({"error": "Payment required to download the PDF"}), 402
+
+        user = User.query.filter_by(email=g.user_email).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        resume = Resume.query.filter_by(id=resume_id, profile_id=user.id).first()
+        if not resume:
+            return jsonify({"error": "Resume not found"}), 404
+
+        template = request.args.get('template', DEFAULT_TEMPLATE)
+        pdf, info, etag, cached = render_cached(resume.id, resume.structured_resume_data, template)
+
+        response = send_file(io.BytesIO(pdf), mimetype='application/pdf', download_name=f"resume-{resume.id}.pdf",
+                             etag=etag, conditional=True, max_age=0)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['X-Render-Cache'] = 'hit' if cached else 'miss'
+        response.headers['X-Render-Scale'] = str(info['scale'])
+        response.headers['X-Render-Truncated'] = '1' if info['truncated'] else '0'
+        return response
+
+    except RenderError as e:
+        return jsonify({"error": str(e)}), 400
+    except FutureTimeoutError:
+        return jsonify({"error": "PDF rendering timed out, please retry"}), 503
+    except Exception as e:
+        print(f"Error in get_resume_pdf: {str(e)}")
+        return jsonify({"error": f"Error rendering resume: {str(e)}"}), 500
+
+
 @app.route('/api/user-resumes', methods=['GET'])
 @require_auth
 def get_user_resumes():
@@ -582,15 +795,614 @@ def get_user_resumes():
         return jsonify({"error": f"Error fetching resumes: {str(e)}"}), 500
 
 
-# Initialize database
+@app.route('/api/profile', methods=['GET'])
+@require_auth
+def get_profile():
+    """Authenticated user's profile with GitHub data.
+
+    README and source file contents are omitted unless requested with
+    ?include=readme,code_content. ?fields=email,github.repos.repo_name
+    returns (and loads) only the named fields.
+    """
+    try:
+        include = parse_include(request.args.get('include'))
+        fields = resolve_fields(User, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        user = load_profile(email=g.user_email, include=include, fields=fields)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify({
+            "success": True,
+            "profile": serialize_profile(user, include, fields)
+        }), 200
+
+    except Exception as e:
+        print(f"Error in get_profile: {str(e)}")
+        return jsonify({"error": f"Error fetching profile: {str(e)}"}), 500
+
+
+@app.route('/api/profile/github', methods=['PUT'])
+@require_auth
+def put_github_snapshot():
+    """Replace the authenticated user's GitHub data with a full snapshot (see github_ingest.py)."""
+    snapshot = request.get_json(silent=True)
+    if snapshot is None:
+        return jsonify({"error": "A JSON snapshot is required"}), 400
+
+    try:
+        user = User.query.filter_by(email=g.user_email).first()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        stats = ingest_snapshot(user.id, snapshot)
+        return jsonify({"success": True, "stats": stats}), 200
+
+    except SnapshotError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in put_github_snapshot: {str(e)}")
+        return jsonify({"error": f"Error importing GitHub snapshot: {str(e)}"}), 500
+
+
+@app.route('/api/grammar/trends', methods=['GET'])
+@require_auth
+def get_grammar_trends():
+    """Cross-session communication skill trends for the authenticated user."""
+    try:
+        return jsonify({
+            "success": True,
+            "trends": skill_trends(g.user_email)
+        }), 200
+
+    except Exception as e:
+        print(f"Error in get_grammar_trends: {str(e)}")
+        return jsonify({"error": f"Error fetching grammar trends: {str(e)}"}), 500
+
+
+@app.route('/api/blobs/<digest>', methods=['GET'])
+@require_auth
+def get_blob(digest):
+    """Serve a content-addressed blob (e.g. an emotion chart) to the user whose analysis references it.
+
+    The URL is derived from the content hash, so responses never change and
+    are cached as immutable for a year (by the browser only: they are private).
+    """
+    owned = db.session.query(EmotionAnalysis.id).filter_by(email=g.user_email, chart_digest=digest).first()
+    store = get_blob_store()
+    if owned is None or not store.exists(digest):
+        return jsonify({"error": "Blob not found"}), 404
+
+    with store.open(digest) as f:
+        mimetype = sniff_mime(f.read(16))
+
+    path = store.local_path(digest)
+    response = send_file(path if path else store.open(digest), mimetype=mimetype,
+                         etag=digest, conditional=True, max_age=31536000)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/api/attire/<int:analysis_id>/logs', methods=['GET'])
+@require_auth
+def get_attire_logs(analysis_id):
+    """Posture and eye-contact frame logs for one attire analysis.
+
+    ?format=summary (default) returns per-bucket label counts computed from the
+    packed logs (bucket seconds via ?bucket=, default 60); ?format=json returns
+    the full frame-by-frame logs.
+    """
+    log_format = request.args.get('format', 'summary')
+    if log_format not in ('summary', 'json'):
+        return jsonify({"error": "format must be 'summary' or 'json'"}), 400
+    bucket = request.args.get('bucket', 60, type=int)
+    if not bucket or bucket < 1:
+        return jsonify({"error": "bucket must be a positive number of seconds"}), 400
+
+    keys = ('posture_log', 'eye_log') if log_format == 'json' else ('posture_summary', 'eye_summary')
+    fields = {key: True for key in keys}
+
+    try:
+        analysis = (AttireAnalysis.query.options(*load_options(AttireAnalysis, fields))
+                    .filter_by(id=analysis_id, email=g.user_email).first())
+        if not analysis:
+            return jsonify({"error": "Attire analysis not found"}), 404
+
+        return jsonify({
+            "success": True,
+            "id": analysis.id,
+            "format": log_format,
+            **analysis.to_dict(summary_seconds=bucket, fields=fields)
+        }), 200
+
+    except Exception as e:
+        print(f"Error in get_attire_logs: {str(e)}")
+        return jsonify({"error": f"Error fetching attire logs: {str(e)}"}), 500
+
+
+# Token scope that lets a caller (e.g. a recruiter) search every candidate's resumes
+RESUME_SEARCH_SCOPE = "resumes:search"
+
+
+@app.route('/api/resumes/search', methods=['GET'])
+@require_auth
+def search_resumes_route():
+    """Ranked full-text search over resumes with highlighted snippets.
+
+    ?q=kubernetes AND terraform (also OR, NOT / -term, "exact phrase"),
+    ?limit= (default 20, max 100), ?offset=. Only the caller's own resumes
+    are searched unless the token carries the resumes:search scope.
+    `truncated` is true when only the newest rank_window matches were ranked.
+    """
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 20, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    email = None if RESUME_SEARCH_SCOPE in g.user_scopes else g.user_email
+
+    try:
+        results, truncated = search_resumes(query, email=email, limit=limit, offset=offset)
+    except SearchQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in search_resumes: {str(e)}")
+        return jsonify({"error": f"Error searching resumes: {str(e)}"}), 500
+
+    return jsonify({
+        "success": True,
+        "query": query,
+        "scope": "all" if email is None else "own",
+        "results": results,
+        "truncated": truncated,
+        "rank_window": RANK_WINDOW
+    }), 200
+
+
+@app.route('/api/resumes/similar', methods=['POST'])
+@require_auth
+def similar_resumes():
+    """Top-k previously processed resumes for a job description (local index, no Gemini call).
+
+    JSON body: {"job_description": "...", "k": 10}. Only the caller's own
+    resumes are candidates unless the token carries the resumes:search scope.
+    """
+    data = request.get_json(silent=True) or {}
+    job_description = (data.get('job_description') or '').strip()
+    if not job_description:
+        return jsonify({"error": "job_description is required"}), 400
+    try:
+        k = max(1, min(int(data.get('k', 10)), 100))
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+
+    try:
+        index = get_similarity_index()
+        index.reload_if_changed()
+        # Bounded catch-up; `flask --app app index-resumes` does the bulk of it
+        sync_index(index, max_batches=1)
+
+        candidates = None
+        if RESUME_SEARCH_SCOPE not in g.user_scopes:
+            candidates = [r.id for r in Resume.query.join(User).filter(User.email == g.user_email)
+                          .with_entities(Resume.id)]
+        matches = index.query(job_description, k=k, resume_ids=candidates)
+
+        rows = {}
+        if matches:
+            rows = {r.id: r for r in db.session.query(Resume.id, Resume.profile_id, User.email, Resume.created_at)
+                    .join(User, User.id == Resume.profile_id)
+                    .filter(Resume.id.in_([resume_id for resume_id, _ in matches]))}
+        results = [{
+            "resume_id": resume_id,
+            "profile_id": rows[resume_id].profile_id,
+            "email": rows[resume_id].email,
+            "created_at": rows[resume_id].created_at.isoformat() if rows[resume_id].created_at else None,
+            "score": round(score, 6)
+        } for resume_id, score in matches if resume_id in rows]
+
+        return jsonify({
+            "success": True,
+            "scope": "all" if candidates is None else "own",
+            "results": results
+        }), 200
+
+    except Exception as e:
+        print(f"Error in similar_resumes: {str(e)}")
+        return jsonify({"error": f"Error finding similar resumes: {str(e)}"}), 500
+
+
+# Result kinds listed by /api/results/<kind>: (model, owner filter for the current user)
+RESULT_KINDS = {
+    'transcriptions': (Transcription, lambda: Transcription.user.has(email=g.user_email)),
+    'grammar': (GrammarAnalysis, lambda: GrammarAnalysis.email == g.user_email),
+    'emotion': (EmotionAnalysis, lambda: EmotionAnalysis.email == g.user_email),
+    'attire': (AttireAnalysis, lambda: AttireAnalysis.email == g.user_email),
+}
+
+
+@app.route('/api/results/<kind>', methods=['GET'])
+@require_auth
+def list_results(kind):
+    """The authenticated user's transcriptions or interview analyses.
+
+    ?fields=id,summary,skill_averages.grammar limits both the columns loaded
+    and the keys returned; without it every row has its full to_dict() shape.
+    """
+    if kind not in RESULT_KINDS:
+        return jsonify({"error": f"Unknown result kind: {kind}"}), 404
+    model, owner = RESULT_KINDS[kind]
+
+    try:
+        fields = resolve_fields(model, request.args.get('fields'))
+    except FieldError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        rows = (model.query.options(*load_options(model, fields))
+                .filter(owner())
+                .order_by(model.id)
+                .all())
+        return jsonify({
+            "success": True,
+            "results": [row.to_dict(fields=fields) for row in rows]
+        }), 200
+
+    except Exception as e:
+        print(f"Error in list_results: {str(e)}")
+        return jsonify({"error": f"Error fetching results: {str(e)}"}), 500
+
+
+@app.route('/api/interview/<int:session_id>/report', methods=['GET'])
+@require_auth
+def get_interview_report(session_id):
+    """Everything about one of the user's interview sessions in one response.
+
+    Questions with their evaluation and speech scores, the overall evaluation,
+    grammar, emotion and attire analyses, and the live domain ranking.
+    Completed sessions are served from a cache that any change invalidates.
+    """
+    try:
+        report, cached = get_report(session_id, g.user_email)
+        if report is None:
+            return jsonify({"error": "Interview session not found"}), 404
+
+        return jsonify({
+            "success": True,
+            "cached": cached,
+            "report": report
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in get_interview_report: {str(e)}")
+        return jsonify({"error": f"Error building interview report: {str(e)}"}), 500
+
+
+def _skill_query():
+    """(skills, since, until, profile_id) from the query string; own resumes only without resumes:search."""
+    skills = parse_skills(request.args.get('skills'))
+    since = parse_time(request.args.get('since'), 'since')
+    until = parse_time(request.args.get('until'), 'until')
+    profile_id = None
+    if RESUME_SEARCH_SCOPE not in g.user_scopes:
+        profile_id = db.session.query(User.id).filter(User.email == g.user_email).scalar() or 0
+    return skills, since, until, profile_id
+
+
+@app.route('/api/skills/facets', methods=['GET'])
+@require_auth
+def get_skill_facets():
+    """Candidate counts per skill from the resume skills index.
+
+    ?skills=Go,Kafka (aliases such as k8s are folded) restricts to candidates
+    listing all of them; ?since= / ?until= (ISO dates) filter by resume
+    creation; ?limit= top skills (default 20, max 100; 0 for the count only).
+    """
+    try:
+        skills, since, until, profile_id = _skill_query()
+    except SkillQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = request.args.get('limit', 20, type=int)
+
+    try:
+        return jsonify({
+            "success": True,
+            "skills": skills,
+            "scope": "all" if profile_id is None else "own",
+            **facet_counts(skills, since=since, until=until, profile_id=profile_id, limit=limit)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in get_skill_facets: {str(e)}")
+        return jsonify({"error": f"Error counting skills: {str(e)}"}), 500
+
+
+@app.route('/api/skills/candidates', methods=['GET'])
+@require_auth
+def get_candidates_with_skills():
+    """Candidates listing every skill in ?skills=, by profile id.
+
+    Same filters as /api/skills/facets; ?limit= (default 50, max 100) and
+    ?after=<profile_id> from the previous page's next_after.
+    """
+    try:
+        skills, since, until, profile_id = _skill_query()
+    except SkillQueryError as e:
+        return jsonify({"error": str(e)}), 400
+    if not skills:
+        return jsonify({"error": "skills is required"}), 400
+    limit = request.args.get('limit', 50, type=int)
+
+    try:
+        candidates = candidates_with_skills(skills, since=since, until=until, profile_id=profile_id, limit=limit,
+                                            after=request.args.get('after', type=int))
+        return jsonify({
+            "success": True,
+            "skills": skills,
+            "candidates": candidates,
+            "next_after": candidates[-1]['profile_id'] if len(candidates) == max(1, min(limit, 100)) else None
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in get_candidates_with_skills: {str(e)}")
+        return jsonify({"error": f"Error filtering candidates: {str(e)}"}), 500
+
+
+@app.route('/api/leaderboard', methods=['GET'])
+@require_auth
+def get_leaderboard():
+    """One page of a domain's leaderboard, best score first.
+
+    ?domain=Backend Engineer&limit=20; pass the returned next_cursor as
+    ?cursor= for the following page.
+    """
+    domain = request.args.get('domain')
+    if not domain:
+        return jsonify({"error": "domain is required"}), 400
+    limit = request.args.get('limit', 20, type=int)
+
+    try:
+        page = leaderboard_page(domain, limit=limit, cursor=request.args.get('cursor'))
+        if page is None:
+            return jsonify({"error": "Unknown domain"}), 404
+
+        return jsonify({"success": True, **page}), 200
+
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in get_leaderboard: {str(e)}")
+        return jsonify({"error": f"Error fetching leaderboard: {str(e)}"}), 500
+
+
+@app.route('/api/leaderboard/me', methods=['GET'])
+@require_auth
+def get_my_leaderboard_positions():
+    """The user's rank and percentile in every domain they were ranked in."""
+    try:
+        return jsonify({
+            "success": True,
+            "positions": positions(g.user_email)
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in get_my_leaderboard_positions: {str(e)}")
+        return jsonify({"error": f"Error fetching leaderboard positions: {str(e)}"}), 500
+
+
+# Initialize database (explicit migration step, not run on every boot)
 def init_db():
     with app.app_context():
-        db.create_all()
+        run_migrations()
         print("✅ Database tables created successfully")
 
 
-if __name__ == '__main__':
+@app.cli.command("migrate")
+def migrate_command():
+    """Create or upgrade the database schema."""
     init_db()
+
+
+@app.cli.command("purge-idempotency-keys")
+@click.option("--batch-size", default=1000, show_default=True)
+def purge_idempotency_keys_command(batch_size):
+    """Delete expired Idempotency-Key records in batches."""
+    deleted = purge_idempotency_keys(batch_size=batch_size)
+    print(f"✅ Purged {deleted} expired idempotency keys")
+
+
+@app.cli.command("purge-uploads")
+@click.option("--batch-size", default=1000, show_default=True)
+def purge_uploads_command(batch_size):
+    """Delete expired resume uploads (abandoned before generation) in batches."""
+    deleted = purge_uploads(batch_size=batch_size)
+    print(f"✅ Purged {deleted} expired resume uploads")
+
+
+@app.cli.command("rank-domains")
+@click.option("--domain", default=None, help="Only recompute this domain.")
+def rank_domains_command(domain):
+    """Recompute DomainRanking.domain_rank from scratch (batch fallback)."""
+    with db.engine.begin() as connection:
+        updated = recompute_domain_ranks(connection, domain)
+    print(f"✅ Domain ranks recomputed ({updated} rows changed)")
+
+
+@app.cli.command("refresh-leaderboards")
+@click.option("--domain", default=None, help="Only rebuild this domain.")
+def refresh_leaderboards_command(domain):
+    """Rebuild the per-domain leaderboard summaries (backfill, or after bulk writes)."""
+    with db.engine.begin() as connection:
+        rebuilt = rebuild_leaderboards(connection, domain)
+    print(f"✅ Leaderboards rebuilt ({rebuilt} domains)")
+
+
+@app.cli.command("offload-charts")
+@click.option("--batch-size", default=100, show_default=True)
+def offload_charts_command(batch_size):
+    """Move inline EmotionAnalysis.chart_image data into the blob store."""
+    if not get_blob_store().durable:
+        print("⚠️ The blob store is not durable (local disk on Cloud Run); set BLOB_STORE_BACKEND=gcs "
+              "or BLOB_STORE_LOCAL_DURABLE=1. Nothing was moved.")
+        return
+    stats = offload_chart_images(batch_size=batch_size)
+    print(f"✅ Offloaded {stats['rows_moved']} charts ({stats['bytes_moved']:,} bytes, "
+          f"{stats['distinct_blobs']} distinct blobs, {stats['rows_skipped']} skipped)")
+
+
+@app.cli.command("index-skills")
+@click.option("--batch-size", default=500, show_default=True)
+def index_skills_command(batch_size):
+    """Rebuild the resume skills index (after a backfill or a taxonomy change)."""
+    resumes, rows = backfill_skills(batch_size=batch_size)
+    print(f"✅ Indexed {resumes} resumes ({rows} resume skills)")
+
+
+@app.cli.command("ingest-github")
+@click.argument("email")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", default=None, type=int, help="Snapshot files per transaction.")
+def ingest_github_command(email, path, batch_size):
+    """Import a GitHub snapshot JSON file for the candidate with this email."""
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f"No candidate profile for {email}")
+    try:
+        stats = ingest_snapshot(user.id, load_snapshot(path), batch_size=batch_size)
+    except SnapshotError as e:
+        raise click.ClickException(str(e))
+    print(f"✅ Imported {path}: " + ", ".join(f"{key} {value}" for key, value in sorted(stats.items())))
+
+
+@app.cli.command("dedupe-text")
+@click.option("--batch-size", default=500, show_default=True)
+def dedupe_text_command(batch_size):
+    """Move inline README and source file text into deduplicated text blobs."""
+    stats = dedupe_existing(batch_size=batch_size)
+    inline, stored = stored_bytes()
+    print(f"✅ Deduplicated {stats['rows']} rows: {stats['bytes_moved']:,} -> {stats['bytes_stored']:,} bytes "
+          f"in {stats['blobs_created']} new blobs ({stats['bytes_saved']:,} bytes saved; "
+          f"{stored:,} bytes in text_blobs, {inline:,} still inline)")
+
+
+@app.cli.command("gc-text-blobs")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--recount", "recount_first", is_flag=True, help="Recompute reference counts first.")
+def gc_text_blobs_command(batch_size, recount_first):
+    """Delete text blobs no README or source file references."""
+    if recount_first:
+        print(f"✅ Corrected {recount()} reference counts")
+    deleted, freed = collect_garbage(batch_size=batch_size)
+    print(f"✅ Deleted {deleted} unreferenced text blobs ({freed:,} bytes)")
+
+
+@app.cli.command("pack-frame-logs")
+@click.option("--batch-size", default=50, show_default=True)
+def pack_frame_logs_command(batch_size):
+    """Convert AttireAnalysis JSON frame logs to the packed binary format."""
+    stats = pack_frame_logs(batch_size=batch_size)
+    ratio = stats['json_bytes'] / stats['packed_bytes'] if stats['packed_bytes'] else 0
+    print(f"✅ Packed logs for {stats['rows']} rows: {stats['json_bytes']:,} -> {stats['packed_bytes']:,} bytes "
+          f"({ratio:.1f}x, {stats['skipped']} skipped)")
+
+
+@app.cli.command("recompute-grammar")
+@click.option("--batch-size", default=500, show_default=True)
+def recompute_grammar_command(batch_size):
+    """Rebuild GrammarAnalysis running totals and averages from question rows."""
+    with db.engine.begin() as connection:
+        rewritten = recompute_aggregates(connection, batch_size=batch_size)
+    if rewritten:
+        clear_report_cache()  # the Core rewrite bypasses the report invalidation events
+    print(f"✅ Grammar aggregates recomputed for {rewritten} analyses")
+
+
+@app.cli.command("export")
+@click.option("--out", "out_dir", default="exports", show_default=True)
+@click.option("--table", "tables", multiple=True, type=click.Choice(sorted(EXPORTS)),
+              help="Table to export (repeatable; default: all).")
+@click.option("--format", "formats", default="jsonl,parquet", show_default=True,
+              help="Comma-separated: jsonl, parquet, arrow.")
+@click.option("--incremental", is_flag=True, help="Only rows newer than the stored watermark.")
+@click.option("--chunk-size", default=1000, show_default=True)
+def export_command(out_dir, tables, formats, incremental, chunk_size):
+    """Stream analytics tables to JSONL / Parquet / Arrow files."""
+    formats = tuple(part.strip() for part in formats.split(",") if part.strip())
+    try:
+        results = export_tables(out_dir, tables, formats, incremental, chunk_size)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    for result in results:
+        print(f"✅ {result['table']}: {result['rows']:,} rows in {result['seconds']:.2f} s "
+              f"({result['rows_per_second']:,.0f} rows/s)")
+    rss = peak_rss_mb()
+    if rss is not None:
+        print(f"Peak RSS: {rss:,.0f} MB")
+
+
+@app.cli.command("reindex-search")
+def reindex_search_command():
+    """Rebuild the resume full-text search index."""
+    rebuild_search_index()
+    print("✅ Resume search index rebuilt")
+
+
+@app.cli.command("index-resumes")
+@click.option("--compact", is_flag=True, help="Merge all index segments into one.")
+def index_resumes_command(compact):
+    """Add new resumes to the on-disk similarity index."""
+    index = get_similarity_index()
+    added = sync_index(index)
+    index.flush()
+    if compact:
+        index.compact()
+    print(f"✅ Indexed {added} new resumes ({len(index)} total, {len(index.segments)} segments)")
+
+
+@app.cli.command("evaluate-routes")
+@click.option("--routes", "routes_file", default=None, help="Candidate routing table (JSON); default: the live one.")
+@click.option("--days", default=30, show_default=True, help="History window.")
+@click.option("--min-samples", default=20, show_default=True)
+def evaluate_routes_command(routes_file, days, min_samples):
+    """Replay recorded Gemini calls against a routing table; exits 1 on a failure-rate regression."""
+    routes, prices = model_routing.load_routes(routes_file) if routes_file else (model_routing.ROUTES,
+                                                                                  model_routing.PRICES)
+    report = model_routing.evaluate(model_routing.load_history(days), routes, prices, min_samples)
+    if not report:
+        print("⚠️ No recorded model calls in the window")
+        return
+    for stage, result in report.items():
+        print(f"{stage}: {result['calls']} calls -> " +
+              ", ".join(f"{model} {count}" for model, count in result['models'].items()))
+        for label in ('recorded', 'candidate'):
+            row = result[label]
+            p50 = f"{row['p50_ms']:.0f}" if row['p50_ms'] is not None else "?"
+            p90 = f"{row['p90_ms']:.0f}" if row['p90_ms'] is not None else "?"
+            print(f"  {label:<10} p50 {p50:>6} ms  p90 {p90:>6} ms  cost ${row['cost_usd']:.4f}  "
+                  f"failures {row['failure_rate']:.1%}")
+        for item in result['unknown']:
+            print(f"  ⚠️ Unknown {item}")
+    if any(result['regression'] for result in report.values()):
+        print("❌ Failure rate regression: " + ", ".join(s for s, r in report.items() if r['regression']))
+        raise SystemExit(1)
+    print("✅ No failure rate regression")
+
+
+# Start loading Gemini/PyMuPDF/Pillow in the background; the first request
+# that needs them only waits for whatever is still outstanding.
+warmup.start_background_warmup()
+
+
+if __name__ == '__main__':
+    if config.env_flag("AUTO_MIGRATE"):
+        init_db()
     # Use environment variable PORT for Render
     port = int(os.environ.get('PORT', 5008))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Store AttireAnalysis frame logs in the packed binary format.
+
+Rows written with JSON text in posture_log / eye_log are packed at flush time
+into posture_log_packed / eye_log_packed (see frame_logs.py), and the text
+column is cleared. pack_frame_logs() converts existing rows in keyset
+batches (`flask --app app pack-frame-logs`).
+"""
+from sqlalchemy import bindparam, event, or_, select, update
+
+from db import db
+from frame_logs import encode_json_text
+from models import AttireAnalysis
+
+LOGS = ('posture', 'eye')
+
+
+def _pack(target):
+    for name in LOGS:
+        text = getattr(target, f'{name}_log')
+        if not text:
+            continue
+        try:
+            packed = encode_json_text(text)
+        except ValueError:
+            # Not valid JSON; keep the text as-is.
+            continue
+        setattr(target, f'{name}_log_packed', packed)
+        setattr(target, f'{name}_log', None)
+
+
+@event.listens_for(AttireAnalysis, 'before_insert')
+def _before_insert(mapper, connection, target):
+    _pack(target)
+
+
+@event.listens_for(AttireAnalysis, 'before_update')
+def _before_update(mapper, connection, target):
+    _pack(target)
+
+
+def pack_frame_logs(batch_size=50):
+    """Convert legacy JSON-text logs to the packed format. Must run in an app context.
+
+    Returns {'rows': ..., 'json_bytes': ..., 'packed_bytes': ...}.
+    """
+    table = AttireAnalysis.__table__
+    stats = {'rows': 0, 'json_bytes': 0, 'packed_bytes': 0, 'skipped': 0}
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.posture_log, table.c.eye_log)
+            .where(or_(table.c.posture_log.isnot(None), table.c.eye_log.isnot(None)), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for name in LOGS:
+            statement = update(table).where(table.c.id == bindparam('b_id')).values(
+                {f'{name}_log_packed': bindparam('v_packed'), f'{name}_log': None})
+            params = []
+            for row in rows:
+                text = getattr(row, f'{name}_log')
+                if not text:
+                    continue
+                try:
+                    packed = encode_json_text(text)
+                except ValueError:
+                    stats['skipped'] += 1
+                    continue
+                params.append({'b_id': row.id, 'v_packed': packed})
+                stats['json_bytes'] += len(text.encode('utf-8'))
+                stats['packed_bytes'] += len(packed)
+            if params:
+                db.session.execute(statement, params)
+
+        db.session.commit()
+        stats['rows'] += len(rows)
+        last_id = rows[-1].id
+    return stats
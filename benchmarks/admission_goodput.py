@@ -0,0 +1,112 @@
+"""Goodput of resume generation under overload, with and without admission control.
+
+Requests arrive open-loop at --load times the backend's capacity. The backend
+runs --capacity generations at a time in FIFO order, each taking --service
+seconds (a Gemini call under a provider-side concurrency limit). A client
+gives up after --timeout seconds, but its generation still runs when its turn
+comes, so a late response is wasted backend time.
+
+Without admission control every request is queued, the queue outgrows the
+timeout and almost every response arrives late. With admission.AdmissionController
+the excess is shed up front with 503 + Retry-After, and admitted requests
+finish in time.
+
+    python benchmarks/admission_goodput.py --load 2 --capacity 4 --duration 20
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, Rejected  # noqa: E402
+
+
+def run(args, controller):
+    jobs = queue.Queue()
+    lock = threading.Lock()
+    totals = {'good': 0, 'late': 0, 'rejected': 0, 'latency': []}
+
+    def worker():
+        while True:
+            done = jobs.get()
+            if done is None:
+                return
+            time.sleep(args.service)
+            done.set()
+
+    def client(n):
+        start = time.monotonic()
+        started = None
+        if controller is not None:
+            try:
+                started = controller.acquire(f"user{n % args.users}@example.com")
+            except Rejected:
+                with lock:
+                    totals['rejected'] += 1
+                return
+        done = threading.Event()
+        jobs.put(done)
+        in_time = done.wait(max(args.timeout - (time.monotonic() - start), 0))
+        if controller is not None:
+            done.wait()  # the slot is held until the generation really finishes
+            controller.release(started)
+        with lock:
+            if in_time:
+                totals['good'] += 1
+                totals['latency'].append(time.monotonic() - start)
+            else:
+                totals['late'] += 1
+
+    workers = [threading.Thread(target=worker) for _ in range(args.capacity)]
+    for thread in workers:
+        thread.start()
+    interval = args.service / (args.capacity * args.load)
+    clients = []
+    for n in range(int(args.duration / interval)):
+        clients.append(threading.Thread(target=client, args=(n,)))
+        clients[-1].start()
+        time.sleep(interval)
+    for thread in clients:
+        thread.join()
+    for _ in workers:
+        jobs.put(None)
+    for thread in workers:
+        thread.join()
+    return totals
+
+
+def report(label, totals, args):
+    latency = sorted(totals['latency'])
+    p95 = latency[int(len(latency) * 0.95) - 1] if latency else 0.0
+    print(f"  {label:<22} goodput {totals['good'] / args.duration:5.2f}/s   in time {totals['good']:>4}   "
+          f"late {totals['late']:>4}   rejected {totals['rejected']:>4}   p95 {p95:5.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--load", type=float, default=2.0, help="offered load as a multiple of capacity")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--service", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    ideal = args.capacity / args.service
+    print(f"offered {ideal * args.load:.1f}/s, capacity {args.capacity} x {args.service}s "
+          f"(max {ideal:.1f}/s), client timeout {args.timeout}s")
+    report("no admission control", run(args, None), args)
+    controller = AdmissionController("bench", max_inflight=args.capacity, latency_budget=args.timeout,
+                                     expected_service=args.service, rate_per_minute=0)
+    report("admission control", run(args, controller), args)
+    stats = controller.stats()
+    print(f"  queue time: mean {stats['queue_time']['mean_seconds']} s, max {stats['queue_time']['max_seconds']} s, "
+          f"overloaded {stats['rejected_overloaded']}, queue timeouts {stats['rejected_queue_timeout']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold-start profile for app.py.
+
+Runs two fresh interpreters:
+
+1. `python -X importtime -c "import app"`, which gives the per-package
+   import breakdown.
+2. A process that imports app, builds a test client and requests
+   /api/health. It reports the time from interpreter start to the first
+   healthy response.
+
+Usage:
+    python benchmarks/cold_start.py [--runs 5] [--top 15]
+
+Exits non-zero when the median time-to-first-healthy-response exceeds
+COLD_START_TARGET_MS. The default of 1000 ms sits between the ~650 ms
+measured after moving Gemini/PyMuPDF/Pillow off the import path and the
+~1300 ms measured before, so a regression back to eager imports fails it.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGET_MS = 1000
+
+HEALTH_PROBE = """
+import time
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter()
+client = app.app.test_client()
+resp = client.get('/api/health')
+t_health = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(f"{(t_import - t0) * 1000:.1f} {(t_health - t0) * 1000:.1f}")
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "cold_start.db"))
+    # The probe measures what blocks the first response, not the warm-up.
+    env["WARMUP_ON_START"] = "0"
+    return env
+
+
+def import_breakdown(top):
+    """Sum `-X importtime` self times per root package (fitz, google, ...)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True,
+    )
+    totals = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def time_to_healthy(runs):
+    imports, healthy, wall = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", HEALTH_PROBE],
+            cwd=ROOT, env=_env(), capture_output=True, text=True,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr)
+        t_import, t_health = map(float, result.stdout.strip().splitlines()[-1].split())
+        imports.append(t_import)
+        healthy.append(t_health)
+        wall.append(elapsed)
+    return imports, healthy, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print("Import-time breakdown (self time summed per root package, ms):")
+    for package, self_us in import_breakdown(args.top):
+        print(f"  {self_us / 1000:9.1f}  {package}")
+
+    imports, healthy, wall = time_to_healthy(args.runs)
+    target = float(os.getenv("COLD_START_TARGET_MS", DEFAULT_TARGET_MS))
+    median_healthy = statistics.median(healthy)
+    print()
+    print(f"import app:                 median {statistics.median(imports):8.1f} ms")
+    print(f"first healthy /api/health:  median {median_healthy:8.1f} ms (target {target:.0f} ms)")
+    print(f"process wall time:          median {statistics.median(wall):8.1f} ms")
+
+    if median_healthy > target:
+        print("❌ Cold start above target")
+        return 1
+    print("✅ Cold start within target")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway database (a temp SQLite file unless
+BENCH_DATABASE_URL is set). This module must be imported before app, db or
+models, because db.py reads DATABASE_URL at import time.
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def bench_database_url(name):
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return url
+    path = os.path.join(tempfile.gettempdir(), f"bench_{name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    return "sqlite:///" + path
+
+
+def bench_app(name):
+    """Import app against a fresh benchmark database and migrate it."""
+    os.environ["DATABASE_URL"] = bench_database_url(name)
+    os.environ["WARMUP_ON_START"] = "0"
+
+    import app as app_module
+    from migrations import run_migrations
+
+    with app_module.app.app_context():
+        run_migrations()
+    return app_module.app
+
+
+@contextmanager
+def timed(label, results=None):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if results is not None:
+        results[label] = elapsed
+    print(f"  {label:<40} {elapsed * 1000:10.1f} ms")
@@ -0,0 +1,89 @@
+"""Incremental DomainRanking maintenance vs. full recompute.
+
+Seeds --candidates rankings in one domain, backfills ranks with the
+ROW_NUMBER() recompute, then times ORM inserts, score changes and deletes
+that go through the incremental flush hooks. Finishes with a consistency
+check: a full recompute afterwards must change zero rows.
+
+    python benchmarks/domain_ranking.py --candidates 100000 --ops 200
+"""
+import argparse
+import random
+
+from common import bench_app, timed
+
+app = bench_app("domain_ranking")
+
+from sqlalchemy import insert  # noqa: E402
+
+from db import db  # noqa: E402
+from models import DomainRanking  # noqa: E402
+from ranking import recompute_domain_ranks  # noqa: E402
+
+DOMAIN = "Backend Engineer"
+
+
+def seed(n):
+    rows = [
+        {"session_id": i + 1, "email": f"c{i}@example.com", "candidate_name": f"Candidate {i}",
+         "domain": DOMAIN, "overall_level": "Good", "overall_score": round(random.uniform(0, 10), 2)}
+        for i in range(n)
+    ]
+    # Core insert bypasses the ORM hooks; ranks are backfilled below.
+    for start in range(0, n, 10000):
+        db.session.execute(insert(DomainRanking), rows[start:start + 10000])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=200)
+    args = parser.parse_args()
+    random.seed(42)
+    results = {}
+
+    with app.app_context():
+        seed(args.candidates)
+        print(f"{args.candidates:,} candidates in one domain, {args.ops} ops per phase")
+
+        with timed("full recompute (ROW_NUMBER)", results):
+            with db.engine.begin() as connection:
+                recompute_domain_ranks(connection, DOMAIN)
+
+        next_session = args.candidates + 1
+        inserted = []
+        with timed(f"{args.ops} incremental inserts", results):
+            for _ in range(args.ops):
+                row = DomainRanking(session_id=next_session, email=f"n{next_session}@example.com",
+                                    candidate_name="New", domain=DOMAIN, overall_level="Good",
+                                    overall_score=round(random.uniform(0, 10), 2))
+                next_session += 1
+                db.session.add(row)
+                db.session.commit()
+                inserted.append(row.id)
+
+        with timed(f"{args.ops} small score changes (+/-0.05)", results):
+            for row_id in inserted:
+                row = db.session.get(DomainRanking, row_id)
+                row.overall_score = max(0.0, min(10.0, row.overall_score + random.choice((-0.05, 0.05))))
+                db.session.commit()
+
+        with timed(f"{args.ops} deletes", results):
+            for row_id in inserted:
+                db.session.delete(db.session.get(DomainRanking, row_id))
+                db.session.commit()
+
+        with db.engine.begin() as connection:
+            drift = recompute_domain_ranks(connection, DOMAIN)
+        print(f"  rows corrected by final recompute: {drift} (expected 0)")
+
+        per_insert = results[f"{args.ops} incremental inserts"] / args.ops
+        print(f"  incremental insert: {per_insert * 1000:.2f} ms/op vs full recompute "
+              f"{results['full recompute (ROW_NUMBER)'] * 1000:.1f} ms/op")
+        if drift:
+            raise SystemExit("❌ incremental ranks drifted from full recompute")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Emotion-result listing latency and row size before/after chart offloading.
+
+Seeds --rows EmotionAnalysis rows with ~--chart-kb KB inline base64 charts
+(inserted with Core, so the offload hook does not fire). It then times
+"list every row for an email and JSON-encode to_dict()" before and after
+offload_chart_images().
+
+    python benchmarks/emotion_listing.py --rows 300 --chart-kb 300
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from common import bench_app
+
+app = bench_app("emotion_listing")
+os.environ.setdefault("BLOB_STORE_DIR", tempfile.mkdtemp(prefix="bench_blobs_"))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from db import db  # noqa: E402
+from emotion_charts import offload_chart_images  # noqa: E402
+from models import EmotionAnalysis  # noqa: E402
+
+
+def seed(rows, chart_kb):
+    png_header = b'\x89PNG\r\n\x1a\n'
+    for i in range(rows):
+        chart = base64.b64encode(png_header + os.urandom(chart_kb * 1024 * 3 // 4)).decode()
+        db.session.execute(insert(EmotionAnalysis), [{
+            "session_id": i + 1, "email": "bench@example.com", "top_emotion": "happy",
+            "second_emotion": "neutral", "distress_percentage": 3.5,
+            "emotion_distribution": json.dumps({"happy": 40, "neutral": 55, "sad": 5}),
+            "total_frames": 1800, "eq_score": 7.5, "chart_image": chart,
+        }])
+    db.session.commit()
+
+
+def avg_row_bytes():
+    table = EmotionAnalysis.__table__
+    lengths = [func.coalesce(func.length(c), 0) for c in (table.c.chart_image, table.c.emotion_distribution,
+                                                          table.c.email, table.c.chart_digest)]
+    return db.session.execute(select(func.avg(sum(lengths[1:], lengths[0])))).scalar()
+
+
+def time_listing(repeats=5):
+    samples = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        rows = EmotionAnalysis.query.filter_by(email="bench@example.com").all()
+        payload = json.dumps([row.to_dict() for row in rows])
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--chart-kb", type=int, default=300)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.rows, args.chart_kb)
+        before_row = avg_row_bytes()
+        before_time, before_payload = time_listing()
+
+        start = time.perf_counter()
+        stats = offload_chart_images()
+        migrate_time = time.perf_counter() - start
+
+        after_row = avg_row_bytes()
+        after_time, after_payload = time_listing()
+
+        print(f"{args.rows} rows, ~{args.chart_kb} KB charts")
+        print(f"  migration: {stats['rows_moved']} rows in {migrate_time:.2f} s")
+        print(f"  avg row size:     {before_row:12,.0f} B -> {after_row:10,.0f} B")
+        print(f"  listing payload:  {before_payload:12,} B -> {after_payload:10,} B")
+        print(f"  listing latency:  {before_time * 1000:12.1f} ms -> {after_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Streaming export throughput and memory vs. loading the table through the ORM.
+
+Seeds --rows resumes with ~--doc-kb KB structured JSON, then:
+
+1. streams them to JSONL + Parquet with exporter.export_tables() and reports
+   rows/s and peak RSS;
+2. adds --new-rows rows and checks that an incremental export picks up
+   exactly those;
+3. for comparison, loads the table with Resume.query.all() and JSON-encodes
+   it, the way a naive dump would (peak RSS only grows, so this runs last).
+
+    python benchmarks/export_stream.py --rows 50000 --doc-kb 4
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import bench_app
+
+app = bench_app("export_stream")
+
+from sqlalchemy import insert  # noqa: E402
+
+from db import db  # noqa: E402
+from exporter import export_tables, peak_rss_mb  # noqa: E402
+from models import Resume  # noqa: E402
+
+
+def seed(rows, doc_kb, start_id=0, start_time=None):
+    start_time = start_time or datetime(2026, 1, 1)
+    doc = {"name": "Bench Candidate", "summary": "x" * 200,
+           "experience": [{"company": f"Company {i}", "title": "Engineer", "highlights": ["y" * 80] * 4}
+                          for i in range(max(1, doc_kb * 1024 // 500))]}
+    text = json.dumps(doc)
+    for offset in range(0, rows, 5000):
+        db.session.execute(insert(Resume), [
+            {"profile_id": 1, "original_resume_text": "resume text " * 20, "structured_resume_data": text,
+             "job_description": "job description " * 10,
+             "created_at": start_time + timedelta(seconds=start_id + i)}
+            for i in range(offset, min(rows, offset + 5000))
+        ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--new-rows", type=int, default=1000)
+    parser.add_argument("--doc-kb", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    out_dir = tempfile.mkdtemp(prefix="bench_export_")
+
+    with app.app_context():
+        seed(args.rows, args.doc_kb)
+        db.session.expunge_all()
+        baseline_rss = peak_rss_mb()
+        print(f"{args.rows:,} resumes, ~{args.doc_kb} KB JSON each (baseline RSS {baseline_rss:,.0f} MB)")
+
+        [full] = export_tables(out_dir, ["resumes"], ("jsonl", "parquet"), chunk_size=args.chunk_size)
+        stream_rss = peak_rss_mb()
+        print(f"  streamed export:   {full['rows']:,} rows in {full['seconds']:.2f} s "
+              f"({full['rows_per_second']:,.0f} rows/s), peak RSS {stream_rss:,.0f} MB")
+
+        seed(args.new_rows, args.doc_kb, start_id=args.rows)
+        [incremental] = export_tables(out_dir, ["resumes"], ("jsonl", "parquet"), incremental=True,
+                                      chunk_size=args.chunk_size)
+        assert incremental["rows"] == args.new_rows, incremental["rows"]
+        print(f"  incremental:       {incremental['rows']:,} new rows in {incremental['seconds']:.2f} s")
+
+        start = time.perf_counter()
+        rows = Resume.query.all()
+        payload = "\n".join(json.dumps({
+            "id": r.id, "profile_id": r.profile_id, "original_resume_text": r.original_resume_text,
+            "structured_resume_data": json.loads(r.structured_resume_data),
+            "job_description": r.job_description, "created_at": r.created_at.isoformat()})
+            for r in rows)
+        orm_seconds = time.perf_counter() - start
+        print(f"  ORM .all() dump:   {len(rows):,} rows in {orm_seconds:.2f} s "
+              f"({len(rows) / orm_seconds:,.0f} rows/s), peak RSS {peak_rss_mb():,.0f} MB "
+              f"({len(payload):,} B held in memory)")
+
+    shutil.rmtree(out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Storage and serialization cost of JSON vs. packed frame logs.
+
+Synthesizes a --minutes long session at --fps frames per second. Posture and
+eye-contact labels change in runs, as in real footage. Compares JSON text
+against frame_logs.encode() on size, full decode time and per-minute
+summary time. Also checks that the round trip is lossless.
+
+    python benchmarks/frame_logs.py --minutes 30 --fps 30
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from frame_logs import FrameLog, encode  # noqa: E402
+
+
+def synth_log(frames, fps, labels, mean_run):
+    entries, label = [], random.choice(labels)
+    for i in range(frames):
+        if random.random() < 1.0 / mean_run:
+            label = random.choice(labels)
+        entries.append({"frame": i, "timestamp": round(i / fps, 3), "status": label,
+                        "confidence": round(random.uniform(0.5, 1.0), 2)})
+    return entries
+
+
+def best_of(fn, repeats=5):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--fps", type=int, default=30)
+    args = parser.parse_args()
+    random.seed(7)
+
+    frames = args.minutes * 60 * args.fps
+    logs = {
+        "posture": synth_log(frames, args.fps, ["Straight", "Slouched", "Leaning", "Unknown"], 90),
+        "eye": synth_log(frames, args.fps, ["Good", "Poor", "Unknown"], 45),
+    }
+
+    print(f"{args.minutes} min @ {args.fps} fps = {frames:,} frames per log")
+    for name, log in logs.items():
+        text = json.dumps(log)
+        packed = encode(log)
+        assert FrameLog(packed).to_json() == log, "round trip mismatch"
+
+        json_decode = best_of(lambda: json.loads(text))
+        packed_decode = best_of(lambda: FrameLog(packed).to_json())
+        packed_summary = best_of(lambda: FrameLog(packed).summarize(60))
+        json_summary = best_of(lambda: _json_summary(text))
+
+        print(f"  {name}_log")
+        print(f"    size:                {len(text):>12,} B -> {len(packed):>9,} B  ({len(text) / len(packed):.0f}x)")
+        print(f"    full decode:         {json_decode * 1000:>10.1f} ms -> {packed_decode * 1000:7.1f} ms")
+        print(f"    per-minute summary:  {json_summary * 1000:>10.1f} ms -> {packed_summary * 1000:7.1f} ms")
+
+
+def _json_summary(text):
+    buckets = {}
+    for entry in json.loads(text):
+        counts = buckets.setdefault(int(entry["timestamp"] // 60), {})
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return buckets
+
+
+if __name__ == "__main__":
+    main()
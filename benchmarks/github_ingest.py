@@ -0,0 +1,126 @@
+"""GitHub snapshot ingestion throughput: ORM cascades vs. github_ingest.
+
+For --candidates snapshots of --repos repositories x --files files each:
+
+- orm: GitHubProfile / Repository / CodeFile objects added through the
+  relationship cascades; a re-import deletes the repositories and adds
+  them again (there was no way to update in place);
+- bulk: github_ingest.ingest_snapshot() with multi-row inserts, diffing
+  and --batch-size files per transaction.
+
+Each path imports every snapshot, then re-imports it with --changed of
+the files edited. Reports files/s of snapshot content for both passes. Runs on
+SQLite by default; set BENCH_DATABASE_URL=postgresql://... for PostgreSQL.
+
+    python benchmarks/github_ingest.py --candidates 20 --repos 25 --files 40
+"""
+import argparse
+import copy
+import random
+import time
+
+from common import bench_app
+
+app = bench_app("github_ingest")
+
+from db import db  # noqa: E402
+from github_ingest import ingest_snapshot  # noqa: E402
+from models import CandidateProfile, CodeFile, GitHubProfile, Repository  # noqa: E402
+
+COMMON = ["MIT License\n" + "Permission is hereby granted... " * 30, "node_modules/\n.env\n" * 10]
+
+
+def snapshot(rng, n, repos, files):
+    return {
+        "login": f"dev{n}", "bio": "Backend developer", "followers": rng.randint(0, 500),
+        "following": 10, "public_repos": repos, "achievements": ["Pull Shark"],
+        "repositories": [{
+            "repo_name": f"repo-{r}", "url": f"https://github.com/dev{n}/repo-{r}", "language": "Python",
+            "description": "A service", "stars": rng.randint(0, 50), "forks": 1, "topics": ["python", "api"],
+            "readme": f"# repo-{r}\n" + "Usage notes. " * 80,
+            "code_files": [{"filename": "LICENSE", "content": COMMON[0]}, {"filename": ".gitignore", "content": COMMON[1]}]
+            + [{"filename": f"src/m{f}.py", "content": f"# {n}-{r}-{f}\n" + "def f(x):\n    return x * 2\n" * 40}
+               for f in range(files - 2)],
+        } for r in range(repos)],
+    }
+
+
+def edited(rng, snap, share):
+    snap = copy.deepcopy(snap)
+    for repo in snap["repositories"]:
+        for file in repo["code_files"]:
+            if rng.random() < share:
+                file["content"] += "\n# edited\n"
+    return snap
+
+
+def orm_import(profile_id, snap):
+    profile = db.session.get(CandidateProfile, profile_id)
+    github = profile.github_profile
+    if github is None:
+        github = GitHubProfile(profile=profile)
+        db.session.add(github)
+    github.repositories = []
+    db.session.flush()
+    github.bio, github.followers = snap["bio"], snap["followers"]
+    github.repositories = [
+        Repository(repo_name=repo["repo_name"], url=repo["url"], language=repo["language"],
+                   description=repo["description"], stars=repo["stars"], forks=repo["forks"], readme=repo["readme"],
+                   code_files=[CodeFile(filename=file["filename"], content=file["content"])
+                               for file in repo["code_files"]])
+        for repo in snap["repositories"]]
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def stored_files(profiles):
+    return db.session.query(CodeFile).join(Repository).join(GitHubProfile) \
+        .filter(GitHubProfile.profile_id.in_(profiles)).count()
+
+
+def run(label, ingest, profiles, snapshots, changed):
+    files = sum(len(repo["code_files"]) for snap in snapshots for repo in snap["repositories"])
+    rates = []
+    for snaps in (snapshots, changed):
+        start = time.perf_counter()
+        for profile_id, snap in zip(profiles, snaps):
+            ingest(profile_id, snap)
+        rates.append(files / (time.perf_counter() - start))
+    assert stored_files(profiles) == files, (label, stored_files(profiles), files)
+    print(f"  {label:<5} {rates[0]:>10,.0f} {rates[1]:>10,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--repos", type=int, default=25)
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--changed", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    with app.app_context():
+        snapshots = [snapshot(rng, n, args.repos, args.files) for n in range(args.candidates)]
+        changed = [edited(rng, snap, args.changed) for snap in snapshots]
+        profiles = {}
+        for label in ("orm", "bulk"):
+            profiles[label] = []
+            for n in range(args.candidates):
+                profile = CandidateProfile(email=f"{label}{n}@example.com", username=f"{label}{n}",
+                                           github_username="")
+                db.session.add(profile)
+                db.session.flush()
+                profiles[label].append(profile.id)
+            db.session.commit()
+
+        print(f"{args.candidates} snapshots x {args.repos} repos x {args.files} files on "
+              f"{db.engine.url.get_backend_name()}; files/s")
+        print(f"  {'':<5} {'import':>10} {'re-import':>10}  ({args.changed:.0%} of files changed)")
+        run("orm", orm_import, profiles["orm"], snapshots, changed)
+        run("bulk", lambda profile_id, snap: ingest_snapshot(profile_id, snap, batch_size=args.batch_size),
+            profiles["bulk"], snapshots, changed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Interview session report: per-row to_dict() calls vs. reports.get_report().
+
+Seeds completed sessions with --questions questions each, with an evaluation
+and speech scores per question, emotion, attire and a domain ranking. It
+compares three ways of assembling a session's results:
+
+- per-row to_dict() calls, as separate endpoints would make them (lazy loads);
+- reports.build_report() (fixed number of batched queries);
+- reports.get_report() on a cache miss, including storing the payload;
+- reports.get_report() on a cache hit.
+
+It fails if build_report() issues more than REPORT_MAX_QUERIES statements,
+and it checks that changing one child row invalidates the cached report.
+
+    python benchmarks/interview_report.py --questions 5,25,100
+"""
+import argparse
+import statistics
+import time
+
+from common import bench_app
+
+app = bench_app("interview_report")
+
+from sqlalchemy import delete  # noqa: E402
+
+from db import db  # noqa: E402
+from models import (AttireAnalysis, CandidateProfile, DomainRanking, EmotionAnalysis, GrammarAnalysis,  # noqa: E402
+                    InterviewEvaluation, InterviewQuestion, InterviewReport, InterviewSession, QuestionEvaluation,
+                    QuestionGrammarAnalysis)
+from query_counter import assert_max_queries, count_queries  # noqa: E402
+from reports import REPORT_MAX_QUERIES, build_report, get_report  # noqa: E402
+
+EMAIL = "bench@example.com"
+
+
+def seed(profile, questions):
+    session = InterviewSession(email=EMAIL, candidate_profile=profile, status="completed",
+                               applied_role="Backend Engineer")
+    evaluation = InterviewEvaluation(email=EMAIL, interview_session=session, overall_feedback="Solid",
+                                     final_average_score=7.5)
+    grammar = GrammarAnalysis(email=EMAIL, interview_session=session, overall_feedback="Clear")
+    for n in range(questions):
+        question = InterviewQuestion(session=session, question=f"Question {n}?", answer="An answer " * 40)
+        QuestionEvaluation(interview_evaluation=evaluation, interview_question=question, ps_score=7.0,
+                           ps_label="Good", at_score=6.5, at_label="Good", cf_score=8.0, cf_label="Good",
+                           average_score_out_of_10=7.2, feedback="Well structured")
+        QuestionGrammarAnalysis(grammar_analysis=grammar, interview_question=question, transcript="Transcript " * 30,
+                                vocabulary_score=7, grammar_score=8, pronunciation_score=7, diction_score=6,
+                                communication_clarity_score=8, voice_intonation_score=7, tone_score=7,
+                                pitch_score=6, rhythm_score=7, question_average_score=7.0, raw_feedback="ok")
+    db.session.add_all([
+        session,
+        EmotionAnalysis(email=EMAIL, interview_session=session, top_emotion="calm", second_emotion="happy",
+                        distress_percentage=3.0, emotion_distribution='{"calm": 80, "happy": 20}', eq_score=7.0),
+        DomainRanking(interview_session=session, email=EMAIL, candidate_name="Bench", domain="Backend Engineer",
+                      overall_level="Good", overall_score=7.5),
+    ])
+    db.session.flush()
+    db.session.add(AttireAnalysis(email=EMAIL, session_id=session.id, body_posture="Straight", eye_contact="Good",
+                                  attire_score=8))
+    db.session.commit()
+    return session.id
+
+
+def per_row(session_id):
+    """What separate per-entity endpoints would run today, each with a fresh session."""
+    def endpoint(fn):
+        result = fn()
+        db.session.expunge_all()
+        return result
+
+    return {
+        'questions': endpoint(lambda: [{'id': q.id, 'question': q.question, 'answer': q.answer}
+                                       for q in db.session.get(InterviewSession, session_id).questions]),
+        'evaluations': endpoint(lambda: [qa.to_dict() for qa in InterviewEvaluation.query.filter_by(
+            session_id=session_id).first().qa_evaluations]),
+        'grammar': endpoint(lambda: GrammarAnalysis.query.filter_by(session_id=session_id).first().to_dict()),
+        'emotion': endpoint(lambda: [e.to_dict() for e in EmotionAnalysis.query.filter_by(session_id=session_id)]),
+        'attire': endpoint(lambda: [a.to_dict() for a in AttireAnalysis.query.filter_by(session_id=session_id)]),
+        'ranking': endpoint(lambda: DomainRanking.query.filter_by(session_id=session_id).first().to_dict()),
+    }
+
+
+def measure(fn, repeats=5):
+    samples, queries = [], 0
+    for _ in range(repeats):
+        db.session.expunge_all()
+        with count_queries() as counter:
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        queries = counter.count
+    return statistics.median(samples) * 1000, queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", default="5,25,100")
+    args = parser.parse_args()
+
+    with app.app_context():
+        profile = CandidateProfile(username="bench", face_image_path="x.jpg", email=EMAIL,
+                                   github_username="bench", linkedin_link="x")
+        db.session.add(profile)
+        db.session.commit()
+
+        print(f"  {'questions':>9} {'per-row to_dict':>18} {'build_report':>18} {'miss + store':>18} "
+              f"{'cached':>18}")
+        for count in (int(n) for n in args.questions.split(",")):
+            session_id = seed(profile, count)
+            lazy_ms, lazy_queries = measure(lambda: per_row(session_id))
+
+            db.session.expunge_all()
+            session = db.session.get(InterviewSession, session_id)
+            with assert_max_queries(REPORT_MAX_QUERIES):
+                build_report(session)
+            build_ms, build_queries = measure(lambda: build_report(session))
+
+            def miss():
+                db.session.execute(delete(InterviewReport))
+                db.session.commit()
+                with count_queries() as counter:
+                    start = time.perf_counter()
+                    get_report(session_id, EMAIL)
+                    return time.perf_counter() - start, counter.count
+            samples = [miss() for _ in range(5)]
+            miss_ms, miss_queries = statistics.median(s for s, _ in samples) * 1000, samples[-1][1]
+            hit_ms, hit_queries = measure(lambda: get_report(session_id, EMAIL))
+
+            print(f"  {count:>9} " + "".join(f"{ms:>10.1f} ms {q:>3} q" for ms, q in (
+                (lazy_ms, lazy_queries), (build_ms, build_queries), (miss_ms, miss_queries), (hit_ms, hit_queries))))
+
+        # Changing one child row must invalidate the cached report
+        get_report(session_id, EMAIL)
+        qa = (QuestionGrammarAnalysis.query.join(GrammarAnalysis)
+              .filter(GrammarAnalysis.session_id == session_id).first())
+        qa.grammar_score = 2
+        db.session.commit()
+        report, cached = get_report(session_id, EMAIL)
+        changed = report['questions'][0]['grammar']['skills']['grammar']
+        assert not cached and changed == 2, (cached, changed)
+        assert get_report(session_id, EMAIL)[1]
+        print("  cache invalidated by a child update: ok")
+
+
+if __name__ == "__main__":
+    main()
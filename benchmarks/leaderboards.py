@@ -0,0 +1,181 @@
+"""Leaderboard pages and rank lookups: OFFSET/COUNT vs. leaderboards.py.
+
+Seeds --rows rankings across --domains domains with Zipf-like sizes (the
+largest domain holds about a sixth of all rows), backfills ranks and
+leaderboard summaries, then times on the largest domain:
+
+- page 1 (20 rows + total): ORDER BY ... OFFSET 0 plus COUNT(*) on the old
+  (domain, overall_score, id) index vs. the summary row;
+- a deep page at --depth: OFFSET vs. a keyset cursor on
+  ix_domain_rankings_leaderboard;
+- "my position": COUNT(*) of the rows ahead plus COUNT(*) of the domain vs.
+  leaderboards.positions() (email index + domain_rank + summary);
+- ORM inserts through the flush hooks, landing in the top list or behind it.
+  The summary refresh is one LIMIT K index scan; a top-list insert is
+  dominated by ranking.py shifting domain_rank for every row behind it.
+
+It fails if a keyset walk over a small domain differs from the OFFSET order.
+
+    python benchmarks/leaderboards.py --rows 1000000 --domains 200
+"""
+import argparse
+import random
+import statistics
+import time
+
+from common import bench_app
+
+app = bench_app("leaderboards")
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from db import db  # noqa: E402
+from leaderboards import TOP_K, encode_cursor, leaderboard_page, positions, rebuild_leaderboards  # noqa: E402
+from models import DomainRanking  # noqa: E402
+from ranking import recompute_domain_ranks  # noqa: E402
+
+PAGE = 20
+
+
+def seed(rows, domains):
+    rng = random.Random(7)
+    weights = [1 / (rank + 1) for rank in range(domains)]
+    names = [f"Domain {n:03d}" for n in range(domains)]
+    batch = []
+    for i in range(rows):
+        batch.append({"session_id": i + 1, "email": f"c{i}@example.com", "candidate_name": f"Candidate {i}",
+                      "domain": rng.choices(names, weights)[0], "overall_level": "Good",
+                      "overall_score": round(rng.uniform(0, 10), 2)})
+        if len(batch) == 20000:
+            db.session.execute(insert(DomainRanking), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(DomainRanking), batch)
+    db.session.commit()
+    return names[0]
+
+
+def measure(fn, repeats=20):
+    samples = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def offset_page(domain, offset):
+    rows = db.session.execute(text(
+        "SELECT id, candidate_name, overall_level, overall_score FROM domain_rankings WHERE domain = :d "
+        "ORDER BY overall_score DESC, id LIMIT :limit OFFSET :offset"),
+        {"d": domain, "limit": PAGE, "offset": offset}).all()
+    total = db.session.execute(text("SELECT COUNT(*) FROM domain_rankings WHERE domain = :d"), {"d": domain}).scalar()
+    return rows, total
+
+
+def count_rank(row):
+    ahead = db.session.execute(text(
+        "SELECT COUNT(*) FROM domain_rankings WHERE domain = :d AND "
+        "(overall_score > :s OR (overall_score = :s AND id < :id))"),
+        {"d": row.domain, "s": row.overall_score, "id": row.id}).scalar()
+    total = db.session.execute(text("SELECT COUNT(*) FROM domain_rankings WHERE domain = :d"),
+                               {"d": row.domain}).scalar()
+    return ahead + 1, total
+
+
+def use_index(name):
+    """Leave only `name` among the leaderboard indexes (the per-column domain index stays)."""
+    db.session.execute(text("DROP INDEX IF EXISTS ix_domain_rankings_domain_score"))
+    db.session.execute(text("DROP INDEX IF EXISTS ix_domain_rankings_leaderboard"))
+    if name == "ix_domain_rankings_domain_score":
+        db.session.execute(text(f"CREATE INDEX {name} ON domain_rankings (domain, overall_score, id)"))
+    else:
+        db.session.execute(text(f"CREATE INDEX {name} ON domain_rankings (domain, overall_score DESC, id)"))
+    db.session.commit()
+    db.session.execute(text("ANALYZE domain_rankings"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--domains", type=int, default=200)
+    parser.add_argument("--depth", type=int, default=50000)
+    parser.add_argument("--inserts", type=int, default=50)
+    args = parser.parse_args()
+
+    with app.app_context():
+        start = time.perf_counter()
+        domain = seed(args.rows, args.domains)
+        with db.engine.begin() as connection:
+            recompute_domain_ranks(connection)
+            rebuild_leaderboards(connection)
+        size = db.session.execute(text("SELECT COUNT(*) FROM domain_rankings WHERE domain = :d"),
+                                  {"d": domain}).scalar()
+        depth = min(args.depth, size - PAGE)
+        print(f"{args.rows:,} rankings in {args.domains} domains, largest {size:,} "
+              f"(seeded and backfilled in {time.perf_counter() - start:.1f} s), top list K={TOP_K}")
+
+        # Row just before the deep page, for the keyset cursor
+        anchor = db.session.execute(text(
+            "SELECT id, overall_score FROM domain_rankings WHERE domain = :d "
+            "ORDER BY overall_score DESC, id LIMIT 1 OFFSET :o"), {"d": domain, "o": depth - 1}).first()
+        cursor = encode_cursor(anchor.overall_score, anchor.id)
+        me = db.session.execute(text(
+            "SELECT id, email, domain, overall_score FROM domain_rankings WHERE domain = :d "
+            "ORDER BY overall_score, id DESC LIMIT 1 OFFSET :o"), {"d": domain, "o": size // 10}).first()
+
+        use_index("ix_domain_rankings_domain_score")
+        before = {
+            "page 1 + total": measure(lambda: offset_page(domain, 0)),
+            f"page at {depth:,}": measure(lambda: offset_page(domain, depth)),
+            "my position": measure(lambda: count_rank(me)),
+        }
+        use_index("ix_domain_rankings_leaderboard")
+        after = {
+            "page 1 + total": measure(lambda: leaderboard_page(domain, PAGE)),
+            f"page at {depth:,}": measure(lambda: leaderboard_page(domain, PAGE, cursor)),
+            "my position": measure(lambda: positions(me.email)),
+        }
+        page = leaderboard_page(domain, PAGE, cursor)
+        assert page["entries"][0]["rank"] == depth + 1, page["entries"][0]
+        assert positions(me.email)[0]["rank"] == count_rank(me)[0]
+
+        print(f"  {'':<20} {'OFFSET / COUNT':>16} {'leaderboards.py':>16}")
+        for label in before:
+            print(f"  {label:<20} {before[label]:>13.2f} ms {after[label]:>13.2f} ms")
+
+        # A keyset walk must visit the same rows, in the same order, as OFFSET
+        small = db.session.execute(text(
+            "SELECT domain FROM domain_leaderboards WHERE candidates > :k ORDER BY candidates LIMIT 1"),
+            {"k": TOP_K + PAGE}).scalar()
+        walked, next_cursor = [], None
+        while True:
+            page = leaderboard_page(small, PAGE, next_cursor)
+            walked += [entry["id"] for entry in page["entries"]]
+            next_cursor = page["next_cursor"]
+            if not next_cursor:
+                break
+        expected = db.session.execute(text(
+            "SELECT id FROM domain_rankings WHERE domain = :d ORDER BY overall_score DESC, id"),
+            {"d": small}).scalars().all()
+        assert walked == expected, small
+        print(f"  keyset walk of {small} ({len(expected)} rows) matches OFFSET order: ok")
+
+        # Incremental maintenance cost per committed ORM insert (ranks + summary)
+        next_session = args.rows + 1
+        for label, score in (("insert into top list", 10.0), ("insert behind cutoff", 0.0)):
+            samples = []
+            for _ in range(args.inserts):
+                db.session.add(DomainRanking(session_id=next_session, email=f"n{next_session}@example.com",
+                                             candidate_name="New", domain=domain, overall_level="Good",
+                                             overall_score=score))
+                next_session += 1
+                begin = time.perf_counter()
+                db.session.commit()
+                samples.append(time.perf_counter() - begin)
+            print(f"  {label:<20} {statistics.median(samples) * 1000:>13.2f} ms per commit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Model routing on a local fake model: single model vs. routed, plus offline evaluation.
+
+Runs a synthetic upload mix through model_routing.generate() with
+MODEL_BACKEND=fake (no API key, latency scaled down by --time-scale and
+reported back in model milliseconds):
+
+- phone photos (0.5-2 MP) and large scans (3-12 MP) for image OCR, first
+  PDF pages, and tailoring prompts of 3k-16k characters;
+- once with every stage on the default model (the old hard-coded setup) and
+  once with the default routing table, comparing p50/p90 latency, cost and
+  the failure rate recorded in model_calls;
+- then with MODEL_ROUTE_EXPLORE traffic, evaluating two candidate tables
+  offline against that history: the default one and an aggressive one that
+  sends large scans and long prompts to the light model. The aggressive
+  table must be flagged as a failure-rate regression, the default must not.
+
+    python benchmarks/model_routing.py --requests 600
+"""
+import argparse
+import json
+import os
+import random
+
+os.environ["MODEL_BACKEND"] = "fake"
+
+from common import bench_app
+
+app = bench_app("model_routing")
+
+import model_routing  # noqa: E402
+from db import db  # noqa: E402
+from model_routing import DEFAULT_MODEL, LIGHT_MODEL, evaluate, generate, load_history  # noqa: E402
+from models import ModelCall  # noqa: E402
+
+SINGLE = {stage: [{'name': 'default', 'model': DEFAULT_MODEL}] for stage in model_routing.STAGES}
+AGGRESSIVE = dict(model_routing.DEFAULT_ROUTES, ocr_image=[
+    {'name': 'light', 'model': LIGHT_MODEL, 'max_megapixels': 12.0, 'temperature': 0.0, 'max_output_tokens': 2048},
+    {'name': 'default', 'model': DEFAULT_MODEL, 'temperature': 0.0},
+], tailor=[
+    {'name': 'light', 'model': LIGHT_MODEL, 'max_input_chars': 20000},
+    {'name': 'default', 'model': DEFAULT_MODEL},
+])
+
+
+class Page:
+    """Stands in for a PIL image; the fake model only reads .size."""
+
+    def __init__(self, megapixels):
+        width = int((megapixels * 1e6 * 0.75) ** 0.5)
+        self.size = (width, int(width / 0.75))
+
+
+def workload(requests, seed=11):
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(requests):
+        if rng.random() < 0.6:
+            small = rng.random() < 0.7
+            page = Page(rng.uniform(0.5, 2.0) if small else rng.uniform(3.0, 12.0))
+            size = int(page.size[0] * page.size[1] * rng.uniform(0.15, 0.3))
+            calls.append(('ocr_image', ["Extract all resume text from this image.", page],
+                          model_routing.image_features(page, size)))
+        else:
+            page = Page(3.74)  # letter page at 200 dpi
+            calls.append(('ocr_pdf', ["Extract all resume text from this image (converted from PDF).", page],
+                          model_routing.image_features(page, rng.randint(60_000, 900_000), pages=rng.randint(1, 3))))
+        prompt = "x" * rng.randint(3000, 16000)
+        calls.append(('tailor', prompt, model_routing.text_features(prompt)))
+    return calls
+
+
+def run(calls, routes):
+    db.session.query(ModelCall).delete()
+    db.session.commit()
+    for stage, contents, features in calls:
+        try:
+            generate(stage, contents, features, parse=PARSERS[stage], routes=routes)
+        except ValueError:
+            pass  # recorded as a failed call
+    return load_history()
+
+
+def _ocr_text(text):
+    if not text:
+        raise ValueError("No text in model response")
+    return text
+
+
+PARSERS = {'ocr_image': _ocr_text, 'ocr_pdf': _ocr_text, 'tailor': json.loads}
+
+
+def summarize(history, scale):
+    latencies = sorted(call['latency_ms'] / scale for call in history)
+    cost = sum(model_routing._cost(model_routing.PRICES, call['model'], call) for call in history)
+    failures = sum(1 for call in history if not call['ok']) / len(history)
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.9)], cost, failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--time-scale", type=float, default=0.0005)
+    parser.add_argument("--explore", type=float, default=0.3)
+    args = parser.parse_args()
+    model_routing.FAKE_TIME_SCALE = args.time_scale
+
+    with app.app_context():
+        calls = workload(args.requests)
+        print(f"{args.requests} uploads ({len(calls)} model calls) on the fake model; latency in model ms")
+        print(f"  {'':<16} {'p50':>9} {'p90':>9} {'cost':>9} {'failures':>9}")
+        results = {}
+        for label, routes in (("single model", SINGLE), ("routed", model_routing.ROUTES)):
+            history = run(calls, routes)
+            results[label] = summarize(history, args.time_scale)
+            p50, p90, cost, failures = results[label]
+            print(f"  {label:<16} {p50:>6.0f} ms {p90:>6.0f} ms ${cost:>7.4f} {failures:>8.1%}")
+            per_stage = {}
+            for call in history:
+                per_stage.setdefault(call['stage'], []).append(call['latency_ms'] / args.time_scale)
+            print("    " + ", ".join(f"{stage} p50 {sorted(v)[len(v) // 2]:.0f} ms" for stage, v in per_stage.items()))
+        assert results["routed"][0] <= results["single model"][0], "routing raised median latency"
+        assert results["routed"][2] < results["single model"][2], "routing did not lower cost"
+        assert results["routed"][3] <= results["single model"][3] + 0.01, "routing raised the failure rate"
+
+        # History with exploration traffic, then offline evaluation of candidate tables
+        model_routing.EXPLORE = args.explore
+        history = run(calls, model_routing.ROUTES)
+        model_routing.EXPLORE = 0.0
+        print(f"  offline evaluation over {len(history)} calls recorded with {args.explore:.0%} exploration:")
+        verdicts = {}
+        for label, routes in (("default", model_routing.ROUTES), ("aggressive", AGGRESSIVE)):
+            report = evaluate(history, routes)
+            verdicts[label] = [stage for stage, result in report.items() if result['regression']]
+            for stage, result in report.items():
+                recorded, candidate = result['recorded'], result['candidate']
+                estimate = f"{candidate['p50_ms'] / args.time_scale:>5.0f}" if candidate['p50_ms'] else "    ?"
+                print(f"    {label:<10} {stage:<9} p50 {recorded['p50_ms'] / args.time_scale:>5.0f} -> "
+                      f"{estimate} ms, failures {recorded['failure_rate']:.1%} -> {candidate['failure_rate']:.1%}"
+                      + ("  REGRESSION" if result['regression'] else "")
+                      + ("  (unknown: " + "; ".join(result['unknown']) + ")" if result['unknown'] else ""))
+        assert not verdicts["default"], verdicts
+        assert verdicts["aggressive"], "aggressive table not flagged"
+        print("  default table passes, aggressive table flagged: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compare CandidateProfile.to_dict() with serializers.serialize_profile().
+
+Seeds one profile with --repos repositories of --files files each and
+reports query count, payload size and time for both paths. Fails if the
+eager serializer issues more than PROFILE_MAX_QUERIES statements.
+
+    python benchmarks/profile_serialization.py --repos 60 --files 20
+"""
+import argparse
+import json
+
+from common import bench_app, timed
+
+app = bench_app("profile_serialization")
+
+from db import db  # noqa: E402
+from models import CandidateProfile, CodeFile, GitHubProfile, Repository  # noqa: E402
+from query_counter import assert_max_queries, count_queries  # noqa: E402
+from serializers import PROFILE_MAX_QUERIES, load_profile, serialize_profile  # noqa: E402
+
+
+def seed(repos, files, file_size):
+    profile = CandidateProfile(email="bench@example.com", username="bench", github_username="bench")
+    github = GitHubProfile(profile=profile, bio="bio", achievements="[]")
+    body = "x" * file_size
+    for r in range(repos):
+        repo = Repository(github_profile=github, repo_name=f"repo-{r}", url=f"https://github.com/bench/repo-{r}",
+                          topics='["python"]', readme="# README\n" + body)
+        for f in range(files):
+            CodeFile(repository=repo, filename=f"file_{f}.py", content=body)
+    db.session.add(profile)
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repos", type=int, default=60)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--file-size", type=int, default=4000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(args.repos, args.files, args.file_size)
+
+        print(f"Profile with {args.repos} repos x {args.files} files ({args.file_size} B each)")
+        with count_queries() as lazy_counter, timed("to_dict (lazy relationships)"):
+            profile = CandidateProfile.query.filter_by(email="bench@example.com").first()
+            lazy_payload = json.dumps(profile.to_dict())
+        db.session.expunge_all()
+
+        with assert_max_queries(PROFILE_MAX_QUERIES) as eager_counter, timed("serialize_profile (select-in)"):
+            profile = load_profile(email="bench@example.com")
+            eager_payload = json.dumps(serialize_profile(profile))
+        db.session.expunge_all()
+
+        print(f"  queries: {lazy_counter.count} -> {eager_counter.count}")
+        print(f"  payload: {len(lazy_payload):,} B -> {len(eager_payload):,} B")
+
+
+if __name__ == "__main__":
+    main()
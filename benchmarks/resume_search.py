@@ -0,0 +1,98 @@
+"""Resume full-text search latency vs. a LIKE scan.
+
+Seeds --rows synthetic resumes through Core inserts (the index triggers fire
+as they would in production), then times each query through
+search.search_resumes(): all-resume scope and a single candidate's scope.
+It also times the LIKE '%term%' scan the search replaces, on the same data.
+
+    python benchmarks/resume_search.py --rows 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from common import bench_app
+
+app = bench_app("resume_search")
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from db import db  # noqa: E402
+from models import CandidateProfile, Resume  # noqa: E402
+from search import search_resumes  # noqa: E402
+
+SKILLS = ["python", "java", "kubernetes", "terraform", "docker", "react", "postgres", "aws", "gcp", "golang",
+          "rust", "spark", "kafka", "airflow", "django", "flask", "typescript", "graphql", "redis", "linux"]
+WEIGHTS = [30, 20, 6, 3, 15, 15, 10, 20, 6, 5, 1, 4, 4, 3, 8, 6, 12, 3, 8, 25]
+FILLER = ("built maintained designed led team services platform pipeline customers scale reliable "
+          "migrated improved latency delivered features mentored engineers production systems data").split()
+
+QUERIES = ["kubernetes AND terraform", "rust", '"site reliability" OR sre', "python -django", "python"]
+
+
+def synth_resume(rng):
+    skills = rng.choices(SKILLS, WEIGHTS, k=6)
+    words = rng.choices(FILLER, k=60)
+    for skill in skills:
+        words.insert(rng.randrange(len(words)), skill)
+    if rng.random() < 0.01:
+        words[rng.randrange(len(words))] = "site reliability"
+    structured = {"skills": sorted(set(skills)), "title": rng.choice(["Backend Engineer", "SRE", "Data Engineer"])}
+    return " ".join(words), json.dumps(structured)
+
+
+def seed(rows, profiles):
+    rng = random.Random(11)
+    db.session.execute(insert(CandidateProfile), [
+        {"username": f"c{i}", "face_image_path": "x.jpg", "email": f"c{i}@example.com",
+         "github_username": f"c{i}", "linkedin_link": "x"} for i in range(profiles)])
+    batch = []
+    for i in range(rows):
+        body, structured = synth_resume(rng)
+        batch.append({"profile_id": i % profiles + 1, "original_resume_text": body,
+                      "structured_resume_data": structured, "job_description": "Platform engineer"})
+        if len(batch) == 20000:
+            db.session.execute(insert(Resume), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Resume), batch)
+    db.session.commit()
+
+
+def median_ms(fn, repeats=7):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--profiles", type=int, default=10000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        start = time.perf_counter()
+        seed(args.rows, args.profiles)
+        print(f"{args.rows:,} resumes seeded and indexed in {time.perf_counter() - start:.1f} s")
+        print(f"  {'query':<28} {'all (top 20)':>14} {'own scope':>11} {'matches':>9}")
+        for query in QUERIES:
+            all_ms = median_ms(lambda: search_resumes(query, limit=20))
+            own_ms = median_ms(lambda: search_resumes(query, email="c7@example.com", limit=20))
+            matches = db.session.execute(text("SELECT count(*) FROM resume_fts WHERE resume_fts MATCH :q"),
+                                         {"q": query.replace("-django", "NOT django")}).scalar()
+            print(f"  {query:<28} {all_ms:>11.1f} ms {own_ms:>8.1f} ms {matches:>9,}")
+
+        like_ms = median_ms(lambda: db.session.execute(text(
+            "SELECT count(*) FROM resumes WHERE original_resume_text LIKE '%kubernetes%' "
+            "AND original_resume_text LIKE '%terraform%'")).scalar(), repeats=3)
+        print(f"  LIKE scan (kubernetes, terraform, unranked): {like_ms:,.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Top-k resume similarity query latency at scale.
+
+Builds a similarity.SimilarityIndex over --resumes synthetic resumes (Zipf
+vocabulary plus skills lists) in --segments flushes. It then reopens the
+index from disk (memory-mapped) and times top-k queries for synthetic job
+descriptions on one thread.
+
+    python benchmarks/similarity_index.py --resumes 500000 --queries 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from similarity import SimilarityIndex  # noqa: E402
+
+SKILLS = ["Python", "Java", "Kubernetes", "Terraform", "Docker", "React", "PostgreSQL", "AWS", "GCP", "Go",
+          "Rust", "Spark", "Kafka", "Airflow", "Django", "Flask", "TypeScript", "GraphQL", "Redis", "Linux",
+          "Machine Learning", "PyTorch", "TensorFlow", "Node.js", "C++", "C#", "Azure", "Snowflake", "dbt", "Tableau"]
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def synth_text(vocabulary, cdf, rng, words, skills):
+    picks = np.searchsorted(cdf, [rng.random() for _ in range(words)])
+    text = [vocabulary[i] for i in picks]
+    for skill in skills:
+        text.insert(rng.randrange(len(text)), skill)
+    return " ".join(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=500000)
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    rng = random.Random(5)
+
+    vocabulary = make_vocabulary(30000, rng)
+    ranks = np.arange(1, len(vocabulary) + 1)
+    cdf = np.cumsum(1.0 / ranks) / (1.0 / ranks).sum()
+
+    path = tempfile.mkdtemp(prefix="bench_similarity_")
+    index = SimilarityIndex(path)
+    start = time.perf_counter()
+    per_segment = -(-args.resumes // args.segments)
+    for resume_id in range(1, args.resumes + 1):
+        skills = rng.sample(SKILLS, 6)
+        index.add(resume_id, synth_text(vocabulary, cdf, rng, args.words, skills), skills)
+        if resume_id % per_segment == 0:
+            index.flush()
+    index.flush()
+    build_seconds = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+    start = time.perf_counter()
+    index = SimilarityIndex(path)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    queries = [synth_text(vocabulary, cdf, rng, 80, rng.sample(SKILLS, 5)) for _ in range(args.queries)]
+    index.query(queries[0], k=args.k)  # touch the mapped pages once
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.query(query, k=args.k)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+
+    print(f"{len(index):,} resumes in {len(index.segments)} segments, {size / 1e6:,.0f} MB on disk")
+    print(f"  build + flush:   {build_seconds:8.1f} s")
+    print(f"  open (mmap):     {load_ms:8.1f} ms")
+    print(f"  top-{args.k} query:    median {statistics.median(samples):.1f} ms, "
+          f"p95 {samples[int(len(samples) * 0.95) - 1]:.1f} ms, max {samples[-1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Dedupe rate of single-flight coalescing for duplicate generation requests.
+
+Simulates --requests logical resume generations from distinct users. Each one
+is submitted once, twice (double-click) or three times (retry, second tab)
+with --jitter seconds between copies, and each generation takes --service
+seconds. Every submission goes through singleflight.SingleFlight keyed like
+/api/generate-resume; the script reports how many generations actually ran.
+
+    python benchmarks/singleflight_dedupe.py --requests 200
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from singleflight import SingleFlight, request_key  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--service", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--copies", default="70,20,10", help="percent of requests sent 1, 2 and 3 times")
+    args = parser.parse_args()
+    rng = random.Random(3)
+    weights = [int(w) for w in args.copies.split(",")]
+
+    flight = SingleFlight("bench")
+    lock = threading.Lock()
+    runs = []
+
+    def generate(user):
+        time.sleep(args.service)
+        with lock:
+            runs.append(user)
+        return {"resume_id": len(runs)}, 200
+
+    def submit(user, delay):
+        time.sleep(delay)
+        key = request_key(f"{user}@example.com", b"%PDF resume bytes " + user.encode(), "Backend Engineer")
+        flight.do(key, lambda: generate(user))
+
+    threads = []
+    for n in range(args.requests):
+        copies = rng.choices([1, 2, 3], weights)[0]
+        start = rng.uniform(0, args.requests * args.service / 20)
+        for copy in range(copies):
+            delay = start + (rng.uniform(0, args.jitter) if copy else 0)
+            threads.append(threading.Thread(target=submit, args=(f"user{n}", delay)))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = flight.stats()
+    print(f"{len(threads)} submissions for {args.requests} distinct generations "
+          f"({len(threads) - args.requests} duplicates) in {time.perf_counter() - started:.1f} s")
+    print(f"  without coalescing: {len(threads)} generations, {len(threads) - args.requests} duplicate resumes")
+    print(f"  with coalescing:    {len(runs)} generations, {len(runs) - args.requests} duplicate resumes")
+    print(f"  dedupe rate {stats['dedupe_rate']:.1%} of submissions "
+          f"({stats['shared_in_process']} shared / {stats['executed']} executed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Skill questions answered by scanning resume JSON vs. the resume skills index.
+
+Seeds --resumes resumes (written with Core, so the write-time events do not
+index them), times skill_facets.backfill(), then answers two questions both
+ways:
+
+- "how many candidates list Go and Kafka" (all time);
+- "top 20 skills for resumes created in the last 30 days".
+
+The scan reads every structured_resume_data row, decodes it and counts with
+the same matcher, which is what answering these without the index took.
+The indexed path is skill_facets.facet_counts(). Both must give the same
+answers.
+
+    python benchmarks/skill_facets.py --resumes 20000
+"""
+import argparse
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from common import bench_app, timed
+
+app = bench_app("skill_facets")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from db import db  # noqa: E402
+from models import CandidateProfile, Resume  # noqa: E402
+from skill_facets import backfill, extract_skills, facet_counts  # noqa: E402
+
+SKILLS = ["Python", "Go", "golang", "Kafka", "Apache Kafka", "k8s", "Kubernetes", "Docker", "AWS", "Amazon Web Services",
+          "PostgreSQL", "postgres", "Redis", "React", "ReactJS", "Node.js", "TypeScript", "Java", "Spring Boot",
+          "Terraform", "GCP", "gRPC", "CI/CD", "Jenkins", "Machine Learning", "PyTorch", "SQL", "Linux", "Agile"]
+POSITIONS = ["Senior Backend Engineer", "Java Developer", "Golang Engineer", "Data Engineer - Spark",
+             "Machine Learning Engineer", "Software Engineer", "DevOps Engineer"]
+
+
+def seed(rng, count, now):
+    profiles = []
+    for n in range(count // 3):
+        profiles.append({"id": n + 1, "username": f"c{n}", "email": f"c{n}@example.com", "github_username": ""})
+    db.session.execute(insert(CandidateProfile.__table__), profiles)
+    rows = []
+    for n in range(count):
+        data = {"name": f"C {n}", "professional_summary": "Engineer " * 40,
+                "skills": rng.sample(SKILLS, rng.randint(6, 14)),
+                "work_experience": [{"position": rng.choice(POSITIONS), "company": "Acme",
+                                     "responsibilities": ["Built things " * 10] * 3} for _ in range(rng.randint(1, 3))]}
+        rows.append({"profile_id": rng.randint(1, len(profiles)), "original_resume_text": "text",
+                     "job_description": "jd", "structured_resume_data": json.dumps(data),
+                     "created_at": now - timedelta(days=rng.uniform(0, 365))})
+    for start in range(0, len(rows), 1000):
+        db.session.execute(insert(Resume.__table__), rows[start:start + 1000])
+    db.session.commit()
+
+
+def scan(since=None):
+    """(candidates with Go and Kafka, top 20 skills by candidates) by decoding every row."""
+    resumes = Resume.__table__
+    query = select(resumes.c.profile_id, resumes.c.structured_resume_data)
+    if since is not None:
+        query = query.where(resumes.c.created_at >= since)
+    skills_by_profile = {}
+    for profile_id, data in db.session.execute(query):
+        skills_by_profile.setdefault(profile_id, set()).update(extract_skills(data))
+    both = sum(1 for skills in skills_by_profile.values() if {"Go", "Kafka"} <= skills)
+    counts = Counter(skill for skills in skills_by_profile.values() for skill in skills)
+    return both, sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:20]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=20000)
+    args = parser.parse_args()
+    rng = random.Random(4)
+    now = datetime.utcnow()
+    month = now - timedelta(days=30)
+
+    with app.app_context():
+        seed(rng, args.resumes, now)
+        print(f"{args.resumes} resumes")
+        with timed("backfill (index every resume)"):
+            resumes, rows = backfill()
+        print(f"  {rows} resume skills")
+
+        with timed("scan: Go and Kafka, all time"):
+            both, _ = scan()
+        with timed("scan: top 20 skills, last 30 days"):
+            _, top = scan(month)
+        with timed("index: Go and Kafka, all time"):
+            indexed_both = facet_counts(["Go", "Kafka"], limit=0)["candidates"]
+        with timed("index: top 20 skills, last 30 days"):
+            indexed_top = facet_counts(since=month, limit=20)["facets"]
+        with timed("index: top skills of Go and Kafka people"):
+            facet_counts(["Go", "Kafka"], limit=20)
+
+        assert both == indexed_both, (both, indexed_both)
+        assert top == [(facet["skill"], facet["candidates"]) for facet in indexed_top], (top, indexed_top)
+        print(f"  {both} candidates list Go and Kafka; top skill this month: {top[0][0]} ({top[0][1]})")
+
+
+if __name__ == "__main__":
+    main()
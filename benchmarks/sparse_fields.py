@@ -0,0 +1,81 @@
+"""Full to_dict() vs. a sparse ?fields= selection on wide Transcription rows.
+
+Seeds --rows transcriptions with ~--text-kb KB transcripts/notes and JSON
+flashcards/quiz/exercises blobs, then times "load every row for a user and
+JSON-encode it" for the full shape and for --fields.
+
+    python benchmarks/sparse_fields.py --rows 500 --text-kb 40 --fields id,summary
+"""
+import argparse
+import json
+import statistics
+import time
+
+from common import bench_app
+
+app = bench_app("sparse_fields")
+
+from sqlalchemy import insert  # noqa: E402
+
+from db import db  # noqa: E402
+from fieldsets import load_options, resolve_fields  # noqa: E402
+from models import CandidateProfile, Transcription  # noqa: E402
+from query_counter import count_queries  # noqa: E402
+
+
+def seed(rows, text_kb):
+    profile = CandidateProfile(username="bench", face_image_path="bench.jpg", email="bench@example.com",
+                               github_username="bench", linkedin_link="https://linkedin.com/in/bench")
+    db.session.add(profile)
+    db.session.commit()
+
+    text = "lorem ipsum " * (text_kb * 1024 // 12)
+    cards = json.dumps([{"front": f"term {i}", "back": text[:200]} for i in range(text_kb * 2)])
+    quiz = json.dumps([{"question": f"q{i}", "options": ["a", "b", "c", "d"], "answer": "a"}
+                       for i in range(text_kb * 2)])
+    for i in range(rows):
+        db.session.execute(insert(Transcription), [{
+            "id": f"t{i:06d}", "user_id": profile.id, "original_transcript": text,
+            "translated_transcript": text, "detailed_notes": text, "summary": f"summary {i}",
+            "flashcards": cards, "quiz": quiz, "exercises": quiz, "source_type": "video_upload",
+        }])
+    db.session.commit()
+    return profile.id
+
+
+def time_listing(user_id, fields, repeats=5):
+    samples = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        with count_queries(db.engine) as counter:
+            start = time.perf_counter()
+            query = Transcription.query
+            if fields is not None:
+                query = query.options(*load_options(Transcription, fields))
+            rows = query.filter_by(user_id=user_id).all()
+            payload = json.dumps([row.to_dict(fields=fields) for row in rows])
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples), len(payload), counter.count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--text-kb", type=int, default=40)
+    parser.add_argument("--fields", default="id,summary")
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_id = seed(args.rows, args.text_kb)
+        fields = resolve_fields(Transcription, args.fields)
+        full_time, full_payload, full_queries = time_listing(user_id, None)
+        sparse_time, sparse_payload, sparse_queries = time_listing(user_id, fields)
+
+        print(f"{args.rows} transcriptions, ~{args.text_kb} KB text columns, fields={args.fields}")
+        print(f"  queries:   {full_queries:>12} -> {sparse_queries}")
+        print(f"  payload:   {full_payload:>12,} B -> {sparse_payload:,} B")
+        print(f"  latency:   {full_time * 1000:>10.1f} ms -> {sparse_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
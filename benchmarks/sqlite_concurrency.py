@@ -0,0 +1,151 @@
+"""SQLite write throughput under concurrent readers and writers, before/after WAL.
+
+Runs the same workload against two fresh SQLite files:
+
+- before: the old engine options (pool_size=10, max_overflow=20,
+  pool_pre_ping) with the default rollback journal;
+- after:  db.engine_options() + db.configure_engine() (WAL,
+  synchronous=NORMAL, busy_timeout, cache/mmap, serialized writer).
+
+--writers threads repeat the generate_resume commit (look up the profile,
+insert a ~4 KB resume, commit). Meanwhile --readers threads list one
+candidate's resumes and, one time in ten, scan the whole table.
+The script reports committed writes/s, "database is locked" failures, write
+latency and reads/s.
+
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 8 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from db import configure_engine, db, engine_options  # noqa: E402
+from models import CandidateProfile, Resume  # noqa: E402
+
+LEGACY_OPTIONS = {'pool_size': 10, 'max_overflow': 20, 'pool_pre_ping': True, 'pool_recycle': 3600}
+WORDS = "python kubernetes led team services platform pipeline customers scale reliable latency".split()
+
+
+def make_engine(mode, name, threads):
+    path = os.path.join(tempfile.gettempdir(), f"bench_sqlite_{name}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    url = "sqlite:///" + path
+    if mode == "before":
+        return create_engine(url, **LEGACY_OPTIONS)
+    options = engine_options(url)
+    options['pool_size'] = max(options['pool_size'], threads)  # one connection per request thread, as in the app
+    engine = create_engine(url, **options)
+    configure_engine(engine)
+    return engine
+
+
+def seed(engine, profiles, resumes):
+    db.metadata.create_all(engine, tables=[CandidateProfile.__table__, Resume.__table__])
+    rng = random.Random(1)
+    with Session(engine) as session:
+        session.execute(insert(CandidateProfile), [
+            {"username": f"c{i}", "face_image_path": "x.jpg", "email": f"c{i}@example.com",
+             "github_username": f"c{i}", "linkedin_link": "x"} for i in range(profiles)])
+        session.execute(insert(Resume), [resume_row(rng, rng.randrange(profiles) + 1) for _ in range(resumes)])
+        session.commit()
+
+
+def resume_row(rng, profile_id):
+    body = " ".join(rng.choices(WORDS, k=600))
+    return {"profile_id": profile_id, "original_resume_text": body, "job_description": "Backend Engineer",
+            "structured_resume_data": json.dumps({"name": "Candidate", "ats_score": rng.randint(40, 95)})}
+
+
+def run(engine, args):
+    stop = time.monotonic() + args.seconds
+    lock = threading.Lock()
+    totals = {'writes': 0, 'locked': 0, 'reads': 0, 'latency': []}
+
+    def writer(n):
+        rng = random.Random(n)
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    email = f"c{rng.randrange(args.profiles)}@example.com"
+                    profile_id = session.execute(
+                        select(CandidateProfile.id).where(CandidateProfile.email == email)).scalar_one()
+                    session.execute(insert(Resume), [resume_row(rng, profile_id)])
+                    session.commit()
+                ok = True
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                ok = False
+            with lock:
+                if ok:
+                    totals['writes'] += 1
+                    totals['latency'].append(time.perf_counter() - start)
+                else:
+                    totals['locked'] += 1
+
+    def reader(n):
+        rng = random.Random(1000 + n)
+        while time.monotonic() < stop:
+            try:
+                with engine.connect() as connection:
+                    if rng.random() < 0.1:
+                        # an analytics-style scan (exports, ranking) holding its read lock for a while
+                        connection.execute(text("SELECT sum(length(original_resume_text)) FROM resumes")).scalar()
+                    else:
+                        connection.execute(text(
+                            "SELECT id, created_at, length(structured_resume_data) FROM resumes "
+                            "WHERE profile_id = :p ORDER BY id DESC LIMIT 20"),
+                            {"p": rng.randrange(args.profiles) + 1}).all()
+                with lock:
+                    totals['reads'] += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--resumes", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers + {args.readers} readers for {args.seconds:.0f} s, "
+          f"{args.resumes:,} seeded resumes")
+    for mode in ("before", "after"):
+        engine = make_engine(mode, mode, args.writers + args.readers)
+        seed(engine, args.profiles, args.resumes)
+        totals = run(engine, args)
+        engine.dispose()
+        latency = sorted(totals['latency']) or [0.0]
+        print(f"  {mode:<7} {totals['writes'] / args.seconds:8.1f} writes/s   locked errors {totals['locked']:>5}   "
+              f"write p50 {latency[len(latency) // 2] * 1000:7.1f} ms  p99 {latency[int(len(latency) * 0.99)] * 1000:7.1f} ms"
+              f"   {totals['reads'] / args.seconds:8.1f} reads/s")
+
+
+if __name__ == "__main__":
+    main()
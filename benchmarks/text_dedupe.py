@@ -0,0 +1,99 @@
+"""Storage saved by content-addressed README / source file text.
+
+Seeds --candidates GitHub imports the way they were stored before text
+blobs existed (inline text, written with Core so the flush events do not
+move it). Repositories draw from a shared pool of LICENSE files,
+boilerplate configs, vendored libraries and forked READMEs, plus files of
+their own. Then runs text_blobs.dedupe_existing() and reports the bytes
+moved and saved, its throughput, and the SQLite file size before and after
+VACUUM.
+
+    python benchmarks/text_dedupe.py --candidates 300
+"""
+import argparse
+import os
+import random
+import time
+
+from common import bench_app
+
+app = bench_app("text_dedupe")
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from db import db  # noqa: E402
+from models import CandidateProfile, CodeFile, GitHubProfile, Repository  # noqa: E402
+from text_blobs import dedupe_existing, stored_bytes  # noqa: E402
+
+SHARED = {
+    "LICENSE": ["MIT License\n\nCopyright (c) {year}\n" + "Permission is hereby granted, free of charge... " * 20
+                for year in ("", "2023")] + ["Apache License, Version 2.0 " * 400],
+    ".gitignore": ["__pycache__/\n*.pyc\nnode_modules/\n.env\n" * 8, "dist/\nbuild/\n*.log\n" * 12],
+    "package.json": ['{"name": "app", "scripts": {"start": "react-scripts start"}}' * 15],
+    "vendor/jquery.min.js": ["/*! jQuery v3.6.0 */" + "!function(e,t){...}" * 4000],
+    "README.md": ["# Create React App\n\nThis project was bootstrapped with Create React App. " * 40,
+                  "# Awesome list fork\n" + "- [link](https://example.com)\n" * 300],
+}
+
+
+def seed(rng, candidates):
+    files = repos = 0
+    for n in range(candidates):
+        profile = CandidateProfile(email=f"c{n}@example.com", username=f"c{n}", github_username=f"c{n}")
+        GitHubProfile(profile=profile, achievements="[]")
+        db.session.add(profile)
+        db.session.flush()
+        for r in range(rng.randint(3, 12)):
+            readme = rng.choice(SHARED["README.md"]) if rng.random() < 0.4 else f"# repo {n}-{r}\n" + "notes " * 300
+            repo_id = db.session.execute(insert(Repository.__table__).values(
+                github_profile_id=profile.github_profile.id,
+                repo_name=f"repo-{r}", url=f"https://github.com/c{n}/repo-{r}", readme=readme)).inserted_primary_key[0]
+            rows = [{"repository_id": repo_id, "filename": name, "content": rng.choice(variants)}
+                    for name, variants in SHARED.items() if name != "README.md" and rng.random() < 0.5]
+            rows += [{"repository_id": repo_id, "filename": f"src/module_{f}.py",
+                      "content": f"# {n}-{r}-{f}\n" + "def handler(event):\n    return process(event)\n" * 60}
+                     for f in range(rng.randint(2, 8))]
+            db.session.execute(insert(CodeFile.__table__), rows)
+            files += len(rows)
+            repos += 1
+    db.session.commit()
+    return repos, files
+
+
+def file_size():
+    url = db.engine.url
+    return os.path.getsize(url.database) if url.get_backend_name() == "sqlite" else None
+
+
+def vacuum():
+    if db.engine.url.get_backend_name() == "sqlite":
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with app.app_context():
+        repos, files = seed(random.Random(3), args.candidates)
+        vacuum()
+        before = file_size()
+        print(f"{args.candidates} candidates, {repos} repositories, {files} files; "
+              f"{stored_bytes()[0]:,} bytes of inline text")
+
+        start = time.perf_counter()
+        stats = dedupe_existing(batch_size=args.batch_size)
+        seconds = time.perf_counter() - start
+        vacuum()
+        print(f"  dedupe: {stats['rows']} rows in {seconds:.1f}s ({stats['rows'] / seconds:,.0f} rows/s)")
+        print(f"  text:   {stats['bytes_moved']:,} -> {stats['bytes_stored']:,} bytes in {stats['blobs_created']} "
+              f"blobs ({stats['bytes_saved'] / stats['bytes_moved']:.0%} saved)")
+        if before:
+            print(f"  SQLite file: {before:,} -> {file_size():,} bytes")
+
+
+if __name__ == "__main__":
+    main()
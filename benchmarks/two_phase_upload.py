@@ -0,0 +1,115 @@
+"""Generation latency with and without the two-phase upload.
+
+Simulates --sessions users on the fake model (MODEL_BACKEND=fake, latency
+scaled by --time-scale). Each user picks a resume (a phone photo or a PDF),
+spends a think time writing the job description (log-normal, median
+--think seconds of real time before scaling), then submits:
+
+- one-phase: POST /api/generate-resume with the file; extraction and
+  structuring both run inside the request;
+- two-phase: POST /api/resume-uploads when the file is picked, then
+  /api/generate-resume with the upload id after the think time, so
+  extraction overlaps the typing.
+
+It reports p50/p90 of the /api/generate-resume request time (what the user
+waits for, including queueing behind GENERATION_MAX_INFLIGHT), in model
+seconds, and how many generations found the text ready.
+
+    python benchmarks/two_phase_upload.py --sessions 60 --threads 8
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import threading
+import time
+
+os.environ["MODEL_BACKEND"] = "fake"
+os.environ["GENERATION_USER_RATE"] = "0"
+
+from common import bench_app
+
+app = bench_app("two_phase_upload")
+
+from jose import jwt  # noqa: E402
+
+import model_routing  # noqa: E402
+import warmup  # noqa: E402
+from app import upload_extraction  # noqa: E402
+from jwt_auth import SECRET_KEY  # noqa: E402
+
+
+def resume_files():
+    image = warmup.load_pil_image().new("RGB", (900, 1200), "white")
+    photo = io.BytesIO()
+    image.save(photo, "PNG")
+    doc = warmup.load_fitz().open()
+    doc.new_page().insert_text((72, 72), "Priya Raman - Backend Engineer")
+    return [("resume.png", "image/png", photo.getvalue()), ("resume.pdf", "application/pdf", doc.tobytes())]
+
+
+def session(n, two_phase, think, files, results):
+    client = app.test_client()
+    email = f"user{n}@example.com"
+    headers = {"Authorization": "Bearer " + jwt.encode({"email": email, "username": f"user{n}"}, SECRET_KEY,
+                                                       algorithm="HS256")}
+    filename, content_type, data = files
+    form = {"job_description": f"Backend engineer, role {n}"}
+    if two_phase:
+        response = client.post("/api/resume-uploads", headers=headers, content_type="multipart/form-data",
+                               data={"resume_file": (io.BytesIO(data), filename, content_type)})
+        form["upload_id"] = response.get_json()["upload_id"]
+    else:
+        form["resume_file"] = (io.BytesIO(data), filename, content_type)
+    time.sleep(think)
+    start = time.perf_counter()
+    response = client.post("/api/generate-resume", headers=headers, data=form, content_type="multipart/form-data")
+    assert response.status_code == 200, response.get_json()
+    results.append(time.perf_counter() - start)
+
+
+def run(args, two_phase):
+    rng = random.Random(5)
+    files = resume_files()
+    results, pending = [], []
+    semaphore = threading.Semaphore(args.threads)
+
+    def worker(n, think, chosen):
+        with semaphore:
+            session(n, two_phase, think, chosen, results)
+
+    for n in range(args.sessions):
+        think = rng.lognormvariate(0, 0.6) * args.think * args.time_scale
+        thread = threading.Thread(target=worker, args=(n + (10000 if two_phase else 0), think, rng.choice(files)))
+        thread.start()
+        pending.append(thread)
+    for thread in pending:
+        thread.join()
+    waits = sorted(seconds / args.time_scale for seconds in results)
+    return statistics.median(waits), waits[int(len(waits) * 0.9)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--think", type=float, default=30.0, help="median seconds spent on the job description")
+    parser.add_argument("--time-scale", type=float, default=0.02)
+    args = parser.parse_args()
+    model_routing.FAKE_TIME_SCALE = args.time_scale
+
+    print(f"{args.sessions} sessions, median think time {args.think:.0f} s; "
+          f"/api/generate-resume wait in model seconds")
+    one = run(args, two_phase=False)
+    two = run(args, two_phase=True)
+    stats = upload_extraction.stats()
+    print(f"  {'':<10} {'p50':>7} {'p90':>7}")
+    print(f"  {'one-phase':<10} {one[0]:>6.1f}s {one[1]:>6.1f}s")
+    print(f"  {'two-phase':<10} {two[0]:>6.1f}s {two[1]:>6.1f}s")
+    print(f"  text ready on arrival: {stats['ready']} of {args.sessions} "
+          f"(waited on extraction: {stats['waited'] + stats['polled']})")
+
+
+if __name__ == "__main__":
+    main()
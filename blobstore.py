@@ -0,0 +1,228 @@
+"""Content-addressed storage for binary artifacts (rendered charts, etc.).
+
+Blobs are named by the SHA-256 of their bytes, so identical artifacts are
+stored once and a digest never changes meaning. That is what lets
+/api/blobs/<digest> be served with an immutable, year-long cache lifetime.
+Database rows keep only the 64-character digest.
+
+The storage backend is pluggable. LocalBlobBackend (the default) fans files
+out as <root>/ab/cd/<digest>. GCSBlobBackend keeps them in a Cloud Storage
+bucket (BLOB_STORE_BACKEND=gcs, BLOB_STORE_BUCKET). Other backends register
+with register_backend() and are selected with BLOB_STORE_BACKEND.
+
+A backend is `durable` when its blobs outlive the process's host. Writers
+that would drop the database copy of an artifact (emotion_charts.py) only
+do so on a durable store. The local backend is not durable on Cloud Run,
+whose container disk is wiped on restart, unless BLOB_STORE_LOCAL_DURABLE
+says otherwise (e.g. a mounted volume).
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+import config
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+_DATA_URI_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?;base64,')
+
+# Magic-byte prefixes used to pick a Content-Type when serving.
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+    (b'<svg', 'image/svg+xml'),
+    (b'<?xml', 'image/svg+xml'),
+)
+
+
+def is_digest(value):
+    return bool(value) and bool(DIGEST_RE.match(value))
+
+
+def sniff_mime(head):
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def decode_base64_payload(value):
+    """Decode a base64 string or data URI. Returns bytes, or None if invalid."""
+    if not value:
+        return None
+    payload = _DATA_URI_RE.sub('', value.strip(), count=1)
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+class LocalBlobBackend:
+    """Hash-named files on the local filesystem, written atomically."""
+
+    def __init__(self, root, durable=True):
+        self.root = os.path.abspath(root)
+        self.durable = durable
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def write(self, digest, data):
+        path = self._path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return True
+
+    def open(self, digest):
+        return open(self._path(digest), 'rb')
+
+    def local_path(self, digest):
+        """Filesystem path for zero-copy serving, or None if not local."""
+        return self._path(digest)
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+class GCSBlobBackend:
+    """Hash-named objects in a Google Cloud Storage bucket."""
+
+    durable = True
+
+    def __init__(self, bucket_name, prefix='blobs/'):
+        from google.cloud import storage  # deferred: only this backend needs it
+
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix
+
+    def _blob(self, digest):
+        return self.bucket.blob(self.prefix + digest)
+
+    def exists(self, digest):
+        return self._blob(digest).exists()
+
+    def write(self, digest, data):
+        from google.api_core.exceptions import PreconditionFailed
+
+        try:
+            # if_generation_match=0: only create, never overwrite (the content is fixed by the name)
+            self._blob(digest).upload_from_string(data, if_generation_match=0)
+        except PreconditionFailed:
+            return False
+        return True
+
+    def open(self, digest):
+        return self._blob(digest).open('rb')
+
+    def delete(self, digest):
+        from google.api_core.exceptions import NotFound
+
+        try:
+            self._blob(digest).delete()
+            return True
+        except NotFound:
+            return False
+
+
+def _local_backend():
+    # Cloud Run sets K_SERVICE; its container filesystem does not survive a restart
+    durable = config.env_flag('BLOB_STORE_LOCAL_DURABLE', not os.getenv('K_SERVICE'))
+    return LocalBlobBackend(os.getenv('BLOB_STORE_DIR', 'blobs'), durable=durable)
+
+
+def _gcs_backend():
+    bucket = os.getenv('BLOB_STORE_BUCKET')
+    if not bucket:
+        raise ValueError("BLOB_STORE_BACKEND=gcs needs BLOB_STORE_BUCKET")
+    return GCSBlobBackend(bucket)
+
+
+_backends = {'local': _local_backend, 'gcs': _gcs_backend}
+_store = None
+_store_lock = threading.Lock()
+
+
+def register_backend(name, factory):
+    """Make a backend available as BLOB_STORE_BACKEND=<name>."""
+    _backends[name] = factory
+
+
+class BlobStore:
+    def __init__(self, backend):
+        self.backend = backend
+
+    @property
+    def durable(self):
+        return getattr(self.backend, 'durable', True)
+
+    def put(self, data):
+        """Store bytes and return their hex SHA-256 digest (idempotent)."""
+        return self.write(data)[0]
+
+    def write(self, data):
+        """Store bytes; (digest, created), created=False when the blob already existed."""
+        digest = hashlib.sha256(data).hexdigest()
+        return digest, bool(self.backend.write(digest, data))
+
+    def open(self, digest):
+        if not is_digest(digest):
+            raise FileNotFoundError(digest)
+        return self.backend.open(digest)
+
+    def exists(self, digest):
+        return is_digest(digest) and self.backend.exists(digest)
+
+    def local_path(self, digest):
+        getter = getattr(self.backend, 'local_path', None)
+        return getter(digest) if getter and is_digest(digest) else None
+
+    def delete(self, digest):
+        return is_digest(digest) and self.backend.delete(digest)
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                name = os.getenv('BLOB_STORE_BACKEND', 'local')
+                if name not in _backends:
+                    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {name}")
+                _store = BlobStore(_backends[name]())
+    return _store
+
+
+def set_blob_store(store):
+    """Replace the process-wide store (e.g. for a one-off migration target)."""
+    global _store
+    _store = store
+
+
+def blob_url(digest):
+    return f"/api/blobs/{digest}" if digest else None
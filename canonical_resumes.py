@@ -0,0 +1,136 @@
+"""Parse-once canonical resumes.
+
+Generating a resume used to be a single Gemini call that both parsed the raw
+resume text and tailored it to the job description. It re-sent the raw text
+for every posting a candidate applied to. Generation is now two stages:
+
+- parse: the raw text becomes canonical JSON (everything in the resume,
+  nothing tailored). It is stored in canonical_resumes, keyed by profile and
+  a digest of the whitespace-normalized text, and reused by every later
+  generation from the same text;
+- tailor: a compact outline of the canonical resume plus the job
+  description gives the one-page tailored resume and its ATS score. The
+  model picks entries by number and returns only what it rewrites (summary,
+  skills, bullets, descriptions); contact details, companies, titles, dates
+  and links are copied from the parse by expand(). The output, which
+  dominates the call's latency and cost, is correspondingly shorter, and
+  those facts cannot be altered by the model.
+
+PARSER_VERSION is part of the key: bump it when the parse prompt or schema
+changes, so that old parses are not reused.
+"""
+import hashlib
+import json
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import CanonicalResume
+
+PARSER_VERSION = 1
+CONTACT_FIELDS = ('name', 'email', 'phone', 'location')
+
+# Sections the tailoring selects entries from by reference -> the fields it may rewrite
+REWRITTEN = {
+    'work_experience': ('responsibilities',),
+    'projects': ('description', 'technologies'),
+    'education': ('relevant_coursework',),
+    'certifications': (),
+}
+
+_table = CanonicalResume.__table__
+
+
+def text_digest(resume_text):
+    return hashlib.sha256(" ".join(resume_text.split()).encode('utf-8')).hexdigest()
+
+
+def _find(profile_id, digest):
+    return db.session.execute(select(_table.c.id, _table.c.data).where(
+        _table.c.profile_id == profile_id, _table.c.text_sha256 == digest,
+        _table.c.parser_version == PARSER_VERSION)).first()
+
+
+def get_canonical(profile_id, resume_text, parse):
+    """(canonical id, data, parsed) for the profile's resume text.
+
+    `parse(resume_text)` runs only if this text has no stored parse yet
+    (parsed=True); its exceptions propagate and nothing is stored.
+    """
+    digest = text_digest(resume_text)
+    row = _find(profile_id, digest)
+    if row is not None:
+        return row.id, json.loads(row.data), False
+
+    data = parse(resume_text)
+    try:
+        result = db.session.execute(insert(_table).values(
+            profile_id=profile_id, text_sha256=digest, parser_version=PARSER_VERSION, data=json.dumps(data)))
+        db.session.commit()
+        return result.inserted_primary_key[0], data, True
+    except IntegrityError:
+        # Parsed concurrently (e.g. by the upload's background extraction); keep the stored one
+        db.session.rollback()
+        row = _find(profile_id, digest)
+        return row.id, json.loads(row.data), True
+
+
+def _scalar(value):
+    return ", ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+
+
+def compact(data):
+    """The canonical resume as a terse outline for the tailoring prompt.
+
+    Field names appear once per section (a header line), each entry is one
+    `|`-separated row numbered [n] for reference, long lists become indented
+    bullets, and empty values and the contact details are dropped.
+    """
+    lines = []
+    for key, value in data.items():
+        if value in (None, "", [], {}) or key in CONTACT_FIELDS:
+            continue
+        if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+            fields = []
+            for item in value:
+                fields += [k for k, v in item.items() if k not in fields and v not in (None, "", [])
+                           and not (isinstance(v, list) and sum(len(str(x)) for x in v) > 80)]
+            lines.append(f"{key}: {' | '.join(fields)}")
+            for n, item in enumerate(value):
+                lines.append(f"[{n}] " + " | ".join(_scalar(item.get(field) or "") for field in fields))
+                for k, v in item.items():
+                    if k not in fields and v:
+                        lines.append(f"  {k}:")
+                        lines += [f"  * {entry}" for entry in v]
+        else:
+            lines.append(f"{key}: {_scalar(value)}")
+    return "\n".join(lines)
+
+
+def expand(canonical, tailored):
+    """The full tailored resume from the tailoring output and the canonical parse.
+
+    Entries of the REWRITTEN sections come back as {"ref": n, <rewritten
+    fields>} (or a bare n); all their other fields are copied from canonical
+    entry n. Unknown refs are dropped; entries without a ref are kept as given.
+    """
+    result = {field: canonical.get(field) or "" for field in CONTACT_FIELDS}
+    for key, value in tailored.items():
+        if key in CONTACT_FIELDS:
+            continue
+        if key in REWRITTEN and isinstance(value, list):
+            entries = canonical.get(key) or []
+            expanded = []
+            for item in value:
+                ref = item.get('ref') if isinstance(item, dict) else item
+                if isinstance(ref, int) and 0 <= ref < len(entries) and isinstance(entries[ref], dict):
+                    entry = dict(entries[ref])
+                    if isinstance(item, dict):
+                        entry.update({field: item[field] for field in REWRITTEN[key] if field in item})
+                    expanded.append(entry)
+                elif isinstance(item, dict) and 'ref' not in item:
+                    expanded.append(item)
+            value = expanded
+        result[key] = value
+    return result
@@ -0,0 +1,30 @@
+import os
+from dotenv import load_dotenv
+
+# Load .env exactly once per process. Every other module imports this one
+# instead of calling load_dotenv() itself.
+load_dotenv()
+
+
+def env_flag(name, default=False):
+    """Read a boolean environment variable ("1", "true", "yes", "on")."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        return default
+
+
+def env_float(name, default):
+    value = os.getenv(name)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        return default
@@ -1,8 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 import os
-from dotenv import load_dotenv
+import re
+import sqlite3
+import threading
 
-load_dotenv()
+from sqlalchemy import event
+
+import config  # noqa: F401  (loads .env)
 
 db = SQLAlchemy()
 
@@ -13,4 +17,113 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///database2.db")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-print(f"✅ Using database: {'PostgreSQL (Production)' if 'postgresql' in DATABASE_URL else 'SQLite (Development)'}")
\ No newline at end of file
+print(f"✅ Using database: {'PostgreSQL (Production)' if 'postgresql' in DATABASE_URL else 'SQLite (Development)'}")
+
+# SQLite connection settings (see configure_engine)
+SQLITE_WAL = config.env_flag("SQLITE_WAL", True)
+SQLITE_BUSY_TIMEOUT_MS = config.env_int("SQLITE_BUSY_TIMEOUT_MS", 10000)
+SQLITE_CACHE_SIZE_KB = config.env_int("SQLITE_CACHE_SIZE_KB", 32768)
+SQLITE_MMAP_SIZE = config.env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+
+# Textual SQL only; compiled statements say what they are (see _is_write)
+_LEADING_COMMENTS = re.compile(r'\s*(?:--[^\n]*(?:\n|$)|/\*.*?\*/)', re.DOTALL)
+_WRITE_KEYWORD = re.compile(r'(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+_CTE = re.compile(r'WITH\b', re.IGNORECASE)
+_CTE_WRITE = re.compile(r'\b(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+_writer_lock = threading.Lock()
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database behind `url`.
+
+    SQLite gets a pool of reader connections (writes are serialized by
+    configure_engine). PostgreSQL gets one pooled connection per request
+    thread (DB_WORKER_THREADS) plus overflow, capped so that WEB_CONCURRENCY
+    worker processes stay within DB_MAX_CONNECTIONS.
+    """
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url.rstrip('/') == 'sqlite:':
+            return {}
+        return {
+            'pool_size': config.env_int("DB_POOL_SIZE", 8),
+            'max_overflow': config.env_int("DB_MAX_OVERFLOW", 8),
+            'pool_timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+        }
+
+    threads = config.env_int("DB_WORKER_THREADS", 4)
+    pool_size = config.env_int("DB_POOL_SIZE", threads)
+    max_overflow = config.env_int("DB_MAX_OVERFLOW", max(2, threads // 2))
+    max_connections = config.env_int("DB_MAX_CONNECTIONS", 0)
+    if max_connections:
+        per_worker = max(1, max_connections // max(1, config.env_int("WEB_CONCURRENCY", 1)))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': config.env_float("DB_POOL_TIMEOUT", 10.0),
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _is_write(statement, context):
+    if context is not None and context.compiled is not None and not context.is_text:
+        return context.isinsert or context.isupdate or context.isdelete
+    # text() / driver SQL: skip leading comments, and look inside a WITH for DML
+    position = 0
+    while match := _LEADING_COMMENTS.match(statement, position):
+        if match.end() == position:
+            break
+        position = match.end()
+    body = statement[position:].lstrip()
+    if _CTE.match(body):
+        return _CTE_WRITE.search(body) is not None
+    return _WRITE_KEYWORD.match(body) is not None
+
+
+def _acquire_writer(conn, cursor, statement, parameters, context, executemany):
+    # pysqlite opens the transaction at the first write statement, so taking
+    # the lock here makes this connection the only writer until it is returned.
+    if 'writer_lock' in conn.info or not _is_write(statement, context):
+        return
+    if not _writer_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+        # Same error SQLite gives when busy_timeout runs out; never write unserialized
+        raise sqlite3.OperationalError("database is locked (timed out waiting for the writer lock)")
+    conn.info['writer_lock'] = True
+
+
+def _release_writer(dbapi_connection, connection_record, *args):
+    if connection_record is not None and connection_record.info.pop('writer_lock', False):
+        _writer_lock.release()
+
+
+def configure_engine(engine):
+    """Per-dialect connection setup; call once after db.init_app(), in an app context.
+
+    On SQLite every new connection gets WAL journaling, busy_timeout,
+    synchronous=NORMAL and larger cache/mmap sizes, and write transactions in
+    this process take a writer lock held until the connection goes back to
+    the pool. Writers then queue in Python instead of retrying on SQLITE_BUSY,
+    while readers keep using the pool concurrently (WAL readers never block).
+    """
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    event.listen(engine, 'connect', _set_sqlite_pragmas)
+    event.listen(engine, 'before_cursor_execute', _acquire_writer)
+    event.listen(engine.pool, 'checkin', _release_writer)
+    event.listen(engine.pool, 'invalidate', _release_writer)
+    engine.dispose()  # connections opened before the hooks were installed lack the pragmas
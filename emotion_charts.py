@@ -0,0 +1,140 @@
+"""Keep EmotionAnalysis chart images out of the database.
+
+New or updated rows that carry a base64 chart_image are offloaded to the
+blob store at flush time: the decoded bytes are stored under their SHA-256,
+chart_digest is set and chart_image is cleared. offload_chart_images() moves
+existing rows the same way in keyset-paginated batches
+(`flask --app app offload-charts`).
+
+Both only run on a durable blob store (see blobstore.py). On a store that
+can lose its files, such as the local disk of a Cloud Run container, chart
+images stay inline in the database.
+
+Blobs are written before the rows that reference them are committed. The
+session remembers which blobs its transaction created. If the transaction
+ends without a commit (rollback, or a session closed after an error), those
+that no committed row references are deleted, so a failed write leaves no
+orphans.
+"""
+from sqlalchemy import bindparam, event, func, select, update
+from sqlalchemy.orm import Session, object_session
+
+from blobstore import decode_base64_payload, get_blob_store
+from db import db
+from models import EmotionAnalysis
+
+
+def _store_chart(session, store, data):
+    """Put chart bytes in the store, remembering a newly created blob until the transaction ends."""
+    digest, created = store.write(data)
+    if created and session is not None:
+        session.info.setdefault('new_chart_blobs', set()).add(digest)
+    return digest
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    session.info.pop('new_chart_blobs', None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _after_transaction_end(session, transaction):
+    # Reached with blobs still recorded only when the transaction was rolled back or closed
+    if transaction.parent is not None:
+        return
+    digests = session.info.pop('new_chart_blobs', None)
+    if not digests:
+        return
+    table = EmotionAnalysis.__table__
+    try:
+        # A fresh connection: only committed rows count
+        with session.get_bind().connect() as conn:
+            referenced = set(conn.execute(select(table.c.chart_digest)
+                                          .where(table.c.chart_digest.in_(digests))).scalars())
+        store = get_blob_store()
+        for digest in digests - referenced:
+            store.delete(digest)
+    except Exception as e:
+        # Runs inside rollback/close: never mask the error that caused it
+        print(f"⚠️ Could not delete {len(digests)} chart blob(s) of an uncommitted transaction:", e)
+
+
+def _offload(target):
+    if not target.chart_image:
+        return
+    store = get_blob_store()
+    if not store.durable:
+        return
+    data = decode_base64_payload(target.chart_image)
+    if data is None:
+        # Not base64 (e.g. an external URL); leave it inline.
+        return
+    target.chart_digest = _store_chart(object_session(target), store, data)
+    target.chart_image = None
+
+
+@event.listens_for(EmotionAnalysis, 'before_insert')
+def _before_insert(mapper, connection, target):
+    _offload(target)
+
+
+@event.listens_for(EmotionAnalysis, 'before_update')
+def _before_update(mapper, connection, target):
+    _offload(target)
+
+
+def offload_chart_images(batch_size=100):
+    """Move inline chart_image values to the blob store. Must run in an app context.
+
+    Each batch reads only (id, chart_image), writes the blobs, then clears the
+    column in one executemany UPDATE and commits, so progress survives an
+    interruption and memory stays bounded by the batch. Returns a stats dict.
+    """
+    table = EmotionAnalysis.__table__
+    store = get_blob_store()
+    if not store.durable:
+        raise RuntimeError("The blob store is not durable; chart images must stay in the database")
+    statement = update(table).where(table.c.id == bindparam('b_id')) \
+        .values(chart_digest=bindparam('v_digest'), chart_image=None)
+
+    stats = {'rows_moved': 0, 'rows_skipped': 0, 'bytes_moved': 0, 'distinct_blobs': 0}
+    digests = set()
+    last_id = 0
+    try:
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, table.c.chart_image)
+                .where(table.c.chart_image.isnot(None), table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            params = []
+            for row_id, chart_image in rows:
+                data = decode_base64_payload(chart_image)
+                if data is None:
+                    stats['rows_skipped'] += 1
+                    continue
+                digest = _store_chart(db.session(), store, data)
+                digests.add(digest)
+                params.append({'b_id': row_id, 'v_digest': digest})
+                stats['bytes_moved'] += len(chart_image)
+
+            if params:
+                db.session.execute(statement, params)
+            db.session.commit()
+            stats['rows_moved'] += len(params)
+            last_id = rows[-1][0]
+    except BaseException:
+        db.session.rollback()  # deletes the blobs this batch created (see _after_transaction_end)
+        raise
+
+    stats['distinct_blobs'] = len(digests)
+    return stats
+
+
+def inline_chart_bytes():
+    """Total size of chart images still stored inline."""
+    return db.session.execute(select(func.coalesce(func.sum(func.length(EmotionAnalysis.chart_image)), 0))).scalar()
@@ -0,0 +1,237 @@
+"""Streaming export of analytics tables to JSONL and Parquet / Arrow IPC.
+
+Rows are read with yield_per (a server-side cursor on PostgreSQL) and written
+chunk by chunk, so memory stays bounded by chunk_size however large the
+table is. JSON columns are decoded on the fly: as nested objects in JSONL,
+and as compact JSON text in the columnar formats. Each chunk becomes one
+Parquet row group / Arrow record batch.
+
+Incremental exports only include rows past the watermark stored in
+<out_dir>/_watermarks.json. The watermark is the (timestamp column, id) of
+the last row exported. It is only advanced once every file for a table has
+been written.
+"""
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import and_, or_, select, types
+
+from db import db
+from models import DomainRanking, GrammarAnalysis, InterviewEvaluation, Resume
+
+# table name -> (model, watermark timestamp column, JSON columns)
+EXPORTS = {
+    'resumes': (Resume, 'created_at', ('structured_resume_data',)),
+    'domain_rankings': (DomainRanking, 'last_updated', ()),  # ranking.py bumps it when a rank shifts
+    'grammar_analysis': (GrammarAnalysis, 'analysis_timestamp', ()),
+    'interview_evaluations': (InterviewEvaluation, 'timestamp', ()),
+}
+
+FORMATS = ('jsonl', 'parquet', 'arrow')
+WATERMARK_FILE = '_watermarks.json'
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def _decode_json(value):
+    if isinstance(value, (str, bytes)):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _encode_json(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+class JsonlWriter:
+    def __init__(self, path, json_columns):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.json_columns = json_columns
+
+    def write(self, rows):
+        lines = []
+        for row in rows:
+            record = {key: _jsonable(value) for key, value in row.items()}
+            for name in self.json_columns:
+                record[name] = _decode_json(record[name])
+            lines.append(json.dumps(record, ensure_ascii=False))
+        self.file.write('\n'.join(lines) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def _arrow_type(pa, column, json_columns):
+    if column.name in json_columns:
+        return pa.string()
+    column_type = column.type
+    if isinstance(column_type, types.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, types.Integer):
+        return pa.int64()
+    if isinstance(column_type, (types.Float, types.Numeric)):
+        return pa.float64()
+    if isinstance(column_type, types.DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, types.LargeBinary):
+        return pa.binary()
+    return pa.string()
+
+
+class ArrowWriter:
+    """Parquet (one row group per chunk) or Arrow IPC file (one record batch per chunk)."""
+
+    def __init__(self, path, table, json_columns, fmt='parquet'):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.json_columns = json_columns
+        self.schema = pa.schema([(column.name, _arrow_type(pa, column, json_columns)) for column in table.columns])
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+
+            self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        if self.json_columns:
+            rows = [{**row, **{name: _encode_json(row[name]) for name in self.json_columns}} for row in rows]
+        self.writer.write_batch(self.pa.RecordBatch.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _open_writer(fmt, path, table, json_columns):
+    if fmt == 'jsonl':
+        return JsonlWriter(path, json_columns)
+    return ArrowWriter(path, table, json_columns, fmt)
+
+
+def load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermarks(out_dir, watermarks):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def _export_query(model, watermark_column, watermark):
+    table = model.__table__
+    column = table.c[watermark_column]
+    query = select(*table.c).order_by(column, table.c.id)
+    if watermark:
+        since = datetime.fromisoformat(watermark['value'])
+        query = query.where(or_(column > since, and_(column == since, table.c.id > watermark['id'])))
+    return query
+
+
+def export_table(name, out_dir, formats=('jsonl', 'parquet'), incremental=False, chunk_size=1000,
+                 watermarks=None, run_stamp=None):
+    """Stream one table to `out_dir` in each of `formats`. Must run in an app context.
+
+    Returns {'table', 'rows', 'seconds', 'rows_per_second', 'files'}. When
+    `watermarks` (a dict from load_watermarks) is given, the table's entry is
+    updated in place; the caller saves it.
+    """
+    model, watermark_column, json_columns = EXPORTS[name]
+    table = model.__table__
+    run_stamp = run_stamp or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    watermark = (watermarks or {}).get(name) if incremental else None
+
+    start = time.perf_counter()
+    paths = {fmt: os.path.join(out_dir, f"{name}-{run_stamp}.{fmt}") for fmt in formats}
+    writers = {}
+    rows_written, last = 0, None
+    try:
+        result = db.session.execute(
+            _export_query(model, watermark_column, watermark).execution_options(yield_per=chunk_size))
+        for partition in result.partitions():
+            rows = [row._asdict() for row in partition]
+            if not writers:
+                for fmt, path in paths.items():
+                    writers[fmt] = _open_writer(fmt, path + '.tmp', table, json_columns)
+            for writer in writers.values():
+                writer.write(rows)
+            rows_written += len(rows)
+            last = rows[-1]
+        result.close()
+    except Exception:
+        for writer in writers.values():
+            writer.close()
+        # Includes a writer that failed while opening, after creating its file
+        for path in paths.values():
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+        raise
+
+    for fmt, writer in writers.items():
+        writer.close()
+        os.replace(paths[fmt] + '.tmp', paths[fmt])
+
+    if watermarks is not None and last is not None and last[watermark_column] is not None:
+        watermarks[name] = {'value': last[watermark_column].isoformat(), 'id': last['id']}
+
+    seconds = time.perf_counter() - start
+    return {
+        'table': name,
+        'rows': rows_written,
+        'seconds': seconds,
+        'rows_per_second': rows_written / seconds if seconds else 0.0,
+        'files': [paths[fmt] for fmt in writers],
+    }
+
+
+def export_tables(out_dir, tables=None, formats=('jsonl', 'parquet'), incremental=False, chunk_size=1000):
+    """Export `tables` (default: all of EXPORTS) and advance the stored watermarks.
+
+    Returns a list of export_table() results.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    watermarks = load_watermarks(out_dir)
+    run_stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    results = []
+    for name in tables or EXPORTS:
+        results.append(export_table(name, out_dir, formats, incremental, chunk_size, watermarks, run_stamp))
+        save_watermarks(out_dir, watermarks)
+        db.session.rollback()
+    return results
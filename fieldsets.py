@@ -0,0 +1,174 @@
+"""Sparse fieldsets for model serialization.
+
+Each serializable model declares a FIELDS spec mapping output keys to:
+
+- Field: a value computed from the row. It names the columns it reads, and
+  optionally the columns it reads through a many-to-one relationship.
+- Related: a relationship serialized with the target model's own FIELDS.
+- a plain dict: a nested group of the above (e.g. 'skills').
+
+A field selection such as "id,summary,skills.grammar" becomes a tree that
+drives both sides from the same spec. serialize() evaluates only the
+selected getters, so unrequested JSON blobs are never decoded and
+unrequested relationships never touched. load_options() turns the same tree
+into load_only()/selectinload() options, so unrequested columns are never
+fetched.
+
+Fields marked default=False (e.g. full frame logs) are left out unless
+selected explicitly.
+"""
+from operator import attrgetter
+
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.orm.interfaces import MANYTOONE
+
+
+class FieldError(ValueError):
+    pass
+
+
+class Field:
+    __slots__ = ('getter', 'columns', 'relations', 'default', 'context')
+
+    def __init__(self, getter, *columns, relations=None, default=True, context=False):
+        if isinstance(getter, str):
+            columns = columns or (getter,)
+            getter = attrgetter(getter)
+        self.getter = getter
+        self.columns = columns
+        self.relations = relations or {}
+        self.default = default
+        self.context = context
+
+    def get(self, obj, ctx):
+        return self.getter(obj, ctx) if self.context else self.getter(obj)
+
+
+class Related:
+    __slots__ = ('relation', 'many', 'default')
+
+    def __init__(self, relation, many=True, default=True):
+        self.relation = relation
+        self.many = many
+        self.default = default
+
+
+def parse_fields(value):
+    """"id,skills.grammar" -> {'id': True, 'skills': {'grammar': True}}; empty -> None."""
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(','):
+        parts = [part.strip() for part in path.split('.')]
+        if not all(parts):
+            continue
+        node = tree
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is True:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = True
+    return tree or None
+
+
+def default_tree(spec):
+    """Top-level selection equivalent to 'all default fields' of a spec."""
+    return {key: True for key, entry in spec.items() if isinstance(entry, dict) or entry.default}
+
+
+def _target(model, relation):
+    return getattr(model, relation).property.mapper.class_
+
+
+def validate_fields(model, tree, spec=None, prefix=''):
+    """Raise FieldError for any selected path that the spec does not define."""
+    if tree is None:
+        return
+    spec = model.FIELDS if spec is None else spec
+    for key, sub in tree.items():
+        if key not in spec:
+            raise FieldError(f"Unknown field: {prefix}{key}")
+        entry = spec[key]
+        if sub is True:
+            continue
+        if isinstance(entry, dict):
+            validate_fields(model, sub, entry, f"{prefix}{key}.")
+        elif isinstance(entry, Related):
+            validate_fields(_target(model, entry.relation), sub, None, f"{prefix}{key}.")
+        else:
+            raise FieldError(f"Field {prefix}{key} has no sub-fields")
+
+
+def resolve_fields(model, value):
+    """Parse and validate a ?fields= value for `model` (None selects defaults)."""
+    tree = parse_fields(value) if isinstance(value, str) or value is None else value
+    validate_fields(model, tree)
+    return tree
+
+
+def _selected(spec, tree):
+    for key, entry in spec.items():
+        if tree is None:
+            if isinstance(entry, dict) or entry.default:
+                yield key, entry, None
+        elif key in tree:
+            yield key, entry, None if tree[key] is True else tree[key]
+
+
+def serialize(obj, fields=None, spec=None, **ctx):
+    """Build the dict for `obj`, evaluating only the selected fields."""
+    if isinstance(fields, str):
+        fields = parse_fields(fields)
+    spec = type(obj).FIELDS if spec is None else spec
+    data = {}
+    for key, entry, sub in _selected(spec, fields):
+        if isinstance(entry, dict):
+            data[key] = serialize(obj, sub, entry, **ctx)
+        elif isinstance(entry, Related):
+            value = getattr(obj, entry.relation)
+            if entry.many:
+                data[key] = [serialize(item, sub, **ctx) for item in value]
+            else:
+                data[key] = serialize(value, sub, **ctx) if value is not None else None
+        else:
+            data[key] = entry.get(obj, ctx)
+    return data
+
+
+def _foreign_key_columns(model, relation):
+    prop = getattr(model, relation).property
+    return {column.key for column in prop.local_columns} if prop.direction is MANYTOONE else set()
+
+
+def _collect(model, spec, tree, columns, via, related):
+    for key, entry, sub in _selected(spec, tree):
+        if isinstance(entry, dict):
+            _collect(model, entry, sub, columns, via, related)
+        elif isinstance(entry, Related):
+            columns.update(_foreign_key_columns(model, entry.relation))
+            related.append((entry.relation, sub))
+        else:
+            columns.update(entry.columns)
+            for relation, relation_columns in entry.relations.items():
+                columns.update(_foreign_key_columns(model, relation))
+                via.setdefault(relation, set()).update(relation_columns)
+
+
+def load_options(model, fields=None):
+    """Loader options that fetch exactly what serialize(obj, fields) reads."""
+    if isinstance(fields, str):
+        fields = parse_fields(fields)
+    columns, via, related = {model.__mapper__.primary_key[0].key}, {}, []
+    _collect(model, model.FIELDS, fields, columns, via, related)
+
+    options = [load_only(*[getattr(model, name) for name in sorted(columns)])]
+    for relation, relation_columns in via.items():
+        target = _target(model, relation)
+        options.append(selectinload(getattr(model, relation))
+                       .load_only(*[getattr(target, name) for name in sorted(relation_columns)]))
+    for relation, sub in related:
+        target = _target(model, relation)
+        options.append(selectinload(getattr(model, relation)).options(*load_options(target, sub)))
+    return options
@@ -0,0 +1,449 @@
+"""Compact binary encoding for frame-by-frame analysis logs.
+
+AttireAnalysis.posture_log / eye_log hold tens of thousands of per-frame
+entries. As JSON text each entry repeats its keys and label strings, and
+every to_dict() call re-parses all of them. The packed format stores one
+typed array per field instead:
+
+- numbers: little-endian ints of the narrowest width, with an optional
+  decimal scale (4.25 -> 425 at scale 2) so decimal timestamps stay
+  lossless. Evenly spaced series (frame counters, fixed-fps timestamps)
+  collapse to (start, step). A column records whether its values are ints,
+  floats, or ints exactly where they are whole (0, 0.04, ..., 1, 1.04 as
+  JavaScript writes them).
+- booleans: one byte per frame.
+- anything else (labels such as "Straight" / "Slouched", None, mixed
+  values): a dictionary of distinct JSON values plus run-length encoded
+  codes, so long stretches of the same label cost one run. Numbers that
+  the typed arrays cannot hold exactly (ints outside int64, -0.0, ints
+  mixed with floats beyond 2**53, whole floats next to ints) are stored
+  this way too, so every log round-trips unchanged.
+
+Payloads that are not a list of uniform records, a dict of equal-length
+lists, or a list of scalars are stored as zlib-compressed JSON.
+
+FrameLog reads the header lazily. Numeric columns are exposed as zero-copy
+np.frombuffer views, and summarize() buckets label runs per second or
+minute without expanding the per-frame series. to_json() rebuilds the
+original structure when the full log is requested.
+
+Layout (little-endian): b"FLOG", u8 version, u8 shape, u16 reserved,
+u32 frames, u16 columns, then per column u16 name length, name, u8 kind and
+a kind-specific body. Array bodies are 8-byte aligned.
+"""
+import json
+import math
+import struct
+import zlib
+
+MAGIC = b'FLOG'
+VERSION = 1
+
+SHAPE_JSON, SHAPE_RECORDS, SHAPE_COLUMNS, SHAPE_VALUES = range(4)
+KIND_INT, KIND_RANGE, KIND_BOOL, KIND_CATEGORICAL, KIND_FLOAT = range(1, 6)
+
+# Number type of an int/range column, stored in its header
+NUMBERS_INT, NUMBERS_FLOAT, NUMBERS_WHOLE_INT = range(3)
+
+MAX_SCALE = 6
+TIME_COLUMNS = ('timestamp', 'time', 'ts', 't', 'seconds', 'time_sec', 'second')
+
+_HEADER = struct.Struct('<4sBBHIH')
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+MAX_EXACT_FLOAT_INT = 2 ** 53  # larger ints may change when converted to float64
+
+
+def _np():
+    import numpy as np  # deferred: keeps numpy off the app import path
+    return np
+
+
+def is_packed(data):
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+
+# ---------------------------------------------------------------- encoding
+
+def _tabulate(obj):
+    """Return (shape, ordered {name: values}) or None if not tabular."""
+    if isinstance(obj, list):
+        if obj and all(isinstance(row, dict) for row in obj):
+            keys = list(obj[0].keys())
+            key_set = set(keys)
+            if all(row.keys() == key_set for row in obj):
+                return SHAPE_RECORDS, {k: [row[k] for row in obj] for k in keys}
+            return None
+        if all(not isinstance(v, (dict, list)) for v in obj):
+            return SHAPE_VALUES, {'value': obj}
+        return None
+    if isinstance(obj, dict) and obj and all(isinstance(v, list) for v in obj.values()):
+        lengths = {len(v) for v in obj.values()}
+        if len(lengths) == 1:
+            return SHAPE_COLUMNS, dict(obj)
+    return None
+
+
+def _decimal_scale(values, np):
+    """Smallest k such that every value is exactly int / 10**k, or None."""
+    array = np.asarray(values, dtype=np.float64)
+    if not np.all(np.isfinite(array)):
+        return None, None
+    for scale in range(MAX_SCALE + 1):
+        factor = 10 ** scale
+        scaled = np.round(array * factor)
+        if np.abs(scaled).max(initial=0) >= 2 ** 62:
+            return None, None
+        ints = scaled.astype(np.int64)
+        if np.array_equal(ints / factor if scale else ints.astype(np.float64), array):
+            return scale, ints
+    return None, None
+
+
+def _float_exact(values):
+    """Whether converting every value to float64 and back gives the same value and sign."""
+    for v in values:
+        if type(v) is int:
+            if abs(v) > MAX_EXACT_FLOAT_INT:
+                return False
+        elif v == 0 and math.copysign(1.0, v) < 0:
+            return False  # -0.0: a scaled int would turn it into 0.0
+    return True
+
+
+def _int_dtype(ints, np):
+    lo, hi = (int(ints.min()), int(ints.max())) if len(ints) else (0, 0)
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype).newbyteorder('<')
+    return np.dtype('<i8')
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(data)
+        self.size += len(data)
+
+    def pack(self, fmt, *values):
+        self.write(struct.pack('<' + fmt, *values))
+
+    def align(self):
+        pad = -self.size % 8
+        if pad:
+            self.write(b'\0' * pad)
+
+    def array(self, array):
+        self.align()
+        self.write(array.tobytes())
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+def _encode_column(writer, name, values, np):
+    encoded_name = name.encode('utf-8')
+    writer.pack('H', len(encoded_name))
+    writer.write(encoded_name)
+
+    is_bool = all(type(v) is bool for v in values)
+    is_number = not is_bool and all(type(v) in (int, float) for v in values)
+
+    if values and is_bool:
+        writer.pack('B', KIND_BOOL)
+        writer.array(np.asarray(values, dtype=np.uint8))
+        return
+
+    if values and is_number:
+        has_float, has_int = any(type(v) is float for v in values), any(type(v) is int for v in values)
+        if not has_float:
+            numbers = NUMBERS_INT
+        elif not has_int:
+            numbers = NUMBERS_FLOAT
+        else:
+            # Mixed: representable only if the ints are exactly the whole values
+            whole_ints = all(type(v) is int or not v.is_integer() for v in values)
+            numbers = NUMBERS_WHOLE_INT if whole_ints else None
+        scale, ints = None, None
+        if numbers == NUMBERS_INT:
+            # Exact int64 values; wider ints fall through to the categorical encoding
+            if all(INT64_MIN <= v <= INT64_MAX for v in values):
+                scale, ints = 0, np.array(values, dtype=np.int64)
+        elif numbers is not None and _float_exact(values):
+            scale, ints = _decimal_scale(values, np)
+        if scale is not None:
+            # np.diff wraps around when the spread exceeds int64; such columns are never ranges
+            if len(ints) >= 2 and int(ints.max()) - int(ints.min()) <= INT64_MAX:
+                diffs = np.diff(ints)
+                if np.all(diffs == diffs[0]):
+                    writer.pack('BBBqq', KIND_RANGE, scale, numbers, int(ints[0]), int(diffs[0]))
+                    return
+            dtype = _int_dtype(ints, np)
+            writer.pack('BBBB', KIND_INT, scale, numbers, dtype.itemsize)
+            writer.array(ints.astype(dtype))
+            return
+        if numbers == NUMBERS_FLOAT:
+            writer.pack('B', KIND_FLOAT)
+            writer.array(np.asarray(values, dtype='<f8'))
+            return
+
+    # Categorical: dictionary of JSON-encoded values + run-length codes.
+    labels = {}
+    codes = np.fromiter((labels.setdefault(json.dumps(v, separators=(',', ':')), len(labels)) for v in values),
+                        dtype=np.uint32, count=len(values))
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1)) if len(codes) else np.zeros(0, np.int64)
+    lengths = np.diff(np.append(starts, len(codes))).astype('<u4')
+    code_dtype = np.dtype('<u1' if len(labels) <= 0xFF else '<u2' if len(labels) <= 0xFFFF else '<u4')
+
+    writer.pack('BBI', KIND_CATEGORICAL, code_dtype.itemsize, len(labels))
+    for label in labels:
+        encoded = label.encode('utf-8')
+        writer.pack('I', len(encoded))
+        writer.write(encoded)
+    writer.pack('I', len(starts))
+    writer.array(codes[starts].astype(code_dtype))
+    writer.array(lengths)
+
+
+def encode(obj):
+    """Pack a decoded log (list/dict) into the binary format."""
+    np = _np()
+    table = _tabulate(obj)
+    writer = _Writer()
+    if table is None:
+        payload = zlib.compress(json.dumps(obj, separators=(',', ':')).encode('utf-8'), 6)
+        writer.write(_HEADER.pack(MAGIC, VERSION, SHAPE_JSON, 0, 0, 0))
+        writer.write(payload)
+        return writer.getvalue()
+
+    shape, columns = table
+    frames = len(next(iter(columns.values()))) if columns else 0
+    writer.write(_HEADER.pack(MAGIC, VERSION, shape, 0, frames, len(columns)))
+    for name, values in columns.items():
+        _encode_column(writer, str(name), values, np)
+    return writer.getvalue()
+
+
+def encode_json_text(text):
+    """Pack a JSON string as stored in the legacy Text columns."""
+    return encode(json.loads(text))
+
+
+# ---------------------------------------------------------------- decoding
+
+class _Column:
+    __slots__ = ('name', 'kind', 'scale', 'numbers', 'dtype', 'offset',
+                 'start', 'step', 'labels', 'runs', 'codes_offset', 'lengths_offset')
+
+
+class FrameLog:
+    """Lazy, zero-copy reader over a packed log."""
+
+    def __init__(self, data):
+        if not is_packed(data):
+            raise ValueError("Not a packed frame log")
+        self._buffer = memoryview(data).cast('B') if not isinstance(data, bytes) else data
+        magic, version, self.shape, _, self.frames, self._n_columns = _HEADER.unpack_from(self._buffer, 0)
+        if version != VERSION:
+            raise ValueError(f"Unsupported frame log version {version}")
+        self._columns = None
+
+    @property
+    def nbytes(self):
+        return len(self._buffer)
+
+    def _directory(self):
+        if self._columns is not None:
+            return self._columns
+        np = _np()
+        columns = {}
+        offset = _HEADER.size
+
+        def aligned(pos):
+            return pos + (-pos % 8)
+
+        for _ in range(self._n_columns):
+            (name_len,) = struct.unpack_from('<H', self._buffer, offset)
+            offset += 2
+            col = _Column()
+            col.name = bytes(self._buffer[offset:offset + name_len]).decode('utf-8')
+            offset += name_len
+            (col.kind,) = struct.unpack_from('<B', self._buffer, offset)
+            offset += 1
+
+            if col.kind == KIND_BOOL:
+                offset = aligned(offset)
+                col.dtype, col.offset = np.dtype('u1'), offset
+                offset += self.frames
+            elif col.kind == KIND_FLOAT:
+                offset = aligned(offset)
+                col.dtype, col.offset = np.dtype('<f8'), offset
+                offset += 8 * self.frames
+            elif col.kind == KIND_RANGE:
+                col.scale, col.numbers, col.start, col.step = struct.unpack_from('<BBqq', self._buffer, offset)
+                offset += 18
+            elif col.kind == KIND_INT:
+                col.scale, col.numbers, width = struct.unpack_from('<BBB', self._buffer, offset)
+                offset = aligned(offset + 3)
+                col.dtype, col.offset = np.dtype(f'<i{width}'), offset
+                offset += width * self.frames
+            elif col.kind == KIND_CATEGORICAL:
+                width, n_labels = struct.unpack_from('<BI', self._buffer, offset)
+                offset += 5
+                labels = []
+                for _ in range(n_labels):
+                    (length,) = struct.unpack_from('<I', self._buffer, offset)
+                    offset += 4
+                    labels.append(bytes(self._buffer[offset:offset + length]).decode('utf-8'))
+                    offset += length
+                col.labels = labels
+                (col.runs,) = struct.unpack_from('<I', self._buffer, offset)
+                offset = aligned(offset + 4)
+                col.dtype, col.codes_offset = np.dtype(f'<u{width}'), offset
+                offset = aligned(offset + width * col.runs)
+                col.lengths_offset = offset
+                offset += 4 * col.runs
+            else:
+                raise ValueError(f"Unknown column kind {col.kind}")
+            columns[col.name] = col
+
+        self._columns = columns
+        return columns
+
+    @property
+    def columns(self):
+        return list(self._directory())
+
+    def _view(self, dtype, offset, count):
+        return _np().frombuffer(self._buffer, dtype=dtype, count=count, offset=offset)
+
+    def raw(self, name):
+        """Zero-copy storage view: (array, scale) for numbers, (codes, lengths) runs for labels."""
+        col = self._directory()[name]
+        if col.kind in (KIND_INT, KIND_BOOL, KIND_FLOAT):
+            return self._view(col.dtype, col.offset, self.frames), getattr(col, 'scale', 0) or 0
+        if col.kind == KIND_CATEGORICAL:
+            return (self._view(col.dtype, col.codes_offset, col.runs),
+                    self._view(_np().dtype('<u4'), col.lengths_offset, col.runs))
+        np = _np()
+        return col.start + col.step * np.arange(self.frames, dtype=np.int64), col.scale
+
+    def labels(self, name):
+        return [json.loads(label) for label in self._directory()[name].labels]
+
+    def column(self, name):
+        """Materialize a column as a NumPy array (object dtype for labels)."""
+        np = _np()
+        col = self._directory()[name]
+        if col.kind == KIND_CATEGORICAL:
+            codes, lengths = self.raw(name)
+            table = np.empty(len(col.labels), dtype=object)
+            table[:] = self.labels(name)
+            return table[np.repeat(codes, lengths)]
+        values, scale = self.raw(name)
+        if col.kind == KIND_BOOL:
+            return values.astype(bool)
+        if col.kind == KIND_FLOAT:
+            return values
+        if scale:
+            return values / (10 ** scale)
+        return values.astype(np.float64) if col.numbers != NUMBERS_INT else values
+
+    def to_json(self):
+        """Rebuild the original decoded structure."""
+        if self.shape == SHAPE_JSON:
+            return json.loads(zlib.decompress(self._buffer[_HEADER.size:]))
+        columns = {}
+        for name, col in self._directory().items():
+            values = self.column(name).tolist()
+            if getattr(col, 'numbers', None) == NUMBERS_WHOLE_INT:
+                values = [int(v) if v.is_integer() else v for v in values]
+            columns[name] = values
+        if self.shape == SHAPE_VALUES:
+            return columns.get('value', [])
+        if self.shape == SHAPE_COLUMNS:
+            return columns
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def _time_column(self):
+        for name in TIME_COLUMNS:
+            col = self._directory().get(name)
+            if col is not None and col.kind in (KIND_INT, KIND_RANGE, KIND_FLOAT):
+                return name
+        return None
+
+    def _bucket_starts(self, bucket_seconds, seconds_per_frame):
+        """Frame indices where a new time bucket begins, plus bucket numbers."""
+        np = _np()
+        time_name = self._time_column()
+        if time_name is None:
+            if not seconds_per_frame:
+                raise ValueError("Log has no time column; pass seconds_per_frame")
+            buckets = np.floor(np.arange(self.frames) * seconds_per_frame / bucket_seconds).astype(np.int64)
+        else:
+            col = self._directory()[time_name]
+            if col.kind == KIND_RANGE and col.step > 0:
+                # Evenly spaced: bucket boundaries follow arithmetically.
+                factor = 10 ** col.scale
+                first = (col.start // factor) // bucket_seconds
+                last = ((col.start + col.step * (self.frames - 1)) // factor) // bucket_seconds
+                edges = np.arange(first + 1, last + 1, dtype=np.int64) * bucket_seconds * factor
+                starts = np.unique(np.concatenate(([0], -(-(edges - col.start) // col.step))).astype(np.int64))
+                return starts, ((col.start + col.step * starts) // factor) // bucket_seconds
+            values, scale = self.raw(time_name)
+            if col.kind == KIND_FLOAT:
+                buckets = np.floor(values / bucket_seconds).astype(np.int64)
+            else:
+                buckets = values.astype(np.int64) // (bucket_seconds * 10 ** scale)
+        if not len(buckets):
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+        return starts, buckets[starts]
+
+    def summarize(self, bucket_seconds=60, seconds_per_frame=None):
+        """Per-bucket frame counts, label counts and numeric means.
+
+        Label columns are summarized from their runs: runs are split at bucket
+        boundaries and tallied, so the cost follows runs + buckets rather than
+        frames. Frames are assumed to be in time order.
+        """
+        np = _np()
+        if self.shape == SHAPE_JSON or not self.frames:
+            return []
+        starts, bucket_ids = self._bucket_starts(bucket_seconds, seconds_per_frame)
+        ends = np.append(starts[1:], self.frames)
+        summary = [{'start_seconds': int(b) * bucket_seconds, 'frames': int(e - s)}
+                   for b, s, e in zip(bucket_ids, starts, ends)]
+        time_name = self._time_column()
+
+        for name, col in self._directory().items():
+            if name == time_name:
+                continue
+            if col.kind == KIND_CATEGORICAL:
+                codes, lengths = self.raw(name)
+                run_starts = np.concatenate(([0], np.cumsum(lengths[:-1], dtype=np.int64)))
+                cuts = np.union1d(run_starts, starts)
+                seg_lengths = np.diff(np.append(cuts, self.frames))
+                seg_codes = codes[np.searchsorted(run_starts, cuts, side='right') - 1]
+                seg_buckets = np.searchsorted(starts, cuts, side='right') - 1
+                counts = np.zeros((len(starts), len(col.labels)), dtype=np.int64)
+                np.add.at(counts, (seg_buckets, seg_codes.astype(np.int64)), seg_lengths)
+                labels = [str(label) for label in self.labels(name)]
+                for i, row in enumerate(counts):
+                    summary[i][name] = {labels[j]: int(c) for j, c in enumerate(row) if c}
+            else:
+                values = self.column(name).astype(np.float64)
+                means = np.add.reduceat(values, starts) / (ends - starts)
+                for i, mean in enumerate(means):
+                    summary[i][name] = round(float(mean), 4)
+        return summary
+
+
+def decode_json(data):
+    """Packed bytes -> decoded structure."""
+    return FrameLog(data).to_json()
@@ -0,0 +1,301 @@
+"""Bulk ingestion of a candidate's GitHub snapshot.
+
+Building GitHubProfile -> Repository -> CodeFile objects through the
+relationship cascades costs one INSERT and one identity-map entry per row,
+and a re-import can only delete and recreate everything. ingest_snapshot()
+writes a full snapshot (one JSON document, see load_snapshot()) with Core
+statements instead:
+
+    {"login": "octocat", "bio": "...", "followers": 3, "following": 1, "public_repos": 8,
+     "achievements": ["..."],
+     "repositories": [{"repo_name": "hello", "url": "https://github.com/octocat/hello",
+                       "description": "...", "language": "Python", "stars": 2, "forks": 0,
+                       "topics": ["cli"], "readme": "# hello",
+                       "code_files": [{"filename": "main.py", "content": "print('hi')"}]}]}
+
+Repositories are matched by repo_name and files by (repository, filename).
+Each is diffed against the stored row, so a re-import inserts new rows with
+multi-row INSERTs, updates only the rows that changed (one executemany
+UPDATE), and deletes what the snapshot no longer has. File and README text
+is compared by SHA-256 digest against text_blobs, so unchanged contents are
+never rewritten or even read back. Repositories are processed in groups of
+at most `batch_size` snapshot files (or a single larger repository), one
+transaction per group, so memory and lock time stay bounded for large
+profiles.
+
+Concurrent ingestions of the same profile are not coordinated with each
+other (they could both insert a new file), so run one at a time per
+candidate.
+"""
+import json
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects.postgresql import JSON
+
+import config
+from db import db
+from models import CandidateProfile, CodeFile, GitHubProfile, Repository
+from text_blobs import acquire, release, text_digest
+
+BATCH_FILES = config.env_int("GITHUB_INGEST_BATCH_FILES", 1000)
+
+_profiles, _repos, _files = GitHubProfile.__table__, Repository.__table__, CodeFile.__table__
+
+PROFILE_FIELDS = ('bio', 'followers', 'following', 'public_repos', 'achievements')
+REPO_FIELDS = ('description', 'language', 'stars', 'forks', 'topics', 'url')
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def load_snapshot(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _validate(snapshot):
+    """The snapshot's repositories by name. Raises SnapshotError."""
+    if not isinstance(snapshot, dict):
+        raise SnapshotError("Snapshot must be a JSON object")
+    repositories = snapshot.get('repositories') or []
+    if not isinstance(repositories, list):
+        raise SnapshotError("repositories must be a list")
+    by_name = {}
+    for repo in repositories:
+        name = repo.get('repo_name') if isinstance(repo, dict) else None
+        if not isinstance(name, str) or not name:
+            raise SnapshotError("Every repository needs a repo_name")
+        if name in by_name:
+            raise SnapshotError(f"Duplicate repository: {name}")
+        if not isinstance(repo.get('readme') or '', str):
+            raise SnapshotError(f"{name}: readme must be text")
+        files = repo.get('code_files') or []
+        if not isinstance(files, list):
+            raise SnapshotError(f"{name}: code_files must be a list")
+        filenames = set()
+        for file in files:
+            if not (isinstance(file, dict) and isinstance(file.get('filename'), str) and file['filename']
+                    and isinstance(file.get('content', ''), str)):
+                raise SnapshotError(f"{name}: every code file needs a filename and text content")
+            if file['filename'] in filenames:
+                raise SnapshotError(f"{name}: duplicate file {file['filename']}")
+            filenames.add(file['filename'])
+        by_name[name] = repo
+    return by_name
+
+
+def _json_value(column, value):
+    """A list for a JSON column; SQLite stores these columns as text."""
+    return value if isinstance(column.type, JSON) else json.dumps(value)
+
+
+def _json_loaded(value):
+    return json.loads(value) if isinstance(value, str) and value else value or []
+
+
+def _repo_values(repo, login):
+    return {
+        'description': repo.get('description'),
+        'language': repo.get('language'),
+        'stars': repo.get('stars') or 0,
+        'forks': repo.get('forks') or 0,
+        'topics': repo.get('topics') or [],
+        'url': repo.get('url') or f"https://github.com/{login}/{repo['repo_name']}",
+    }
+
+
+def _text_digests(connection, table, digest_column, text_column, ids):
+    """{id: digest} of stored text for `ids`; rows not yet in text_blobs are hashed from the inline column."""
+    digests = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for row_id, digest in connection.execute(select(table.c.id, digest_column).where(table.c.id.in_(chunk))):
+            digests[row_id] = digest
+        legacy = [row_id for row_id in chunk if digests[row_id] is None]
+        if legacy:
+            for row_id, text in connection.execute(select(table.c.id, text_column).where(
+                    table.c.id.in_(legacy), text_column.isnot(None), text_column != '')):
+                digests[row_id] = ('legacy', text_digest(text))
+    return digests
+
+
+def _upsert_profile(connection, profile_id, snapshot, stats):
+    values = {field: snapshot.get(field) for field in PROFILE_FIELDS if field in snapshot}
+    if 'achievements' in values:
+        values['achievements'] = _json_value(_profiles.c.achievements, values['achievements'] or [])
+    if snapshot.get('login'):
+        connection.execute(update(CandidateProfile.__table__).where(CandidateProfile.__table__.c.id == profile_id)
+                           .values(github_username=snapshot['login']))
+    github_id = connection.execute(select(_profiles.c.id).where(_profiles.c.profile_id == profile_id)
+                                   .order_by(_profiles.c.id)).scalar()
+    if github_id is None:
+        stats['profiles_created'] += 1
+        return connection.execute(insert(_profiles).values(profile_id=profile_id, **values)).inserted_primary_key[0]
+    if values:
+        connection.execute(update(_profiles).where(_profiles.c.id == github_id).values(**values))
+    return github_id
+
+
+def _sync_repos(connection, github_id, by_name, login, stats):
+    """Insert new and update changed repositories. Returns ({repo_name: id}, ids of repos to remove)."""
+    existing = {}
+    removed = []
+    for row in connection.execute(select(_repos.c.id, _repos.c.repo_name, *[_repos.c[f] for f in REPO_FIELDS])
+                                  .where(_repos.c.github_profile_id == github_id).order_by(_repos.c.id)):
+        if row.repo_name in by_name and row.repo_name not in existing:
+            existing[row.repo_name] = row
+        else:
+            removed.append(row.id)  # no longer on GitHub, or a duplicate from an older import
+    readmes = _text_digests(connection, _repos, _repos.c.readme_digest, _repos.c.readme,
+                            [row.id for row in existing.values()])
+
+    new_rows, changes, released = [], [], []
+    for name, repo in by_name.items():
+        values = _repo_values(repo, login)
+        readme = repo.get('readme') or None
+        row = existing.get(name)
+        if row is None:
+            new_rows.append((name, values, readme))
+            continue
+        stored = {field: getattr(row, field) for field in REPO_FIELDS}
+        stored['topics'] = _json_loaded(stored['topics'])
+        change = {field: value for field, value in values.items() if stored[field] != value}
+        old = readmes.get(row.id)
+        new = text_digest(readme) if readme else None
+        if new != (old[1] if isinstance(old, tuple) else old):
+            change['readme'] = readme
+        elif isinstance(old, tuple):
+            change['readme'] = readme  # unchanged, but still inline: move it to text_blobs
+        if change:
+            changes.append((row.id, change, None if isinstance(old, tuple) else old))
+
+    ids = {name: row.id for name, row in existing.items()}
+    if new_rows:
+        digests = iter(acquire(connection, [readme for _, _, readme in new_rows if readme]))
+        params = [{'github_profile_id': github_id, 'repo_name': name, **values,
+                   'topics': _json_value(_repos.c.topics, values['topics']),
+                   'readme_digest': next(digests) if readme else None}
+                  for name, values, readme in new_rows]
+        inserted = connection.execute(insert(_repos).returning(_repos.c.id, _repos.c.repo_name,
+                                                               sort_by_parameter_order=True), params)
+        ids.update({row.repo_name: row.id for row in inserted})
+        stats['repos_created'] += len(params)
+
+    for repo_id, change, old_digest in changes:
+        if 'topics' in change:
+            change['topics'] = _json_value(_repos.c.topics, change['topics'])
+        if 'readme' in change:
+            readme = change.pop('readme')
+            change['readme_digest'] = acquire(connection, [readme])[0] if readme else None
+            change['readme'] = None
+            released.append(old_digest)
+        connection.execute(update(_repos).where(_repos.c.id == repo_id).values(**change))
+    release(connection, released)
+    stats['repos_updated'] += len(changes)
+    stats['repos_unchanged'] += len(existing) - len(changes)
+    return ids, removed
+
+
+def _sync_files(connection, repo_files, stats):
+    """Diff the files of a group of repositories ({repo_id: snapshot files}) against the stored rows."""
+    stored = {}  # (repo_id, filename) -> id
+    extra = []
+    for row in connection.execute(select(_files.c.id, _files.c.repository_id, _files.c.filename)
+                                  .where(_files.c.repository_id.in_(list(repo_files))).order_by(_files.c.id)):
+        key = (row.repository_id, row.filename)
+        if key in stored:
+            extra.append(row.id)
+        else:
+            stored[key] = row.id
+    digests = _text_digests(connection, _files, _files.c.content_digest, _files.c.content, list(stored.values()))
+
+    new_rows, changed, seen = [], [], set()
+    for repo_id, files in repo_files.items():
+        for file in files:
+            key = (repo_id, file['filename'])
+            seen.add(key)
+            content = file.get('content') or ''
+            digest = text_digest(content) if content else None
+            file_id = stored.get(key)
+            if file_id is None:
+                new_rows.append((repo_id, file['filename'], content))
+                continue
+            old = digests.get(file_id)
+            if isinstance(old, tuple) or old != digest:
+                changed.append((file_id, content, None if isinstance(old, tuple) else old))
+    removed = [file_id for key, file_id in stored.items() if key not in seen] + extra
+
+    texts = [content for _, _, content in new_rows if content] + [content for _, content, _ in changed if content]
+    digests_new = iter(acquire(connection, texts))
+    if new_rows:
+        connection.execute(insert(_files), [
+            {'repository_id': repo_id, 'filename': filename, 'content': '',
+             'content_digest': next(digests_new) if content else None}
+            for repo_id, filename, content in new_rows])
+    if changed:
+        connection.execute(update(_files).where(_files.c.id == bindparam('b_id'))
+                           .values(content_digest=bindparam('v_digest'), content=''),
+                           [{'b_id': file_id, 'v_digest': next(digests_new) if content else None}
+                            for file_id, content, _ in changed])
+    if removed:
+        _delete_files(connection, _files.c.id.in_(removed))
+
+    release(connection, [old for _, _, old in changed])
+    stats['files_created'] += len(new_rows)
+    stats['files_updated'] += len(changed)
+    stats['files_unchanged'] += len(seen) - len(new_rows) - len(changed)
+    stats['files_deleted'] += len(removed)
+
+
+def _delete_files(connection, condition):
+    release(connection, connection.execute(select(_files.c.content_digest).where(condition)).scalars().all())
+    return connection.execute(delete(_files).where(condition)).rowcount
+
+
+def _remove_repos(connection, repo_ids, stats):
+    stats['files_deleted'] += _delete_files(connection, _files.c.repository_id.in_(repo_ids))
+    release(connection, connection.execute(select(_repos.c.readme_digest).where(_repos.c.id.in_(repo_ids)))
+            .scalars().all())
+    stats['repos_deleted'] += connection.execute(delete(_repos).where(_repos.c.id.in_(repo_ids))).rowcount
+
+
+def ingest_snapshot(profile_id, snapshot, batch_size=None):
+    """Write a full GitHub snapshot for the candidate profile. Must run in an app context.
+
+    Raises SnapshotError for a malformed snapshot, before anything is
+    written. Returns a stats dict of rows created/updated/unchanged/deleted
+    and the number of transactions used.
+    """
+    by_name = _validate(snapshot)
+    batch_size = batch_size or BATCH_FILES
+    login = snapshot.get('login') or ''
+    stats = Counter()
+
+    connection = db.session.connection()
+    github_id = _upsert_profile(connection, profile_id, snapshot, stats)
+    ids, removed = _sync_repos(connection, github_id, by_name, login, stats)
+    db.session.commit()
+    stats['transactions'] += 1
+
+    group, size = {}, 0
+    for name, repo in by_name.items():
+        files = repo.get('code_files') or []
+        if group and size + len(files) > batch_size:
+            _sync_files(db.session.connection(), group, stats)
+            db.session.commit()
+            stats['transactions'] += 1
+            group, size = {}, 0
+        group[ids[name]] = files
+        size += len(files)
+    if group:
+        _sync_files(db.session.connection(), group, stats)
+        db.session.commit()
+        stats['transactions'] += 1
+
+    for start in range(0, len(removed), 100):
+        _remove_repos(db.session.connection(), removed[start:start + 100], stats)
+        db.session.commit()
+        stats['transactions'] += 1
+    return dict(stats)
@@ -0,0 +1,267 @@
+"""Running skill averages for GrammarAnalysis.
+
+GrammarAnalysis carries nine avg_*_score columns, overall_average_score and
+total_questions_analyzed. They summarize the QuestionGrammarAnalysis
+children. Rather than reloading every child to recompute them, each
+GrammarAnalysis row keeps a running sum and a non-NULL count per score
+(sum_*/cnt_*) plus a child count (question_count). Flush hooks on
+QuestionGrammarAnalysis apply the insert/update/delete delta to those
+totals and re-derive the averages in a single UPDATE. The UPDATE reads the
+pre-update column values, so sum + delta and count + delta are consistent
+within one statement. Old child values come from attribute history, which
+the score and parent id columns load even for expired rows (active_history).
+
+The totals have no column default: rows from before they existed keep NULL
+counts after the migration and are rebuilt from their children on first
+use, while new rows start at zero (_before_insert).
+
+recompute_aggregates() is the repair/backfill path. It fetches child scores
+in batches and reduces them per parent with NumPy. skill_trends() reports
+cross-session trends for an email from the per-session totals only, so no
+question rows are read.
+"""
+import math
+
+from sqlalchemy import bindparam, event, inspect, select, text, update
+from sqlalchemy.orm import Session, object_session
+
+from models import GRAMMAR_SKILLS as SKILLS, GrammarAnalysis, QuestionGrammarAnalysis
+
+# (child score column, parent average column)
+AGGREGATES = tuple((f'{skill}_score', f'avg_{skill}_score') for skill in SKILLS) + (
+    ('question_average_score', 'overall_average_score'),
+)
+
+PARENT_TABLE = GrammarAnalysis.__tablename__
+CHILD_COLUMNS = tuple(child for child, _ in AGGREGATES)
+TOTAL_COLUMNS = tuple(f'sum_{c}' for c in CHILD_COLUMNS) + tuple(f'cnt_{c}' for c in CHILD_COLUMNS) + \
+    ('question_count',)
+
+
+def _apply_delta_sql():
+    sets = []
+    for child, avg in AGGREGATES:
+        total, count = f'sum_{child}', f'cnt_{child}'
+        sets.append(f'{total} = {total} + :d_{child}')
+        sets.append(f'{count} = {count} + :n_{child}')
+        sets.append(f'{avg} = CASE WHEN {count} + :n_{child} > 0 '
+                    f'THEN ({total} + :d_{child}) * 1.0 / ({count} + :n_{child}) END')
+    sets.append('question_count = question_count + :rows')
+    sets.append('total_questions_analyzed = question_count + :rows')
+    # Rows migrated from before running totals existed have NULL counts and
+    # are rebuilt from their children instead (see _apply_delta).
+    return text(f'UPDATE {PARENT_TABLE} SET {", ".join(sets)} '
+                f'WHERE id = :id AND cnt_question_average_score IS NOT NULL')
+
+
+_APPLY_DELTA = _apply_delta_sql()
+
+
+def _delta(values, sign):
+    params = {}
+    for child in CHILD_COLUMNS:
+        value = values.get(child)
+        params[f'd_{child}'] = sign * value if value is not None else 0
+        params[f'n_{child}'] = sign if value is not None else 0
+    params['rows'] = sign
+    return params
+
+
+def _combine(a, b):
+    return {key: a[key] + b[key] for key in a}
+
+
+def _apply_delta(connection, analysis_id, params):
+    result = connection.execute(_APPLY_DELTA, dict(params, id=analysis_id))
+    if result.rowcount == 0:
+        recompute_aggregates(connection, [analysis_id])
+
+
+def _values(target, previous=False):
+    state = inspect(target)
+    values = {}
+    for column in CHILD_COLUMNS + ('grammar_analysis_id',):
+        history = state.attrs[column].history
+        if previous and history.deleted:
+            values[column] = history.deleted[0]
+        else:
+            values[column] = getattr(target, column)
+    return values
+
+
+def _mark_stale(target, *analysis_ids):
+    """Expire in-memory GrammarAnalysis rows whose totals changed underneath them."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('stale_grammar_analyses', set()).update(analysis_ids)
+
+
+@event.listens_for(GrammarAnalysis, 'before_insert')
+def _before_insert(mapper, connection, target):
+    for column in TOTAL_COLUMNS:
+        if getattr(target, column) is None:
+            setattr(target, column, 0)
+
+
+@event.listens_for(QuestionGrammarAnalysis, 'after_insert')
+def _after_insert(mapper, connection, target):
+    values = _values(target)
+    _apply_delta(connection, values['grammar_analysis_id'], _delta(values, 1))
+    _mark_stale(target, values['grammar_analysis_id'])
+
+
+@event.listens_for(QuestionGrammarAnalysis, 'after_update')
+def _after_update(mapper, connection, target):
+    old, new = _values(target, previous=True), _values(target)
+    if old == new:
+        return
+    if old['grammar_analysis_id'] == new['grammar_analysis_id']:
+        _apply_delta(connection, new['grammar_analysis_id'], _combine(_delta(old, -1), _delta(new, 1)))
+    else:
+        _apply_delta(connection, old['grammar_analysis_id'], _delta(old, -1))
+        _apply_delta(connection, new['grammar_analysis_id'], _delta(new, 1))
+    _mark_stale(target, old['grammar_analysis_id'], new['grammar_analysis_id'])
+
+
+@event.listens_for(QuestionGrammarAnalysis, 'after_delete')
+def _after_delete(mapper, connection, target):
+    old = _values(target, previous=True)
+    _apply_delta(connection, old['grammar_analysis_id'], _delta(old, -1))
+    _mark_stale(target, old['grammar_analysis_id'])
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_stale(session, flush_context):
+    stale = session.info.pop('stale_grammar_analyses', None)
+    if not stale:
+        return
+    attrs = [f'sum_{c}' for c in CHILD_COLUMNS] + [f'cnt_{c}' for c in CHILD_COLUMNS] + \
+        [avg for _, avg in AGGREGATES] + ['question_count', 'total_questions_analyzed']
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, GrammarAnalysis) and obj.id in stale:
+            session.expire(obj, attrs)
+
+
+def _reduce(rows):
+    """Group (analysis_id, *scores) rows by analysis_id with NumPy.
+
+    Returns (ids, sums, counts, row_counts); the score matrices are
+    (n_parents x len(CHILD_COLUMNS)), NaN/NULL scores excluded.
+    """
+    import numpy as np  # deferred: only repair/trend paths need it
+
+    matrix = np.array(rows, dtype=object)
+    ids = matrix[:, 0].astype(np.int64)
+    scores = matrix[:, 1:]
+    scores[np.equal(scores, None)] = np.nan
+    scores = scores.astype(np.float64)
+
+    order = np.argsort(ids, kind='stable')
+    ids, scores = ids[order], scores[order]
+    unique_ids, starts = np.unique(ids, return_index=True)
+    present = ~np.isnan(scores)
+    sums = np.add.reduceat(np.where(present, scores, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present.astype(np.int64), starts, axis=0)
+    row_counts = np.diff(np.append(starts, len(ids)))
+    return unique_ids, sums, counts, row_counts
+
+
+def recompute_aggregates(connection, analysis_ids=None, batch_size=500):
+    """Rebuild running totals and averages from the child rows.
+
+    Processes parents in id-ordered batches, one SELECT of the score columns
+    per batch, NumPy reduction, and one executemany UPDATE. Returns the number
+    of GrammarAnalysis rows rewritten.
+    """
+    parent = GrammarAnalysis.__table__
+    child = QuestionGrammarAnalysis.__table__
+    if analysis_ids is None:
+        analysis_ids = connection.execute(select(parent.c.id).order_by(parent.c.id)).scalars().all()
+    analysis_ids = list(analysis_ids)
+
+    # Bind names must differ from column names in an executemany UPDATE.
+    columns = [f'sum_{c}' for c in CHILD_COLUMNS] + [f'cnt_{c}' for c in CHILD_COLUMNS] + \
+        [avg for _, avg in AGGREGATES] + ['question_count']
+    values = {column: bindparam(f'v_{column}') for column in columns}
+    values['total_questions_analyzed'] = bindparam('v_question_count')
+    statement = update(parent).where(parent.c.id == bindparam('b_id')).values(**values)
+
+    rewritten = 0
+    for start in range(0, len(analysis_ids), batch_size):
+        batch = analysis_ids[start:start + batch_size]
+        rows = connection.execute(
+            select(child.c.grammar_analysis_id, *[child.c[c] for c in CHILD_COLUMNS])
+            .where(child.c.grammar_analysis_id.in_(batch))
+        ).all()
+
+        totals = {analysis_id: None for analysis_id in batch}
+        if rows:
+            for analysis_id, sums, counts, row_count in zip(*_reduce(rows)):
+                totals[int(analysis_id)] = (sums, counts, int(row_count))
+
+        params = []
+        for analysis_id, total in totals.items():
+            row = {'b_id': analysis_id, 'v_question_count': total[2] if total else 0}
+            for i, (child_column, avg) in enumerate(AGGREGATES):
+                total_sum, count = (float(total[0][i]), int(total[1][i])) if total else (0.0, 0)
+                row[f'v_sum_{child_column}'] = total_sum
+                row[f'v_cnt_{child_column}'] = count
+                row[f'v_{avg}'] = total_sum / count if count else None
+            params.append(row)
+
+        connection.execute(statement, params)
+        rewritten += len(params)
+    return rewritten
+
+
+def skill_trends(email):
+    """Per-session skill averages for an email plus overall averages and slopes.
+
+    Reads one GrammarAnalysis row per session (its running totals), never the
+    question rows. `overall` is weighted by question count, and `slope` is the
+    least-squares change in the average per session (None with < 2 points).
+    """
+    import numpy as np
+
+    columns = [GrammarAnalysis.session_id, GrammarAnalysis.analysis_timestamp]
+    columns += [getattr(GrammarAnalysis, f'sum_{c}') for c in CHILD_COLUMNS]
+    columns += [getattr(GrammarAnalysis, f'cnt_{c}') for c in CHILD_COLUMNS]
+    rows = GrammarAnalysis.query.with_entities(*columns) \
+        .filter_by(email=email) \
+        .order_by(GrammarAnalysis.analysis_timestamp, GrammarAnalysis.id) \
+        .all()
+
+    names = list(SKILLS) + ['overall']
+    if not rows:
+        return {'email': email, 'sessions': [], 'overall': dict.fromkeys(names), 'slope': dict.fromkeys(names)}
+
+    width = len(CHILD_COLUMNS)
+    sums = np.array([[r[2 + i] or 0.0 for i in range(width)] for r in rows], dtype=np.float64)
+    counts = np.array([[r[2 + width + i] or 0 for i in range(width)] for r in rows], dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = np.where(counts > 0, sums / counts, np.nan)
+        overall = np.where(counts.sum(axis=0) > 0, sums.sum(axis=0) / counts.sum(axis=0), np.nan)
+
+    slopes = []
+    x = np.arange(len(rows), dtype=np.float64)
+    for i in range(width):
+        mask = ~np.isnan(averages[:, i])
+        slopes.append(np.polyfit(x[mask], averages[mask, i], 1)[0] if mask.sum() >= 2 else np.nan)
+
+    def _clean(value):
+        return None if math.isnan(value) else round(float(value), 3)
+
+    sessions = [
+        {
+            'session_id': row[0],
+            'analysis_timestamp': row[1].isoformat() if row[1] else None,
+            'skill_averages': {name: _clean(averages[j, i]) for i, name in enumerate(names)}
+        }
+        for j, row in enumerate(rows)
+    ]
+    return {
+        'email': email,
+        'sessions': sessions,
+        'overall': {name: _clean(overall[i]) for i, name in enumerate(names)},
+        'slope': {name: _clean(slopes[i]) for i, name in enumerate(names)}
+    }
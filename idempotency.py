@@ -0,0 +1,138 @@
+"""Idempotency keys for POST endpoints that create resources.
+
+Clients on flaky networks retry a POST after a timeout even when the first
+attempt succeeded. A request sent with an `Idempotency-Key` header claims an
+idempotency_keys row (unique per user and key) holding a fingerprint of the
+request. Its response is then stored on that row:
+
+- a retry with the same key and fingerprint gets the stored response back
+  (with `Idempotent-Replayed: true`) without running the endpoint;
+- the same key with a different request body is rejected with 422;
+- a retry while the first attempt is still running gets 409 + Retry-After.
+
+5xx, 429 and 503 outcomes are not stored, so the client can retry them with
+the same key. Rows expire after IDEMPOTENCY_RETENTION_HOURS; an attempt that
+never finished (worker crash) is taken over after IDEMPOTENCY_LOCK_SECONDS.
+purge_expired() deletes expired rows in batches (`flask --app app
+purge-idempotency-keys`).
+"""
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+import config
+from db import db
+from models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+RETENTION = timedelta(hours=config.env_float("IDEMPOTENCY_RETENTION_HOURS", 24))
+LOCK = timedelta(seconds=config.env_float("IDEMPOTENCY_LOCK_SECONDS", 300))
+IN_PROGRESS_RETRY_AFTER = 5
+
+_table = IdempotencyKey.__table__
+
+
+def _claim(user, key, fingerprint, now):
+    """Insert the in-progress row. Returns None if claimed, else the existing row."""
+    try:
+        db.session.execute(insert(_table).values(
+            user_email=user, key=key, fingerprint=fingerprint, locked_until=now + LOCK,
+            created_at=now, expires_at=now + RETENTION))
+        db.session.commit()
+        return None
+    except IntegrityError:
+        db.session.rollback()
+    row = db.session.execute(select(_table).where(_table.c.user_email == user, _table.c.key == key)).mappings().first()
+    db.session.rollback()
+    return row
+
+
+def _delete_if_stale(row, now):
+    """Drop an expired row or an abandoned in-progress one. Returns True if it was removed."""
+    stale = row['expires_at'] < now or (row['response'] is None and row['locked_until'] < now)
+    if not stale:
+        return False
+    db.session.execute(delete(_table).where(_table.c.id == row['id']))
+    db.session.commit()
+    return True
+
+
+def _finish(user, key, response):
+    where = (_table.c.user_email == user) & (_table.c.key == key)
+    status = response.status_code
+    if status >= 500 or status == 429:
+        db.session.execute(delete(_table).where(where))
+    else:
+        payload = response.get_json(silent=True) or {}
+        db.session.execute(update(_table).where(where).values(
+            status_code=status, response=response.get_data(as_text=True),
+            resume_id=payload.get('resume_id'), locked_until=None))
+    db.session.commit()
+
+
+def _replay(row):
+    response = current_app.response_class(row['response'], status=row['status_code'], mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(fingerprint):
+    """Route decorator (inside @require_auth) honouring the Idempotency-Key header.
+
+    `fingerprint()` returns a digest of the parts of the request that define
+    it (e.g. file bytes and form fields); requests without the header run
+    unchanged.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return f(*args, **kwargs)
+            key = key.strip()
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"{HEADER} must be 1-{MAX_KEY_LENGTH} characters"}), 400
+
+            user, digest, now = g.user_email, fingerprint(), datetime.utcnow()
+            row = _claim(user, key, digest, now)
+            if row is not None and _delete_if_stale(row, now):
+                row = _claim(user, key, digest, now)
+            if row is not None:
+                if row['fingerprint'] != digest:
+                    return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+                if row['response'] is None:
+                    response = jsonify({"error": f"A request with this {HEADER} is still in progress"})
+                    response.status_code = 409
+                    response.headers['Retry-After'] = str(IN_PROGRESS_RETRY_AFTER)
+                    return response
+                return _replay(row)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                db.session.rollback()
+                db.session.execute(delete(_table).where(_table.c.user_email == user, _table.c.key == key))
+                db.session.commit()
+                raise
+            _finish(user, key, response)
+            return response
+        return wrapped
+    return decorator
+
+
+def purge_expired(batch_size=1000, now=None):
+    """Delete expired idempotency keys, `batch_size` rows per transaction. Returns the number deleted."""
+    now = now or datetime.utcnow()
+    deleted = 0
+    while True:
+        ids = db.session.execute(select(_table.c.id).where(_table.c.expires_at < now)
+                                 .order_by(_table.c.expires_at).limit(batch_size)).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(_table).where(_table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
@@ -2,10 +2,9 @@ import os
 from functools import wraps
 from flask import request, jsonify, g
 from jose import jwt, JWTError
-from dotenv import load_dotenv
 
+import config  # noqa: F401  (loads .env)
 
-load_dotenv()
 
 # Default secret key (for local/dev use)
 DEFAULT_SECRET_KEY = "your_super_secret_jwt_key_here_make_it_long_and_secure_123456789"
@@ -32,6 +31,8 @@ def require_auth(f):
         # Extract user info from token payload
         g.user_email = payload.get("email")
         g.user_name = payload.get("username") or payload.get("user_id")
+        # Space-separated OAuth-style scopes, e.g. "resumes:search"
+        g.user_scopes = frozenset((payload.get("scope") or "").split())
 
         if not g.user_email:
             return jsonify({"error": "Email not found in token"}), 401
@@ -0,0 +1,236 @@
+"""Per-domain leaderboards over DomainRanking.
+
+A leaderboard view needs the top candidates of a domain and "position X out
+of N". Sorting the domain and counting it on every view is O(n). Instead:
+
+- domain_leaderboards keeps one row per domain: the candidate count and the
+  top LEADERBOARD_TOP_K entries as JSON, plus the (score, id) of the K-th
+  entry. Flush hooks on DomainRanking keep it current in the same
+  transaction. The count is adjusted by +-1, and the top list is re-read
+  (one LIMIT K index scan) only when the changed row was or is now within
+  the cutoff.
+- Pages past the top list are keyset-paginated on ix_domain_rankings_leaderboard
+  (domain, overall_score DESC, id). The cursor is the last row's
+  (score, id), so page cost does not grow with depth.
+- A candidate's position is their domain_rank, which ranking.py already
+  maintains, found through the email index: O(log n).
+
+Core bulk writes bypass the hooks; rebuild with `flask --app app
+refresh-leaderboards` afterwards (or to backfill).
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import event, inspect, text
+
+import config
+import ranking  # noqa: F401  (its hooks assign domain_rank and must run before these)
+from db import db
+from models import DomainLeaderboard, DomainRanking
+
+TABLE = DomainRanking.__tablename__
+SUMMARY = DomainLeaderboard.__tablename__
+TOP_K = config.env_int("LEADERBOARD_TOP_K", 100)
+MAX_PAGE = 100
+
+# Rows after a cursor (score, id) in leaderboard order; the range bound keeps it sargable
+_AFTER = "(overall_score <= :score AND (overall_score < :score OR id > :id))"
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(score, row_id):
+    return base64.urlsafe_b64encode(json.dumps([score, row_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        score, row_id = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+        return float(score), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+
+
+def _entry(row, rank):
+    return {
+        'rank': rank,
+        'id': row.id,
+        'candidate_name': row.candidate_name,
+        'overall_level': row.overall_level,
+        'overall_score': row.overall_score,
+    }
+
+
+# --- summary maintenance -----------------------------------------------------
+
+def _top(connection, domain):
+    rows = connection.execute(text(
+        f"SELECT id, candidate_name, overall_level, overall_score FROM {TABLE} "
+        "WHERE domain = :domain ORDER BY overall_score DESC, id LIMIT :k"), {'domain': domain, 'k': TOP_K}).all()
+    entries = [_entry(row, position) for position, row in enumerate(rows, 1)]
+    cutoff = (rows[-1].overall_score, rows[-1].id) if len(rows) == TOP_K else (None, None)
+    return entries, cutoff
+
+
+def rebuild_domain(connection, domain):
+    """Recount `domain` and re-read its top list (also creates or removes the summary row)."""
+    count = connection.execute(text(f"SELECT COUNT(*) FROM {TABLE} WHERE domain = :domain"),
+                               {'domain': domain}).scalar()
+    connection.execute(text(f"DELETE FROM {SUMMARY} WHERE domain = :domain"), {'domain': domain})
+    if not count:
+        return 0
+    entries, (cutoff_score, cutoff_id) = _top(connection, domain)
+    connection.execute(text(
+        f"INSERT INTO {SUMMARY} (domain, candidates, top_entries, cutoff_score, cutoff_id, updated_at) "
+        "VALUES (:domain, :count, :top, :cutoff_score, :cutoff_id, :now)"),
+        {'domain': domain, 'count': count, 'top': json.dumps(entries), 'cutoff_score': cutoff_score,
+         'cutoff_id': cutoff_id, 'now': datetime.utcnow()})
+    return count
+
+
+def rebuild_leaderboards(connection, domain=None):
+    """Rebuild every summary (or one domain's). Returns the number of domains written."""
+    if domain is not None:
+        return 1 if rebuild_domain(connection, domain) else 0
+    connection.execute(text(f"DELETE FROM {SUMMARY}"))
+    domains = connection.execute(text(f"SELECT DISTINCT domain FROM {TABLE}")).scalars().all()
+    for name in domains:
+        rebuild_domain(connection, name)
+    return len(domains)
+
+
+def _within_cutoff(summary, score, row_id):
+    if summary.cutoff_id is None:
+        return True
+    return score > summary.cutoff_score or (score == summary.cutoff_score and row_id <= summary.cutoff_id)
+
+
+def _changed(connection, domain, delta, positions, create=True):
+    """Apply a count change to `domain`, re-reading its top list if any (score, id) touches it."""
+    summary = connection.execute(text(f"SELECT cutoff_score, cutoff_id FROM {SUMMARY} WHERE domain = :domain"),
+                                 {'domain': domain}).first()
+    if summary is None:
+        if create:
+            rebuild_domain(connection, domain)
+        return
+    refresh = any(_within_cutoff(summary, score, row_id) for score, row_id in positions)
+    if not refresh and not delta:
+        return
+    params = {'domain': domain, 'delta': delta, 'now': datetime.utcnow()}
+    assignments = "candidates = candidates + :delta, updated_at = :now"
+    if refresh:
+        entries, (params['cutoff_score'], params['cutoff_id']) = _top(connection, domain)
+        params['top'] = json.dumps(entries)
+        assignments += ", top_entries = :top, cutoff_score = :cutoff_score, cutoff_id = :cutoff_id"
+    connection.execute(text(f"UPDATE {SUMMARY} SET {assignments} WHERE domain = :domain"), params)
+    if delta < 0:
+        connection.execute(text(f"DELETE FROM {SUMMARY} WHERE domain = :domain AND candidates <= 0"),
+                           {'domain': domain})
+
+
+def _previous(target, attr):
+    history = inspect(target).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(target, attr)
+
+
+@event.listens_for(DomainRanking, "after_insert")
+def _after_insert(mapper, connection, target):
+    _changed(connection, target.domain, 1, [(target.overall_score, target.id)])
+
+
+@event.listens_for(DomainRanking, "after_update")
+def _after_update(mapper, connection, target):
+    old_domain, old_score = _previous(target, "domain"), _previous(target, "overall_score")
+    if old_domain != target.domain:
+        _changed(connection, old_domain, -1, [(old_score, target.id)])
+        _changed(connection, target.domain, 1, [(target.overall_score, target.id)])
+    else:
+        _changed(connection, target.domain, 0, [(old_score, target.id), (target.overall_score, target.id)])
+
+
+@event.listens_for(DomainRanking, "after_delete")
+def _after_delete(mapper, connection, target):
+    # Deletes are batched even with batch=False: every row of the flush is
+    # already gone, so a missing summary is left to be built on first read
+    _changed(connection, _previous(target, "domain"), -1, [(_previous(target, "overall_score"), target.id)],
+             create=False)
+
+
+# --- queries -----------------------------------------------------------------
+
+def _summary(domain):
+    summary = db.session.get(DomainLeaderboard, domain)
+    if summary is None and rebuild_domain(db.session.connection(), domain):
+        db.session.commit()  # summaries not backfilled yet
+        summary = db.session.get(DomainLeaderboard, domain)
+    return summary
+
+
+def leaderboard_page(domain, limit=20, cursor=None):
+    """One page of `domain`'s leaderboard, best first, or None for an unknown domain.
+
+    Returns {'domain', 'total', 'entries', 'next_cursor'}. Pass next_cursor
+    back as `cursor` for the following page. Raises CursorError for a
+    malformed cursor.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE))
+    after = decode_cursor(cursor) if cursor else None
+    summary = _summary(domain)
+    if summary is None:
+        return None
+
+    top = json.loads(summary.top_entries)
+    if after is not None:
+        score, row_id = after
+        top = [e for e in top if e['overall_score'] < score or (e['overall_score'] == score and e['id'] > row_id)]
+    if len(top) >= limit or summary.cutoff_id is None:
+        # Served from the summary row: the page lies within the top list
+        entries = top[:limit]
+    else:
+        where, params = "domain = :domain", {'domain': domain, 'limit': limit}
+        if after is not None:
+            where += " AND " + _AFTER
+            params['score'], params['id'] = after
+        rows = db.session.execute(text(
+            f"SELECT id, candidate_name, overall_level, overall_score, domain_rank FROM {TABLE} "
+            f"WHERE {where} ORDER BY overall_score DESC, id LIMIT :limit"), params).all()
+        entries = [_entry(row, row.domain_rank) for row in rows]
+
+    last = entries[-1] if entries else None
+    more = last is not None and len(entries) == limit and (last['rank'] is None or last['rank'] < summary.candidates)
+    return {
+        'domain': domain,
+        'total': summary.candidates,
+        'entries': entries,
+        'next_cursor': encode_cursor(last['overall_score'], last['id']) if more else None,
+    }
+
+
+def positions(email):
+    """The candidate's place in every domain they are ranked in: [{'domain', 'rank', 'total', ...}]."""
+    rankings = DomainRanking.query.filter_by(email=email).order_by(DomainRanking.domain, DomainRanking.id).all()
+    results = []
+    for row in rankings:
+        summary = _summary(row.domain)
+        rank = row.domain_rank
+        if rank is None:
+            # Ranks not backfilled yet (see `flask --app app rank-domains`)
+            rank = db.session.execute(text(
+                f"SELECT COUNT(*) + 1 FROM {TABLE} WHERE domain = :domain "
+                "AND overall_score >= :score AND (overall_score > :score OR id < :id)"),
+                {'domain': row.domain, 'score': row.overall_score, 'id': row.id}).scalar()
+        total = summary.candidates if summary else 1
+        results.append({
+            'domain': row.domain,
+            'session_id': row.session_id,
+            'overall_score': row.overall_score,
+            'overall_level': row.overall_level,
+            'rank': rank,
+            'total': total,
+            'percentile': round(100.0 * (total - rank + 1) / total, 1),
+        })
+    return results
@@ -0,0 +1,125 @@
+"""Explicit schema migration step.
+
+Schema creation used to run via db.create_all() on every boot. It now runs
+only when invoked, either from the CLI (`flask --app app migrate`) or from a
+deploy step. Besides creating missing tables, it adds columns and indexes
+that were introduced after a table was first created, since create_all()
+never alters existing tables.
+"""
+from sqlalchemy import inspect, literal, text
+
+from db import db
+from search import ensure_search_index
+
+# Indexes replaced by newer ones: table -> index names
+OBSOLETE_INDEXES = {
+    'domain_rankings': ('ix_domain_rankings_domain_score',),  # by ix_domain_rankings_leaderboard
+}
+
+
+def _default_sql(column, dialect):
+    """SQL for the column's server default, or its scalar Python default; None if it has neither."""
+    if column.server_default is not None and hasattr(column.server_default, 'arg'):
+        default = column.server_default.arg
+        if isinstance(default, str):
+            return "'" + default.replace("'", "''") + "'"
+        return str(default.compile(dialect=dialect))
+    if column.default is not None and column.default.is_scalar and column.default.arg is not None:
+        return str(literal(column.default.arg, column.type).compile(
+            dialect=dialect, compile_kwargs={'literal_binds': True}))
+    return None
+
+
+def _column_ddl(column, dialect):
+    """The ADD COLUMN definition of `column`, with the nullability, default and foreign key of a fresh schema.
+
+    Returns (ddl, loosened): NOT NULL needs a default to fill existing rows, so
+    a NOT NULL column without one is added as nullable (loosened=True).
+    """
+    ddl = f'{column.name} {column.type.compile(dialect=dialect)}'
+    default = _default_sql(column, dialect)
+    if default is not None:
+        ddl += f' DEFAULT {default}'
+    loosened = not column.nullable and default is None
+    if not column.nullable and not loosened:
+        ddl += ' NOT NULL'
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f' REFERENCES {target.table.name} ({target.name})'
+        if foreign_key.ondelete:
+            ddl += f' ON DELETE {foreign_key.ondelete}'
+    return ddl, loosened
+
+
+def _add_missing_columns():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            ddl, loosened = _column_ddl(column, db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+            added.append(f"{table.name}.{column.name}")
+            if loosened:
+                print(f"⚠️ {table.name}.{column.name} added as nullable: NOT NULL needs a default for existing rows")
+
+    db.session.commit()
+    return added
+
+
+def _create_missing_indexes():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+
+def _drop_obsolete_indexes():
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    dropped = []
+
+    for table, names in OBSOLETE_INDEXES.items():
+        if table not in existing_tables:
+            continue
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table)}
+        for name in names:
+            if name in existing_indexes:
+                db.session.execute(text(f'DROP INDEX {name}'))
+                dropped.append(name)
+
+    db.session.commit()
+    return dropped
+
+
+def run_migrations():
+    """Create missing tables, columns and indexes, and drop obsolete indexes. Must run inside an app context.
+
+    Returns the columns and indexes added to tables that already existed.
+    """
+    fresh = not inspect(db.engine).has_table('resumes')
+    db.create_all()
+    added = _add_missing_columns() + _create_missing_indexes()
+    search_index = ensure_search_index()
+    if not fresh:  # on a fresh database it is part of the schema just created, not an upgrade
+        added += search_index
+    for name in added:
+        print(f"✅ Added {name}")
+    for name in _drop_obsolete_indexes():
+        print(f"✅ Dropped {name}")
+    return added
@@ -0,0 +1,379 @@
+"""Per-stage Gemini model routing with per-call usage telemetry.
+
+Every Gemini call goes through generate(stage, contents, features). The
+routing table maps each stage to an ordered list of routes. The first route
+whose max_<feature> limits all hold for the input is used; the last one is
+the catch-all. A route names the model and its generation parameters, e.g.
+a lighter model at temperature 0 for OCR of small phone photos.
+
+Each call is recorded in model_calls: the input features, the prompt and
+output token counts from response.usage_metadata, latency and whether the
+output was usable. evaluate() replays that history against a candidate table
+(`flask --app app evaluate-routes --routes candidate.json`) to estimate its
+latency, cost and failure rate before it is deployed with MODEL_ROUTES_FILE.
+MODEL_ROUTE_EXPLORE sends a small share of calls to another route of the
+stage, so the history covers models outside their current ranges.
+
+MODEL_BACKEND=fake replaces Gemini with fake_generate(), a local stand-in
+with per-model latency, token and failure profiles (development and the
+benchmark; no API key needed).
+"""
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from flask import g, has_app_context
+from sqlalchemy import insert, select
+
+import config
+import warmup
+from db import db
+from models import ModelCall
+
+STAGES = ('ocr_image', 'ocr_pdf', 'parse', 'tailor')
+JSON_STAGES = ('parse', 'tailor')
+FEATURES = ('input_bytes', 'input_chars', 'megapixels', 'pages')
+GENERATION_KEYS = ('temperature', 'top_p', 'top_k', 'max_output_tokens', 'response_mime_type')
+
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+LIGHT_MODEL = os.getenv("GEMINI_LIGHT_MODEL", "gemini-2.0-flash-lite")
+
+DEFAULT_ROUTES = {
+    'ocr_image': [
+        {'name': 'light', 'model': LIGHT_MODEL, 'max_megapixels': 2.0, 'max_input_bytes': 1_500_000,
+         'temperature': 0.0, 'max_output_tokens': 2048},
+        {'name': 'default', 'model': DEFAULT_MODEL, 'temperature': 0.0},
+    ],
+    'ocr_pdf': [
+        {'name': 'default', 'model': DEFAULT_MODEL, 'temperature': 0.0},
+    ],
+    'parse': [
+        {'name': 'default', 'model': DEFAULT_MODEL, 'temperature': 0.0},
+    ],
+    'tailor': [
+        {'name': 'default', 'model': DEFAULT_MODEL},
+    ],
+}
+
+# USD per 1M (prompt, output) tokens, for cost estimates only; override with "prices" in the routes file
+DEFAULT_PRICES = {
+    'gemini-2.0-flash-exp': (0.10, 0.40),
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-lite': (0.075, 0.30),
+}
+
+BACKEND = os.getenv("MODEL_BACKEND", "gemini")
+EXPLORE = config.env_float("MODEL_ROUTE_EXPLORE", 0.0)
+TELEMETRY = config.env_flag("MODEL_TELEMETRY", True)
+
+
+class RoutingError(ValueError):
+    pass
+
+
+def _validate(routes):
+    for stage, table in routes.items():
+        if stage not in STAGES:
+            raise RoutingError(f"Unknown stage '{stage}'")
+        if not table:
+            raise RoutingError(f"Stage '{stage}' has no routes")
+        for route in table:
+            if not route.get('name') or not route.get('model'):
+                raise RoutingError(f"Every route of '{stage}' needs a name and a model")
+            for key in route:
+                limit = key[4:] if key.startswith('max_') else None
+                if key not in ('name', 'model') and key not in GENERATION_KEYS and limit not in FEATURES:
+                    raise RoutingError(f"Unknown key '{key}' in route '{stage}.{route['name']}'")
+
+
+def load_routes(path=None):
+    """(routes, prices) from a JSON file {stage: [route, ...], "prices": {model: [in, out]}}.
+
+    Stages and models the file leaves out keep their defaults.
+    """
+    routes = {stage: list(table) for stage, table in DEFAULT_ROUTES.items()}
+    prices = dict(DEFAULT_PRICES)
+    if path:
+        with open(path) as f:
+            custom = json.load(f)
+        prices.update({model: tuple(price) for model, price in custom.pop('prices', {}).items()})
+        _validate(custom)
+        routes.update(custom)
+    return routes, prices
+
+
+ROUTES, PRICES = load_routes(os.getenv("MODEL_ROUTES_FILE"))
+
+
+def image_features(image, input_bytes, pages=None):
+    width, height = image.size
+    return {'input_bytes': input_bytes, 'megapixels': round(width * height / 1e6, 3), 'pages': pages}
+
+
+def text_features(*texts):
+    return {'input_chars': sum(len(text or '') for text in texts)}
+
+
+def _matches(route, features):
+    for key, limit in route.items():
+        if key.startswith('max_'):
+            value = features.get(key[4:])
+            if value is not None and value > limit:
+                return False
+    return True
+
+
+def choose(stage, features, routes=None):
+    """The first route of `stage` whose limits hold for `features` (the last route otherwise)."""
+    table = (routes or ROUTES)[stage]
+    for route in table:
+        if _matches(route, features):
+            return route
+    return table[-1]
+
+
+def generation_config(route):
+    return {key: route[key] for key in GENERATION_KEYS if key in route}
+
+
+# --- backends ----------------------------------------------------------------
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _gemini(model, stage, contents, config):
+    instance = _models.get(model)
+    if instance is None:
+        with _models_lock:
+            instance = _models.setdefault(model, warmup.load_genai().GenerativeModel(model))
+    return instance.generate_content(contents, generation_config=config or None)
+
+
+# base ms, ms per prompt token, ms per output token, largest input handled reliably
+FAKE_PROFILES = {
+    'lite': (350.0, 0.02, 4.0, {'megapixels': 4.0, 'input_chars': 12000}),
+    'exp': (900.0, 0.05, 9.0, {}),
+    'default': (600.0, 0.03, 6.0, {}),
+}
+FAKE_TIME_SCALE = config.env_float("MODEL_FAKE_TIME_SCALE", 1.0)
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def _fake_profile(model):
+    for key in ('lite', 'exp'):
+        if key in model:
+            return FAKE_PROFILES[key]
+    return FAKE_PROFILES['default']
+
+
+def fake_generate(model, stage, contents, config):
+    """Deterministic stand-in for a Gemini call: sleeps the profile's latency and returns plausible text.
+
+    Images count 258 prompt tokens (as Gemini bills them), text len / 4. Inputs
+    beyond a model's reliable size fail half the time (empty OCR text or
+    truncated JSON), and so does output cut off by max_output_tokens.
+    """
+    parts = contents if isinstance(contents, list) else [contents]
+    prompt_tokens, megapixels, chars = 0, 0.0, 0
+    for part in parts:
+        if isinstance(part, str):
+            prompt_tokens += len(part) // 4
+            chars += len(part)
+        else:
+            width, height = part.size
+            prompt_tokens += 258
+            megapixels += width * height / 1e6
+    rng = random.Random(zlib.crc32(f"{model}|{stage}|{chars}|{megapixels:.3f}".encode()))
+    base, per_prompt, per_output, limits = _fake_profile(model)
+
+    output_tokens = {'parse': (900, 1600), 'tailor': (700, 1300)}.get(stage, (350, 900))
+    output_tokens = rng.randint(*output_tokens)
+    truncated = output_tokens > config.get('max_output_tokens', 8192)
+    output_tokens = min(output_tokens, config.get('max_output_tokens', 8192))
+    too_large = megapixels > limits.get('megapixels', float('inf')) or chars > limits.get('input_chars', float('inf'))
+    failed = truncated or (too_large and rng.random() < 0.5)
+
+    latency = (base + per_prompt * prompt_tokens + per_output * output_tokens) * rng.uniform(0.9, 1.1)
+    time.sleep(latency / 1000 * FAKE_TIME_SCALE)
+
+    if stage in JSON_STAGES:
+        text = json.dumps({"name": "Fake Candidate", "email": "", "phone": "", "location": "",
+                           "professional_summary": "lorem " * (output_tokens * 3 // 4), "skills": [],
+                           "work_experience": [], "projects": [], "education": [], "certifications": [],
+                           "ats_score": 70, "feedback": ["Generated by the fake model"]})
+        if failed:
+            text = text[:len(text) // 2]
+    else:
+        text = "" if failed else "resume text " * (output_tokens // 2)
+    return FakeResponse(text, FakeUsage(prompt_tokens, output_tokens))
+
+
+# --- calls -------------------------------------------------------------------
+
+def _record(row):
+    if not TELEMETRY:
+        return
+    try:
+        # Own transaction: the call is recorded even if the request's work is rolled back
+        with db.engine.begin() as connection:
+            connection.execute(insert(ModelCall), row)
+    except Exception as e:
+        print("⚠️ Could not record model call:", e)
+
+
+def generate(stage, contents, features, parse=None, routes=None):
+    """Run `contents` on the model routed for `stage` and return the response text.
+
+    With `parse`, returns parse(text) instead; an exception from it marks the
+    call as failed in model_calls (unusable output) and is re-raised, as is
+    any error from the model itself.
+    """
+    table = (routes or ROUTES)[stage]
+    route = choose(stage, features, routes)
+    explored = len(table) > 1 and EXPLORE > 0 and random.random() < EXPLORE
+    if explored:
+        route = random.choice([other for other in table if other is not route])
+
+    row = {'stage': stage, 'route': route['name'], 'model': route['model'], 'explored': explored,
+           'user_email': g.get('user_email') if has_app_context() else None,
+           'created_at': datetime.utcnow(), 'ok': False, 'error': None}
+    row.update({name: features.get(name) for name in FEATURES})
+    call = fake_generate if BACKEND == 'fake' else _gemini
+    start = time.perf_counter()
+    try:
+        response = call(route['model'], stage, contents, generation_config(route))
+        row['latency_ms'] = (time.perf_counter() - start) * 1000
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            row['prompt_tokens'] = usage.prompt_token_count
+            row['output_tokens'] = usage.candidates_token_count
+            row['total_tokens'] = usage.total_token_count
+        result = parse(response.text) if parse else response.text
+        row['ok'] = True
+        return result
+    except Exception as e:
+        row.setdefault('latency_ms', (time.perf_counter() - start) * 1000)
+        row['error'] = f"{type(e).__name__}: {e}"[:255]
+        raise
+    finally:
+        _record(row)
+
+
+# --- offline evaluation ------------------------------------------------------
+
+def load_history(days=30, stage=None):
+    """Recorded calls of the last `days` days as dicts, oldest first."""
+    query = select(ModelCall).where(ModelCall.created_at >= datetime.utcnow() - timedelta(days=days))
+    if stage:
+        query = query.where(ModelCall.stage == stage)
+    rows = db.session.execute(query.order_by(ModelCall.id)).scalars().all()
+    return [{column: getattr(row, column) for column in ('stage', 'route', 'model', 'prompt_tokens',
+                                                         'output_tokens', 'latency_ms', 'ok') + FEATURES}
+            for row in rows]
+
+
+def _cost(prices, model, call):
+    price_in, price_out = prices.get(model, (0.0, 0.0))
+    return ((call['prompt_tokens'] or 0) * price_in + (call['output_tokens'] or 0) * price_out) / 1e6
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def evaluate(history, routes, prices=None, min_samples=20, tolerance=0.02):
+    """Estimate how `routes` would have served the recorded `history`, per stage.
+
+    Each call is re-routed with choose(). Token counts are taken as recorded
+    (the models share a tokenizer). A call that keeps its model keeps its
+    latency; otherwise latency comes from a linear fit of latency on output
+    tokens over the target model's calls in the stage. The failure rate of a
+    route is the one observed for its model on recorded calls that the
+    candidate would send to that route, i.e. the same input range. Fits and
+    ranges with fewer than `min_samples` calls are reported as unknown (such
+    calls keep their recorded outcome).
+    A stage regresses if its estimated failure rate exceeds the recorded one
+    by more than `tolerance`.
+    """
+    prices = prices or PRICES
+    report = {}
+    for stage in STAGES:
+        calls = [call for call in history if call['stage'] == stage and call['latency_ms'] is not None]
+        if not calls:
+            continue
+        by_model = {}
+        for call in calls:
+            by_model.setdefault(call['model'], []).append(call)
+        fits = {}
+        for model, samples in by_model.items():
+            points = [(c['output_tokens'], c['latency_ms']) for c in samples if c['output_tokens'] is not None]
+            if len(points) >= min_samples and len({x for x, _ in points}) > 1:
+                fits[model] = statistics.linear_regression(*zip(*points))
+
+        chosen = [choose(stage, call, routes) for call in calls]
+        outcomes = {}  # (route name, model) -> [ok, ...] over calls the candidate routes there
+        for call, route in zip(calls, chosen):
+            if call['model'] == route['model']:
+                outcomes.setdefault((route['name'], route['model']), []).append(call['ok'])
+
+        latencies, cost, failures, moved, unknown = [], 0.0, 0.0, {}, set()
+        for call, route in zip(calls, chosen):
+            model = route['model']
+            moved[model] = moved.get(model, 0) + 1
+            cost += _cost(prices, model, call)
+            if model == call['model']:
+                latencies.append(call['latency_ms'])
+            elif model in fits and call['output_tokens'] is not None:
+                slope, intercept = fits[model]
+                latencies.append(max(0.0, intercept + slope * call['output_tokens']))
+            else:
+                unknown.add(f"latency of {model}")
+            seen = outcomes.get((route['name'], model), [])
+            if len(seen) >= min_samples:
+                failures += 1 - sum(seen) / len(seen)
+            else:
+                failures += 0 if call['ok'] else 1  # no evidence either way: keep the recorded outcome
+                unknown.add(f"failure rate of {stage}.{route['name']} ({len(seen)} samples)")
+
+        recorded_failure = sum(1 for call in calls if not call['ok']) / len(calls)
+        failure = failures / len(calls)
+        report[stage] = {
+            'calls': len(calls),
+            'models': moved,
+            'recorded': {
+                'p50_ms': _percentile([c['latency_ms'] for c in calls], 0.5),
+                'p90_ms': _percentile([c['latency_ms'] for c in calls], 0.9),
+                'cost_usd': sum(_cost(prices, c['model'], c) for c in calls),
+                'failure_rate': recorded_failure,
+            },
+            'candidate': {
+                'p50_ms': _percentile(latencies, 0.5),
+                'p90_ms': _percentile(latencies, 0.9),
+                'cost_usd': cost,
+                'failure_rate': failure,
+            },
+            'unknown': sorted(unknown),
+            'regression': failure > recorded_failure + tolerance,
+        }
+    return report
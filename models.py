@@ -1,5 +1,9 @@
 from db import db, DATABASE_URL
 import json
+from operator import attrgetter
+
+from blobstore import blob_url
+from fieldsets import Field, Related, serialize
 
 from datetime import datetime, timezone
 
@@ -7,6 +11,41 @@ from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy import Text
 
 
+GRAMMAR_SKILLS = ('vocabulary', 'grammar', 'pronunciation', 'diction', 'communication_clarity',
+                  'voice_intonation', 'tone', 'pitch', 'rhythm')
+
+
+def _isoformat(name):
+    return Field(lambda obj: getattr(obj, name).isoformat(), name)
+
+
+def _json_or_none(name):
+    return Field(lambda obj: json.loads(getattr(obj, name)) if getattr(obj, name) else None, name)
+
+
+def _score(name):
+    return Field(lambda obj: float(getattr(obj, name)) if getattr(obj, name) else 0.00, name)
+
+
+def _json_dict(value):
+    if not value:
+        return {}
+    try:
+        return json.loads(value)
+    except:
+        return {}
+
+
+def _json_list(value):
+    """JSON column value as a list; SQLite stores these columns as text."""
+    if isinstance(value, str) and 'postgresql' not in DATABASE_URL:
+        try:
+            return json.loads(value) if value else []
+        except:
+            return []
+    return value or []
+
+
 class CandidateProfile(db.Model):
     __tablename__ = 'candidate_profiles'
 
@@ -23,19 +62,22 @@ class CandidateProfile(db.Model):
     github_profile = db.relationship('GitHubProfile', backref='profile', uselist=False, cascade='all, delete-orphan')
     resumes = db.relationship('Resume', backref='candidate_profile', lazy=True, cascade='all, delete-orphan')
 
+    canonical_resumes = db.relationship('CanonicalResume', backref='profile', lazy=True, cascade='all, delete-orphan')
     transcriptions = db.relationship('Transcription', backref='user', lazy=True, cascade='all, delete-orphan')
     notes = db.relationship('Note', backref='user', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'email': self.email,
-            'github_username': self.github_username,
-            'linkedin_link': self.linkedin_link,
-            'timestamp': self.timestamp.isoformat(),
-            'resume': self.resume_data.data if self.resume_data else None,
-            'github': self.github_profile.to_dict() if self.github_profile else None
-        }
+    FIELDS = {
+        'id': Field('id'),
+        'email': Field('email'),
+        'github_username': Field('github_username'),
+        'linkedin_link': Field('linkedin_link'),
+        'timestamp': _isoformat('timestamp'),
+        'resume': Field(lambda p: p.resume_data.data if p.resume_data else None, relations={'resume_data': ('data',)}),
+        'github': Related('github_profile', many=False)
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 class Transcription(db.Model):
@@ -64,22 +106,24 @@ class Transcription(db.Model):
     def __repr__(self):
         return f'<Transcription {self.id}>'
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'original_transcript': self.original_transcript,
-            'original_language': self.original_language,
-            'translated_transcript': self.translated_transcript,
-            'target_language': self.target_language,
-            'detailed_notes': self.detailed_notes,
-            'source_type': self.source_type,
-            'source_url': self.source_url,
-            'summary': self.summary,
-            'flashcards': json.loads(self.flashcards) if self.flashcards else None,
-            'quiz': json.loads(self.quiz) if self.quiz else None,
-            'exercises': json.loads(self.exercises) if self.exercises else None,
-            'created_at': self.created_at.isoformat()
-        }
+    FIELDS = {
+        'id': Field('id'),
+        'original_transcript': Field('original_transcript'),
+        'original_language': Field('original_language'),
+        'translated_transcript': Field('translated_transcript'),
+        'target_language': Field('target_language'),
+        'detailed_notes': Field('detailed_notes'),
+        'source_type': Field('source_type'),
+        'source_url': Field('source_url'),
+        'summary': Field('summary'),
+        'flashcards': _json_or_none('flashcards'),
+        'quiz': _json_or_none('quiz'),
+        'exercises': _json_or_none('exercises'),
+        'created_at': _isoformat('created_at')
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 class Note(db.Model):
@@ -113,13 +157,136 @@ class Resume(db.Model):
     __tablename__ = 'resumes'
 
     id = db.Column(db.Integer, primary_key=True)
-    profile_id = db.Column(db.Integer, db.ForeignKey('candidate_profiles.id'), nullable=False)
+    profile_id = db.Column(db.Integer, db.ForeignKey('candidate_profiles.id'), nullable=False, index=True)
     original_resume_text = db.Column(db.Text, nullable=False)
     structured_resume_data = db.Column(JSON if 'postgresql' in DATABASE_URL else Text, nullable=False)
     job_description = db.Column(db.Text, nullable=False)
+    canonical_resume_id = db.Column(db.Integer, db.ForeignKey('canonical_resumes.id'))  # parse it was tailored from
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class Skill(db.Model):
+    """Canonical skill name from the taxonomy in skill_facets.py."""
+    __tablename__ = 'skills'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+
+
+class ResumeSkill(db.Model):
+    """A taxonomy skill found in a resume's structured data (see skill_facets.py)."""
+    __tablename__ = 'resume_skills'
+    __table_args__ = (
+        # Facet counts and filters: by skill in a time range, and by time range alone
+        db.Index('ix_resume_skills_skill_created', 'skill_id', 'created_at', 'profile_id'),
+        db.Index('ix_resume_skills_created', 'created_at', 'skill_id', 'profile_id'),
+        # One candidate's skills: own-scope queries and facets over matched candidates
+        db.Index('ix_resume_skills_profile', 'profile_id', 'skill_id', 'created_at'),
+    )
+
+    resume_id = db.Column(db.Integer, db.ForeignKey('resumes.id', ondelete='CASCADE'), primary_key=True)
+    skill_id = db.Column(db.Integer, db.ForeignKey('skills.id'), primary_key=True)
+    profile_id = db.Column(db.Integer, nullable=False)  # Copied from the resume so facets never join it
+    created_at = db.Column(db.DateTime, nullable=False)  # Copied from the resume
+    source = db.Column(db.SmallInteger, nullable=False)  # 1: skills list, 2: a position title, 3: both
+
+
+class CanonicalResume(db.Model):
+    """A profile's resume text parsed once into structured JSON, reused by every tailoring (see canonical_resumes.py)."""
+    __tablename__ = 'canonical_resumes'
+    __table_args__ = (
+        db.UniqueConstraint('profile_id', 'text_sha256', 'parser_version', name='uq_canonical_resumes_text'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    profile_id = db.Column(db.Integer, db.ForeignKey('candidate_profiles.id'), nullable=False)
+    text_sha256 = db.Column(db.String(64), nullable=False)  # of the whitespace-normalized resume text
+    parser_version = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class InflightGeneration(db.Model):
+    """Cross-process single-flight lease and shared result (see singleflight.py)."""
+    __tablename__ = 'inflight_generations'
+
+    key = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+
+
+class IdempotencyKey(db.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header (see idempotency.py)."""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_email', 'key', name='uq_idempotency_keys_user_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_email = db.Column(db.String(255), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response = db.Column(db.Text)
+    resume_id = db.Column(db.Integer)
+    locked_until = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ResumeUpload(db.Model):
+    """Resume file uploaded ahead of generation, with its speculatively extracted text (see uploads.py)."""
+    __tablename__ = 'resume_uploads'
+
+    id = db.Column(db.String(32), primary_key=True)  # random hex, returned as upload_id
+    user_email = db.Column(db.String(255), nullable=False, index=True)
+    filename = db.Column(db.String(255))
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.Integer)
+    sha256 = db.Column(db.String(64))
+    status = db.Column(db.String(16), nullable=False)  # running | done | failed
+    file_data = db.Column(db.LargeBinary)  # dropped once the text is extracted
+    extracted_text = db.Column(db.Text)
+    error = db.Column(db.String(255))
+    lease_until = db.Column(db.DateTime)  # a running extraction past this was abandoned
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ModelCall(db.Model):
+    """One Gemini call: the routing inputs, usage metadata and outcome (written by model_routing.py)."""
+    __tablename__ = 'model_calls'
+    __table_args__ = (
+        db.Index('ix_model_calls_stage_created', 'stage', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    stage = db.Column(db.String(32), nullable=False)
+    route = db.Column(db.String(64), nullable=False)
+    model = db.Column(db.String(64), nullable=False)
+    explored = db.Column(db.Boolean, nullable=False, default=False)  # sent off-route by MODEL_ROUTE_EXPLORE
+    user_email = db.Column(db.String(255))
+
+    # Routing features of the input
+    input_bytes = db.Column(db.Integer)
+    input_chars = db.Column(db.Integer)
+    megapixels = db.Column(db.Float)
+    pages = db.Column(db.Integer)
+
+    # response.usage_metadata; NULL when the call failed before a response
+    prompt_tokens = db.Column(db.Integer)
+    output_tokens = db.Column(db.Integer)
+    total_tokens = db.Column(db.Integer)
+
+    latency_ms = db.Column(db.Float, nullable=False)
+    ok = db.Column(db.Boolean, nullable=False)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 class ResumeData(db.Model):
     __tablename__ = 'resume_data'
 
@@ -128,6 +295,40 @@ class ResumeData(db.Model):
     data = db.Column(JSON if 'postgresql' in DATABASE_URL else Text, nullable=False)
 
 
+class TextBlob(db.Model):
+    """Deduplicated text (README and source file contents), see text_blobs.py."""
+    __tablename__ = 'text_blobs'
+
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 of the UTF-8 text
+    content = db.Column(Text, nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # UTF-8 bytes
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # Rows in code_files/repositories pointing here
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def _blob_text(inline, digest, blob):
+    """Text attribute backed by an inline column until text_blobs.py moves it to a TextBlob.
+
+    Assigning stores the text inline; the flush replaces it with the digest.
+    """
+    def get(self):
+        value = getattr(self, inline)
+        if value or not getattr(self, digest):
+            return value
+        return getattr(self, blob).content
+
+    def set(self, value):
+        setattr(self, inline, value)
+        if not value:
+            setattr(self, digest, None)
+
+    return property(get, set)
+
+
+def _blob_field(name, inline, digest, blob):
+    return Field(attrgetter(name), inline, digest, relations={blob: ('content',)})
+
+
 class GitHubProfile(db.Model):
     __tablename__ = 'github_profiles'
 
@@ -142,75 +343,78 @@ class GitHubProfile(db.Model):
     # Relationships
     repositories = db.relationship('Repository', backref='github_profile', cascade='all, delete-orphan')
 
-    def to_dict(self):
-        achievements_data = self.achievements
-        if isinstance(self.achievements, str) and 'postgresql' not in DATABASE_URL:
-            try:
-                achievements_data = json.loads(self.achievements) if self.achievements else []
-            except:
-                achievements_data = []
+    FIELDS = {
+        'bio': Field('bio'),
+        'followers': Field('followers'),
+        'following': Field('following'),
+        'public_repos': Field('public_repos'),
+        'achievements': Field(lambda gh: _json_list(gh.achievements), 'achievements'),
+        'repos': Related('repositories')
+    }
 
-        return {
-            'bio': self.bio,
-            'followers': self.followers,
-            'following': self.following,
-            'public_repos': self.public_repos,
-            'achievements': achievements_data or [],
-            'repos': [repo.to_dict() for repo in self.repositories]
-        }
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 class Repository(db.Model):
     __tablename__ = 'repositories'
 
     id = db.Column(db.Integer, primary_key=True)
-    github_profile_id = db.Column(db.Integer, db.ForeignKey('github_profiles.id'), nullable=False)
+    github_profile_id = db.Column(db.Integer, db.ForeignKey('github_profiles.id'), nullable=False, index=True)
     repo_name = db.Column(db.String(255), nullable=False)
     description = db.Column(Text, nullable=True)
     language = db.Column(db.String(100), nullable=True)
     stars = db.Column(db.Integer, default=0)
     forks = db.Column(db.Integer, default=0)
     topics = db.Column(JSON if 'postgresql' in DATABASE_URL else Text, nullable=True)
-    readme = db.Column(Text, nullable=True)
+    _readme = db.Column('readme', Text, nullable=True)  # Inline until moved to text_blobs on flush
+    readme_digest = db.Column(db.String(64), db.ForeignKey('text_blobs.digest'), nullable=True, index=True)
     url = db.Column(db.String(500), nullable=False)
 
     # Relationships
     code_files = db.relationship('CodeFile', backref='repository', cascade='all, delete-orphan')
+    readme_blob = db.relationship('TextBlob', foreign_keys=[readme_digest])
 
-    def to_dict(self):
-        topics_data = self.topics
-        if isinstance(self.topics, str) and 'postgresql' not in DATABASE_URL:
-            try:
-                topics_data = json.loads(self.topics) if self.topics else []
-            except:
-                topics_data = []
+    readme = _blob_text('_readme', 'readme_digest', 'readme_blob')
 
-        return {
-            'repo_name': self.repo_name,
-            'description': self.description,
-            'language': self.language,
-            'stars': self.stars,
-            'forks': self.forks,
-            'topics': topics_data or [],
-            'readme': self.readme,
-            'url': self.url,
-            'code_files': [cf.to_dict() for cf in self.code_files]
-        }
+    FIELDS = {
+        'repo_name': Field('repo_name'),
+        'description': Field('description'),
+        'language': Field('language'),
+        'stars': Field('stars'),
+        'forks': Field('forks'),
+        'topics': Field(lambda repo: _json_list(repo.topics), 'topics'),
+        'readme': _blob_field('readme', '_readme', 'readme_digest', 'readme_blob'),
+        'readme_digest': Field('readme_digest', default=False),
+        'url': Field('url'),
+        'code_files': Related('code_files')
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 class CodeFile(db.Model):
     __tablename__ = 'code_files'
 
     id = db.Column(db.Integer, primary_key=True)
-    repository_id = db.Column(db.Integer, db.ForeignKey('repositories.id'), nullable=False)
+    repository_id = db.Column(db.Integer, db.ForeignKey('repositories.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    _content = db.Column('content', db.Text, nullable=False, default='')  # Inline until moved to text_blobs on flush
+    content_digest = db.Column(db.String(64), db.ForeignKey('text_blobs.digest'), nullable=True, index=True)
 
-    def to_dict(self):
-        return {
-            'filename': self.filename,
-            'content': self.content
-        }
+    content_blob = db.relationship('TextBlob', foreign_keys=[content_digest])
+
+    content = _blob_text('_content', 'content_digest', 'content_blob')
+
+    FIELDS = {
+        'filename': Field('filename'),
+        'content': _blob_field('content', '_content', 'content_digest', 'content_blob'),
+        'content_digest': Field('content_digest', default=False)
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 # Interview-specific models (new tables for interview functionality)
@@ -224,24 +428,42 @@ class InterviewSession(db.Model):
     end_time = db.Column(db.DateTime)
     status = db.Column(db.String(50), default='active')  # active, completed, interrupted
     applied_role = db.Column(db.String(200))  # Store the role for this interview session
+    report_version = db.Column(db.Integer, default=0)  # Bumped by reports.py when the session or a child row changes
 
     # Relationships
     questions = db.relationship('InterviewQuestion', backref='session', lazy=True, cascade='all, delete-orphan')
     candidate_profile = db.relationship('CandidateProfile', backref='interview_sessions')
 
 
+class InterviewReport(db.Model):
+    """Cached serialized report of a completed session, valid while version == session.report_version."""
+    __tablename__ = 'interview_reports'
+
+    session_id = db.Column(db.Integer, primary_key=True)  # interview_sessions.id; removed with the session
+    version = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class DomainRanking(db.Model):
     __tablename__ = 'domain_rankings'
+    # Persist rows one at a time: the rank and leaderboard flush hooks expect
+    # the table to reflect only the rows already handled in this flush
+    __mapper_args__ = {'batch': False}
 
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.Integer, db.ForeignKey('interview_sessions.id'), nullable=False, unique=True)
     email = db.Column(db.String(255), nullable=False, index=True)
     candidate_name = db.Column(db.String(255), nullable=False)
-    domain = db.Column(db.String(255), nullable=False, index=True)  # The applied domain
+    # active_history: the rank and leaderboard hooks need the old values even
+    # when the row was expired (e.g. by a commit) before being changed
+    domain = db.column_property(db.Column(db.String(255), nullable=False, index=True),
+                                active_history=True)  # The applied domain
     overall_level = db.Column(db.String(50), nullable=False)  # Not Satisfactory/Moderate/Good
-    overall_score = db.Column(db.Float, nullable=False)  # Overall score out of 10
+    overall_score = db.column_property(db.Column(db.Float, nullable=False),
+                                       active_history=True)  # Overall score out of 10
 
-    # Ranking within domain (will be calculated)
+    # Ranking within domain, maintained incrementally by ranking.py
     domain_rank = db.Column(db.Integer)  # 1st, 2nd, 3rd etc. within the domain
 
     # Timestamps
@@ -266,6 +488,23 @@ class DomainRanking(db.Model):
             'last_updated': self.last_updated.isoformat()
         }
 
+# Leaderboard order (score DESC, id): serves keyset pages in leaderboards.py
+# and the "rows ahead/behind this score" predicates in ranking.py.
+db.Index('ix_domain_rankings_leaderboard', DomainRanking.domain, DomainRanking.overall_score.desc(), DomainRanking.id)
+
+
+class DomainLeaderboard(db.Model):
+    """Per-domain candidate count and top-K entries, maintained by leaderboards.py."""
+    __tablename__ = 'domain_leaderboards'
+
+    domain = db.Column(db.String(255), primary_key=True)
+    candidates = db.Column(db.Integer, nullable=False, default=0)
+    top_entries = db.Column(db.Text, nullable=False, default='[]')  # JSON list, best first
+    cutoff_score = db.Column(db.Float)  # score and id of the K-th entry; NULL while the list is not full
+    cutoff_id = db.Column(db.Integer)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class AttireAnalysis(db.Model):
     __tablename__ = 'attire_analysis'
 
@@ -286,8 +525,10 @@ class AttireAnalysis(db.Model):
     eye_contact_score = db.Column(db.Numeric(4, 2))  # Score out of 10 with 2 decimal places
 
     # Detailed analysis logs
-    posture_log = db.Column(db.Text)  # JSON string of frame-by-frame analysis
-    eye_log = db.Column(db.Text)  # JSON string of frame-by-frame analysis
+    posture_log = db.Column(db.Text)  # Legacy JSON string; packed into posture_log_packed on write
+    eye_log = db.Column(db.Text)  # Legacy JSON string; packed into eye_log_packed on write
+    posture_log_packed = db.Column(db.LargeBinary)  # frame_logs.py binary encoding
+    eye_log_packed = db.Column(db.LargeBinary)  # frame_logs.py binary encoding
 
     # Session metadata
     session_duration = db.Column(db.Float)
@@ -304,27 +545,66 @@ class AttireAnalysis(db.Model):
     def __repr__(self):
         return f'<AttireAnalysis {self.id}: Session {self.session_id}>'
 
-    def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
-        import json
-
-        return {
-            'id': self.id,
-            'session_id': self.session_id,
-            'email': self.email,
-            'body_posture': self.body_posture,
-            'eye_contact': self.eye_contact,
-            'attire_score': float(self.attire_score) if self.attire_score else 0.00,
-            'posture_score': float(self.posture_score) if self.posture_score else 0.00,
-            'eye_contact_score': float(self.eye_contact_score) if self.eye_contact_score else 0.00,
-            'attire_feedback': self.attire_feedback,
-            'session_duration': self.session_duration,
-            'posture_log': json.loads(self.posture_log) if self.posture_log else {},
-            'eye_log': json.loads(self.eye_log) if self.eye_log else {},
-            'frames_analyzed': self.frames_analyzed,
-            'total_frames': self.total_frames,
-            'timestamp': self.timestamp.isoformat()
-        }
+    def frame_log(self, name):
+        """FrameLog reader for 'posture' or 'eye', or None if there is no log."""
+        from frame_logs import FrameLog, encode_json_text
+
+        packed = getattr(self, f'{name}_log_packed')
+        if packed:
+            return FrameLog(packed)
+        text = getattr(self, f'{name}_log')
+        return FrameLog(encode_json_text(text)) if text else None
+
+    def _log_summary(self, name, bucket_seconds):
+        log = self.frame_log(name)
+        if log is None:
+            return []
+        seconds_per_frame = None
+        if self.session_duration and self.frames_analyzed:
+            seconds_per_frame = self.session_duration / self.frames_analyzed
+        try:
+            return log.summarize(bucket_seconds, seconds_per_frame)
+        except ValueError:
+            return []
+
+    def _full_log(self, name):
+        log = self.frame_log(name)
+        return log.to_json() if log else {}
+
+    FIELDS = {
+        'id': Field('id'),
+        'session_id': Field('session_id'),
+        'email': Field('email'),
+        'body_posture': Field('body_posture'),
+        'eye_contact': Field('eye_contact'),
+        'attire_score': _score('attire_score'),
+        'posture_score': _score('posture_score'),
+        'eye_contact_score': _score('eye_contact_score'),
+        'attire_feedback': Field('attire_feedback'),
+        'session_duration': Field('session_duration'),
+        'posture_summary': Field(lambda a, ctx: a._log_summary('posture', ctx.get('summary_seconds', 60)),
+                                 'posture_log', 'posture_log_packed', 'session_duration', 'frames_analyzed',
+                                 context=True),
+        'eye_summary': Field(lambda a, ctx: a._log_summary('eye', ctx.get('summary_seconds', 60)),
+                             'eye_log', 'eye_log_packed', 'session_duration', 'frames_analyzed',
+                             context=True),
+        'frames_analyzed': Field('frames_analyzed'),
+        'total_frames': Field('total_frames'),
+        'timestamp': _isoformat('timestamp'),
+        'posture_log': Field(lambda a: a._full_log('posture'), 'posture_log', 'posture_log_packed', default=False),
+        'eye_log': Field(lambda a: a._full_log('eye'), 'eye_log', 'eye_log_packed', default=False)
+    }
+
+    def to_dict(self, include_logs=False, summary_seconds=60, fields=None):
+        """Convert to dictionary for JSON serialization
+
+        Frame logs are returned as per-`summary_seconds` summaries computed from
+        the packed columns; the full frame-by-frame logs are decoded only when
+        include_logs=True or selected in `fields`.
+        """
+        if fields is None and include_logs:
+            fields = {key: True for key in self.FIELDS}
+        return serialize(self, fields, summary_seconds=summary_seconds)
 
 class EmotionAnalysis(db.Model):
     __tablename__ = 'emotion_analysis'
@@ -336,7 +616,8 @@ class EmotionAnalysis(db.Model):
     second_emotion = db.Column(db.String(50))
     distress_percentage = db.Column(db.Float)
     alert_triggered = db.Column(db.Boolean, default=False)
-    chart_image = db.Column(db.Text)
+    chart_image = db.Column(db.Text)  # Inline base64; offloaded on write when the blob store is durable
+    chart_digest = db.Column(db.String(64))  # SHA-256 of the chart in blobstore.py
     emotion_distribution = db.Column(db.Text)  # JSON string of emotion counts
     total_frames = db.Column(db.Integer, default=0)
     eq_score = db.Column(db.Float, default=0.0)  # ADD THIS LINE
@@ -345,28 +626,24 @@ class EmotionAnalysis(db.Model):
     # Relationships
     interview_session = db.relationship('InterviewSession', backref='emotion_analyses')
 
-    def to_dict(self):
-        emotion_dist = {}
-        if self.emotion_distribution:
-            try:
-                emotion_dist = json.loads(self.emotion_distribution)
-            except:
-                emotion_dist = {}
-
-        return {
-            'id': self.id,
-            'session_id': self.session_id,
-            'email': self.email,
-            'top_emotion': self.top_emotion,
-            'second_emotion': self.second_emotion,
-            'distress_percentage': self.distress_percentage,
-            'alert_triggered': self.alert_triggered,
-            'emotion_distribution': emotion_dist,
-            'total_frames': self.total_frames,
-            'eq_score': self.eq_score,  # ADD THIS LINE
-            'timestamp': self.timestamp.isoformat(),
-            'chart_image': self.chart_image
-        }
+    FIELDS = {
+        'id': Field('id'),
+        'session_id': Field('session_id'),
+        'email': Field('email'),
+        'top_emotion': Field('top_emotion'),
+        'second_emotion': Field('second_emotion'),
+        'distress_percentage': Field('distress_percentage'),
+        'alert_triggered': Field('alert_triggered'),
+        'emotion_distribution': Field(lambda e: _json_dict(e.emotion_distribution), 'emotion_distribution'),
+        'total_frames': Field('total_frames'),
+        'eq_score': Field('eq_score'),
+        'timestamp': _isoformat('timestamp'),
+        'chart_image': Field('chart_image'),
+        'chart_image_url': Field(lambda e: blob_url(e.chart_digest), 'chart_digest')
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 class InterviewQuestion(db.Model):
     __tablename__ = 'interview_questions'
@@ -473,58 +750,80 @@ class GrammarAnalysis(db.Model):
     avg_pitch_score = db.Column(db.Float)
     avg_rhythm_score = db.Column(db.Float)
 
+    # Running sums/counts of the child QuestionGrammarAnalysis scores behind
+    # the averages above; kept in sync by grammar_aggregates.py. No default:
+    # columns added by a migration stay NULL on older rows, which marks them
+    # for a rebuild, and new rows get zeros from a before_insert hook.
+    sum_vocabulary_score = db.Column(db.Float)
+    cnt_vocabulary_score = db.Column(db.Integer)
+    sum_grammar_score = db.Column(db.Float)
+    cnt_grammar_score = db.Column(db.Integer)
+    sum_pronunciation_score = db.Column(db.Float)
+    cnt_pronunciation_score = db.Column(db.Integer)
+    sum_diction_score = db.Column(db.Float)
+    cnt_diction_score = db.Column(db.Integer)
+    sum_communication_clarity_score = db.Column(db.Float)
+    cnt_communication_clarity_score = db.Column(db.Integer)
+    sum_voice_intonation_score = db.Column(db.Float)
+    cnt_voice_intonation_score = db.Column(db.Integer)
+    sum_tone_score = db.Column(db.Float)
+    cnt_tone_score = db.Column(db.Integer)
+    sum_pitch_score = db.Column(db.Float)
+    cnt_pitch_score = db.Column(db.Integer)
+    sum_rhythm_score = db.Column(db.Float)
+    cnt_rhythm_score = db.Column(db.Integer)
+    sum_question_average_score = db.Column(db.Float)
+    cnt_question_average_score = db.Column(db.Integer)
+    question_count = db.Column(db.Integer)
+
     # Relationships
     interview_session = db.relationship('InterviewSession', backref='grammar_analysis')
     question_analyses = db.relationship('QuestionGrammarAnalysis', backref='grammar_analysis',
                                         cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'session_id': self.session_id,
-            'email': self.email,
-            'analysis_timestamp': self.analysis_timestamp.isoformat(),
-            'overall_average_score': self.overall_average_score,
-            'overall_feedback': self.overall_feedback,
-            'total_questions_analyzed': self.total_questions_analyzed,
-            'skill_averages': {
-                'vocabulary': self.avg_vocabulary_score,
-                'grammar': self.avg_grammar_score,
-                'pronunciation': self.avg_pronunciation_score,
-                'diction': self.avg_diction_score,
-                'communication_clarity': self.avg_communication_clarity_score,
-                'voice_intonation': self.avg_voice_intonation_score,
-                'tone': self.avg_tone_score,
-                'pitch': self.avg_pitch_score,
-                'rhythm': self.avg_rhythm_score
-            },
-            'question_analyses': [qa.to_dict() for qa in self.question_analyses]
-        }
+    FIELDS = {
+        'id': Field('id'),
+        'session_id': Field('session_id'),
+        'email': Field('email'),
+        'analysis_timestamp': _isoformat('analysis_timestamp'),
+        'overall_average_score': Field('overall_average_score'),
+        'overall_feedback': Field('overall_feedback'),
+        'total_questions_analyzed': Field('total_questions_analyzed'),
+        'skill_averages': {skill: Field(f'avg_{skill}_score') for skill in GRAMMAR_SKILLS},
+        'question_analyses': Related('question_analyses')
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
 
 
 class QuestionGrammarAnalysis(db.Model):
     __tablename__ = 'question_grammar_analysis'
 
     id = db.Column(db.Integer, primary_key=True)
-    grammar_analysis_id = db.Column(db.Integer, db.ForeignKey('grammar_analysis.id'), nullable=False)
+    # active_history on the parent id and the scores: the running-total hooks in
+    # grammar_aggregates.py need the old values even when the row was expired
+    # (e.g. by a commit) before being changed
+    grammar_analysis_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('grammar_analysis.id'), nullable=False), active_history=True)
     question_id = db.Column(db.Integer, db.ForeignKey('interview_questions.id'), nullable=False)
 
     # Transcribed text from audio
     transcript = db.Column(db.Text, nullable=False)
 
     # Individual skill scores (converted to 0-10 scale)
-    vocabulary_score = db.Column(db.Integer)
-    grammar_score = db.Column(db.Integer)
-    pronunciation_score = db.Column(db.Integer)
-    diction_score = db.Column(db.Integer)
-    communication_clarity_score = db.Column(db.Integer)
-    voice_intonation_score = db.Column(db.Integer)
-    tone_score = db.Column(db.Integer)
-    pitch_score = db.Column(db.Integer)
-    rhythm_score = db.Column(db.Integer)
+    vocabulary_score = db.column_property(db.Column(db.Integer), active_history=True)
+    grammar_score = db.column_property(db.Column(db.Integer), active_history=True)
+    pronunciation_score = db.column_property(db.Column(db.Integer), active_history=True)
+    diction_score = db.column_property(db.Column(db.Integer), active_history=True)
+    communication_clarity_score = db.column_property(db.Column(db.Integer), active_history=True)
+    voice_intonation_score = db.column_property(db.Column(db.Integer), active_history=True)
+    tone_score = db.column_property(db.Column(db.Integer), active_history=True)
+    pitch_score = db.column_property(db.Column(db.Integer), active_history=True)
+    rhythm_score = db.column_property(db.Column(db.Integer), active_history=True)
 
     # Average score for this question
-    question_average_score = db.Column(db.Float)
+    question_average_score = db.column_property(db.Column(db.Float), active_history=True)
 
     # Raw feedback from Gemini
     raw_feedback = db.Column(db.Text)
@@ -535,24 +834,17 @@ class QuestionGrammarAnalysis(db.Model):
     # Relationships
     interview_question = db.relationship('InterviewQuestion', backref='grammar_analyses')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'question_id': self.question_id,
-            'question': self.interview_question.question if self.interview_question else None,
-            'transcript': self.transcript,
-            'skills': {
-                'vocabulary': self.vocabulary_score,
-                'grammar': self.grammar_score,
-                'pronunciation': self.pronunciation_score,
-                'diction': self.diction_score,
-                'communication_clarity': self.communication_clarity_score,
-                'voice_intonation': self.voice_intonation_score,
-                'tone': self.tone_score,
-                'pitch': self.pitch_score,
-                'rhythm': self.rhythm_score
-            },
-            'question_average_score': self.question_average_score,
-            'raw_feedback': self.raw_feedback,
-            'analyzed_at': self.analyzed_at.isoformat()
-        }
+    FIELDS = {
+        'id': Field('id'),
+        'question_id': Field('question_id'),
+        'question': Field(lambda qa: qa.interview_question.question if qa.interview_question else None,
+                          relations={'interview_question': ('question',)}),
+        'transcript': Field('transcript'),
+        'skills': {skill: Field(f'{skill}_score') for skill in GRAMMAR_SKILLS},
+        'question_average_score': Field('question_average_score'),
+        'raw_feedback': Field('raw_feedback'),
+        'analyzed_at': _isoformat('analyzed_at')
+    }
+
+    def to_dict(self, fields=None):
+        return serialize(self, fields)
@@ -0,0 +1,483 @@
+"""One-page PDF rendering of structured resumes.
+
+Clients used to turn structured_resume_data into a PDF themselves. The
+server now does it with PyMuPDF:
+
+- Templates (TEMPLATES) are style tables, compiled once into PDF operator
+  fragments. Text uses the PDF Base-14 faces, which are referenced rather
+  than embedded (a page is a few KB). Each process loads their metrics
+  once and keeps word widths measured at size 1.
+- Text is measured once. Widths scale linearly with the font size, so a
+  layout at any scale is plain arithmetic over those widths. The resume is
+  laid out at full size. If it does not fit the page, a bisection over the
+  scale (down to the template's min_scale) finds the largest size that
+  does, and the page is drawn once. Content that still does not fit at
+  min_scale is cut off and reported as truncated. The page is a single
+  content stream written directly, not one PyMuPDF call per line.
+- Rendering runs in a process pool (RENDER_WORKERS). PyMuPDF is not
+  thread-safe and holds the GIL, so request threads only wait on a future.
+- PDFs are cached per process by (resume id, content version, template),
+  where the content version hashes structured_resume_data and
+  RENDER_FORMAT. An edited resume or a layout change never serves a stale
+  file.
+
+Base-14 fonts use WinAnsi (cp1252) encoding: characters outside it print
+as '?'.
+"""
+import hashlib
+import json
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import config
+import warmup
+
+# Bump when the layout changes; it is part of every cache key and ETag
+RENDER_FORMAT = 1
+
+RENDER_WORKERS = config.env_int("RENDER_WORKERS", 2)
+RENDER_TIMEOUT = config.env_float("RENDER_TIMEOUT", 10.0)
+RENDER_CACHE_MB = config.env_int("RENDER_CACHE_MB", 64)
+
+PAGE_SIZES = {'a4': (595.0, 842.0), 'letter': (612.0, 792.0)}
+
+SECTION_TITLES = (
+    ('professional_summary', 'Summary'),
+    ('skills', 'Skills'),
+    ('work_experience', 'Experience'),
+    ('projects', 'Projects'),
+    ('education', 'Education'),
+    ('certifications', 'Certifications'),
+)
+
+
+class RenderError(ValueError):
+    pass
+
+
+class Template:
+    """Page geometry and text styles. Styles map to (font name, size, color)."""
+
+    def __init__(self, name, page='a4', margin=40.0, leading=1.25, section_gap=8.0, entry_gap=4.0,
+                 min_scale=0.7, align_header='left', rule=True, accent=(0, 0, 0), styles=None):
+        self.name = name
+        self.width, self.height = PAGE_SIZES[page]
+        self.margin = margin
+        self.leading = leading
+        self.section_gap = section_gap
+        self.entry_gap = entry_gap
+        self.min_scale = min_scale
+        self.align_header = align_header
+        self.rule = rule
+        self.accent = accent
+        self.styles = styles or {}
+        self._fonts = None
+        # Precompiled operators: style -> (font resource, fill color)
+        self.operators = {style: (b'/' + font.encode(), b'%.3f %.3f %.3f rg' % color)
+                          for style, (font, size, color) in self.styles.items()}
+        self.rule_operator = b'%.3f %.3f %.3f RG 0.6 w' % accent
+
+    def fonts(self):
+        """style -> (Font, size, color); the fonts (used for metrics) are loaded once per process."""
+        if self._fonts is None:
+            fitz = warmup.load_fitz()
+            self._fonts = {style: (_font(fitz, font), size, color)
+                           for style, (font, size, color) in self.styles.items()}
+        return self._fonts
+
+
+_font_cache = {}
+_width_cache = {}
+
+
+def _font(fitz, name):
+    font = _font_cache.get(name)
+    if font is None:
+        font = _font_cache[name] = fitz.Font(name)
+    return font
+
+
+def _unit_width(font, text):
+    key = (font.name, text)
+    width = _width_cache.get(key)
+    if width is None:
+        if len(_width_cache) > 200000:
+            _width_cache.clear()
+        width = _width_cache[key] = font.text_length(text, 1)
+    return width
+
+
+def _template(name, serif=False, **overrides):
+    regular, bold, italic = ('tiro', 'tibo', 'tiit') if serif else ('helv', 'hebo', 'heit')
+    accent = overrides.get('accent', (0, 0, 0))
+    styles = {
+        'headline': (bold, 22.0, accent),
+        'contact': (regular, 9.5, (0.25, 0.25, 0.25)),
+        'heading': (bold, 11.5, accent),
+        'title': (bold, 10.5, (0, 0, 0)),
+        'meta': (italic, 9.5, (0.3, 0.3, 0.3)),
+        'body': (regular, 10.0, (0, 0, 0)),
+    }
+    styles.update({k: v for k, v in overrides.items() if k in styles})
+    options = {k: v for k, v in overrides.items() if k not in styles}
+    return Template(name, styles=styles, **options)
+
+
+TEMPLATES = {
+    'classic': _template('classic', serif=True, align_header='center'),
+    'modern': _template('modern', accent=(0.11, 0.31, 0.6)),
+    'compact': _template('compact', margin=28.0, leading=1.15, section_gap=6.0, entry_gap=3.0,
+                         body=('helv', 9.0, (0, 0, 0)), title=('hebo', 9.5, (0, 0, 0)),
+                         heading=('hebo', 10.5, (0, 0, 0)), headline=('hebo', 18.0, (0, 0, 0))),
+}
+DEFAULT_TEMPLATE = 'classic'
+
+
+# --- content -----------------------------------------------------------------
+
+def _text(value):
+    """Single-line text limited to what the Base-14 encoding can show."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ', '.join(_text(v) for v in value if _text(v))
+    return ' '.join(str(value).encode('cp1252', 'replace').decode('cp1252').split())
+
+
+def _items(value):
+    return [v for v in value if v] if isinstance(value, list) else []
+
+
+def _join(*parts, sep=' | '):
+    return sep.join(p for p in (_text(part) for part in parts) if p)
+
+
+def _blocks(data):
+    """Flatten structured_resume_data into (kind, ...) layout blocks, in reading order."""
+    blocks = [('header', 'headline', _text(data.get('name')) or 'Resume'),
+              ('header', 'contact', _join(data.get('email'), data.get('phone'), data.get('location')))]
+
+    for key, title in SECTION_TITLES:
+        value = data.get(key)
+        body = []
+        if key == 'professional_summary':
+            if _text(value):
+                body.append(('para', 'body', _text(value), None))
+        elif key == 'skills':
+            if _items(value):
+                body.append(('para', 'body', _join(*_items(value), sep=' • '), None))
+        else:
+            for entry in _items(value):
+                if not isinstance(entry, dict):
+                    body.append(('bullet', 'body', _text(entry)))
+                    continue
+                body.extend(_entry_blocks(key, entry))
+                body.append(('gap', 'entry'))
+            if body:
+                body.pop()
+        if body:
+            blocks.append(('heading', title))
+            blocks.extend(body)
+    return blocks
+
+
+def _entry_blocks(key, entry):
+    if key == 'work_experience':
+        blocks = [('para', 'title', _join(entry.get('position'), entry.get('company'), sep=' — '),
+                   _text(entry.get('duration'))),
+                  ('para', 'meta', _text(entry.get('location')), None)]
+        blocks += [('bullet', 'body', _text(item)) for item in _items(entry.get('responsibilities'))]
+    elif key == 'projects':
+        blocks = [('para', 'title', _text(entry.get('title')), _text(entry.get('link'))),
+                  ('para', 'meta', _text(entry.get('technologies')), None),
+                  ('para', 'body', _text(entry.get('description')), None)]
+    elif key == 'education':
+        blocks = [('para', 'title', _join(entry.get('degree'), entry.get('institution'), sep=' — '),
+                   _text(entry.get('graduation_year'))),
+                  ('para', 'meta', _join(entry.get('location'), entry.get('relevant_coursework')), None)]
+    else:
+        dates = _join(entry.get('date'), entry.get('expiry') and f"expires {_text(entry.get('expiry'))}", sep=', ')
+        blocks = [('para', 'title', _join(entry.get('name'), entry.get('issuer'), sep=' — '), dates)]
+    return [block for block in blocks if block[2]]
+
+
+# --- layout ------------------------------------------------------------------
+
+def _measure(blocks, fonts):
+    """Attach unit-size word widths to text blocks (the only measuring pass)."""
+    measured = []
+    for block in blocks:
+        kind = block[0]
+        if kind in ('header', 'para', 'bullet'):
+            style, text = block[1], block[2]
+            font = fonts[style][0]
+            words = text.split(' ')
+            right = block[3] if kind == 'para' else None
+            measured.append((kind, style, words, [_unit_width(font, w) for w in words], _unit_width(font, ' '),
+                             right, _unit_width(font, right) if right else 0.0))
+        else:
+            measured.append(block)
+    return measured
+
+
+def _wrap(widths, space, limit):
+    lines, start, width = [], 0, 0.0
+    for i, w in enumerate(widths):
+        if i > start and width + space + w > limit:
+            lines.append((start, i, width))
+            start, width = i, w
+        else:
+            width = w if i == start else width + space + w
+    if widths:
+        lines.append((start, len(widths), width))
+    return lines
+
+
+def _layout(template, measured, fonts, scale):
+    """Draw operations and total height at `scale`; pure arithmetic."""
+    width = template.width - 2 * template.margin
+    ops, y = [], 0.0
+    first_heading = True
+    for block in measured:
+        kind = block[0]
+        if kind == 'heading':
+            size = fonts['heading'][1] * scale
+            y += template.section_gap * scale * (0.5 if first_heading else 1.0)
+            first_heading = False
+            y += size
+            ops.append(('text', 'heading', 0.0, y, block[1].upper()))
+            y += size * (template.leading - 1)
+            if template.rule:
+                y += 2 * scale
+                ops.append(('rule', y))
+                y += 3 * scale
+            continue
+        if kind == 'gap':
+            y += template.entry_gap * scale
+            continue
+
+        _, style, words, widths, space, right, right_width = block
+        size = fonts[style][1] * scale
+        indent = 10.0 * scale if kind == 'bullet' else 0.0
+        reserve = (right_width + 1.5 * space) * size if right else 0.0
+        limit = (width - indent - reserve) / size
+        for n, (start, end, line_width) in enumerate(_wrap(widths, space, limit)):
+            y += size
+            text = ' '.join(words[start:end])
+            if kind == 'header' and template.align_header == 'center':
+                x = (width - line_width * size) / 2
+            else:
+                x = indent
+            ops.append(('text', style, x, y, text))
+            if n == 0:
+                if kind == 'bullet':
+                    ops.append(('text', style, indent - 8.0 * scale, y, '•'))
+                if right:
+                    ops.append(('text', style, width - right_width * size, y, right))
+                    limit = (width - indent) / size
+            y += size * (template.leading - 1)
+        if kind == 'header':
+            y += 2 * scale
+    return ops, y
+
+
+def _fit(template, measured, fonts):
+    """(ops, scale, truncated): the largest scale whose layout fits one page."""
+    available = template.height - 2 * template.margin
+    ops, height = _layout(template, measured, fonts, 1.0)
+    if height <= available:
+        return ops, 1.0, False
+    ops, height = _layout(template, measured, fonts, template.min_scale)
+    if height > available:
+        return ops, template.min_scale, True
+    low, high, best = template.min_scale, 1.0, ops
+    for _ in range(8):
+        middle = (low + high) / 2
+        candidate, height = _layout(template, measured, fonts, middle)
+        if height <= available:
+            low, best = middle, candidate
+        else:
+            high = middle
+    return best, low, False
+
+
+def render_resume(data, template=DEFAULT_TEMPLATE):
+    """Render structured_resume_data (dict or JSON text) as one PDF page.
+
+    Returns (pdf_bytes, info) with info = {'scale', 'truncated'}.
+    """
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            raise RenderError("Resume data is not valid JSON")
+    if not isinstance(data, dict):
+        raise RenderError("Resume data must be an object")
+    layout = TEMPLATES.get(template)
+    if layout is None:
+        raise RenderError(f"Unknown template: {template}")
+
+    fitz = warmup.load_fitz()
+    fonts = layout.fonts()
+    ops, scale, truncated = _fit(layout, _measure(_blocks(data), fonts), fonts)
+
+    doc = fitz.open()
+    page = doc.new_page(width=layout.width, height=layout.height)
+    for font in {font for font, _, _ in layout.styles.values()}:
+        page.insert_font(fontname=font)
+
+    # PDF space has its origin at the bottom left
+    left, right, top, bottom = layout.margin, layout.width - layout.margin, layout.margin, layout.height - layout.margin
+    stream = []
+    for op in ops:
+        y = top + (op[1] if op[0] == 'rule' else op[3])
+        if y > bottom:
+            continue
+        if op[0] == 'rule':
+            stream.append(b'q %s %.2f %.2f m %.2f %.2f l S Q' % (
+                layout.rule_operator, left, layout.height - y, right, layout.height - y))
+            continue
+        _, style, x, _, text = op
+        font, color = layout.operators[style]
+        stream.append(b'BT %s %.2f Tf %s %.2f %.2f Td (%s) Tj ET' % (
+            font, fonts[style][1] * scale, color, left + x, layout.height - y, _pdf_string(text)))
+    xref = doc.get_new_xref()
+    doc.update_object(xref, '<<>>')
+    doc.update_stream(xref, b'\n'.join(stream))
+    doc.xref_set_key(page.xref, 'Contents', f'{xref} 0 R')
+
+    doc.set_metadata({'title': _text(data.get('name')) or 'Resume', 'creator': 'AtsCv'})
+    pdf = doc.tobytes(garbage=1, deflate=True)
+    doc.close()
+    return pdf, {'scale': round(scale, 3), 'truncated': truncated}
+
+
+def _pdf_string(text):
+    return text.encode('cp1252').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+# --- worker pool -------------------------------------------------------------
+
+def _init_worker():
+    for template in TEMPLATES.values():
+        template.fonts()
+
+
+def _context():
+    # forkserver workers start from a clean server process that preloads only
+    # this module, not the web app (spawn is the fallback, e.g. on Windows)
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__, 'fitz'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class RenderPool:
+    """Runs render_resume in worker processes; workers=0 renders in the calling thread."""
+
+    def __init__(self, workers=RENDER_WORKERS, timeout=RENDER_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context(),
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def render(self, data, template=DEFAULT_TEMPLATE):
+        if not self.workers:
+            return render_resume(data, template)
+        executor = self._get_executor()
+        try:
+            return executor.submit(render_resume, data, template).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None  # a worker died; start a fresh pool next time
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+# --- cache -------------------------------------------------------------------
+
+def content_version(data):
+    """Short hash of structured_resume_data (dict or JSON text) and the layout format."""
+    if not isinstance(data, (str, bytes)):
+        data = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(b'%d:' % RENDER_FORMAT + data).hexdigest()[:16]
+
+
+class RenderCache:
+    """Bounded LRU of rendered PDFs keyed by (resume id, content version, template)."""
+
+    def __init__(self, max_bytes=RENDER_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, pdf, info):
+        if len(pdf) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (pdf, info)
+            self._bytes += len(pdf)
+            while self._bytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+pool = RenderPool()
+cache = RenderCache()
+
+
+def render_cached(resume_id, data, template=DEFAULT_TEMPLATE):
+    """(pdf_bytes, info, etag, cached) for a stored resume, rendering through the pool on a miss."""
+    if template not in TEMPLATES:
+        raise RenderError(f"Unknown template: {template}")
+    version = content_version(data)
+    key = (resume_id, version, template)
+    etag = f"{resume_id}-{version}-{template}"
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0], entry[1], etag, True
+    pdf, info = pool.render(data, template)
+    cache.put(key, pdf, info)
+    return pdf, info, etag, False
@@ -0,0 +1,47 @@
+"""Count SQL statements issued by a block of code.
+
+Used by the serializers and benchmarks to keep eager-loading paths from
+silently regressing into one-query-per-row lazy loads:
+
+    with assert_max_queries(5):
+        serialize_profile(load_profile(email=...))
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from db import db
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Yield a QueryCounter that records every statement run on the engine."""
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail with AssertionError if the block runs more than `limit` statements."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i + 1}. {s.splitlines()[0]}" for i, s in enumerate(counter.statements))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
@@ -0,0 +1,142 @@
+"""Incremental maintenance of DomainRanking.domain_rank.
+
+Within a domain, candidates are ordered by overall_score DESC, with ties
+broken by id ASC. domain_rank is the 1-based position in that order.
+
+Re-sorting the domain and rewriting every row whenever an interview finishes
+is O(n) writes per insert and serializes everything on hot domains. Instead,
+ORM flush events apply set-based UPDATEs that shift only the rows between
+the old and the new position of the changed row:
+
+- insert: rows behind the new row move down by one
+- delete: rows behind the removed row move up by one
+- score change: only rows between the old and new score shift by one
+- domain change: treated as a delete from the old domain plus an insert
+
+Every row whose rank is rewritten also gets last_updated bumped, so that
+incremental exports (exporter.py watermarks on it) pick up the new rank.
+
+recompute_domain_ranks() rebuilds ranks with ROW_NUMBER() as a batch
+fallback. Run it once via `flask --app app rank-domains` to backfill rows
+created before incremental ranking existed.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import bindparam, event, inspect, text
+from sqlalchemy.orm.attributes import set_committed_value
+
+from models import DomainRanking
+
+TABLE = DomainRanking.__tablename__
+
+# Order predicates relative to a reference row (score, id). The leading
+# range bound keeps them sargable on ix_domain_rankings_leaderboard.
+_AHEAD = "(overall_score >= :{s} AND (overall_score > :{s} OR id < :id))"
+_BEHIND = "(overall_score <= :{s} AND (overall_score < :{s} OR id > :id))"
+
+# Typed so the value is stored in the same format as ORM writes of the column
+_NOW = bindparam("now", type_=DomainRanking.__table__.c.last_updated.type)
+
+
+def _lock_domain(connection, domain):
+    """Serialize rank maintenance per domain on PostgreSQL (SQLite already
+    serializes writers)."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:domain))"), {"domain": domain})
+
+
+def _shift(connection, delta, where, params):
+    connection.execute(
+        text(f"UPDATE {TABLE} SET domain_rank = domain_rank + :delta, last_updated = :now "
+             f"WHERE domain = :domain AND {where}").bindparams(_NOW),
+        dict(params, delta=delta, now=datetime.now(timezone.utc)),
+    )
+
+
+def _assign_own_rank(connection, target):
+    rank = connection.execute(
+        text(f"SELECT COUNT(*) FROM {TABLE} WHERE domain = :domain AND " + _AHEAD.format(s="score")),
+        {"domain": target.domain, "score": target.overall_score, "id": target.id},
+    ).scalar() + 1
+    connection.execute(text(f"UPDATE {TABLE} SET domain_rank = :rank WHERE id = :id"),
+                       {"rank": rank, "id": target.id})
+    set_committed_value(target, "domain_rank", rank)
+    return rank
+
+
+def rank_inserted(connection, target):
+    _lock_domain(connection, target.domain)
+    params = {"domain": target.domain, "score": target.overall_score, "id": target.id}
+    _shift(connection, 1, _BEHIND.format(s="score"), params)
+    return _assign_own_rank(connection, target)
+
+
+def rank_removed(connection, domain, score, row_id):
+    _lock_domain(connection, domain)
+    _shift(connection, -1, _BEHIND.format(s="score"), {"domain": domain, "score": score, "id": row_id})
+
+
+def rank_rescored(connection, target, old_score):
+    new_score = target.overall_score
+    if new_score == old_score:
+        return target.domain_rank
+
+    _lock_domain(connection, target.domain)
+    params = {"domain": target.domain, "old": old_score, "new": new_score, "id": target.id}
+    if new_score > old_score:
+        # Moved up: rows that were ahead of the old position but are now
+        # behind the new one drop one place.
+        _shift(connection, 1, f"{_AHEAD.format(s='old')} AND {_BEHIND.format(s='new')}", params)
+    else:
+        _shift(connection, -1, f"{_BEHIND.format(s='old')} AND {_AHEAD.format(s='new')}", params)
+    return _assign_own_rank(connection, target)
+
+
+def recompute_domain_ranks(connection, domain=None):
+    """Full rebuild with ROW_NUMBER(); only rows whose rank changed are written.
+
+    Returns the number of rows updated.
+    """
+    where = "WHERE domain = :domain" if domain is not None else ""
+    result = connection.execute(
+        text(f"""
+            UPDATE {TABLE} SET domain_rank = ranked.position, last_updated = :now
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY domain ORDER BY overall_score DESC, id) AS position
+                FROM {TABLE} {where}
+            ) AS ranked
+            WHERE {TABLE}.id = ranked.id
+              AND ({TABLE}.domain_rank IS NULL OR {TABLE}.domain_rank <> ranked.position)
+        """).bindparams(_NOW),
+        dict({"domain": domain} if domain is not None else {}, now=datetime.now(timezone.utc)),
+    )
+    return result.rowcount
+
+
+def _previous(target, attr):
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+@event.listens_for(DomainRanking, "after_insert")
+def _after_insert(mapper, connection, target):
+    rank_inserted(connection, target)
+
+
+@event.listens_for(DomainRanking, "after_update")
+def _after_update(mapper, connection, target):
+    old_domain = _previous(target, "domain")
+    old_score = _previous(target, "overall_score")
+
+    if old_domain != target.domain:
+        rank_removed(connection, old_domain, old_score, target.id)
+        rank_inserted(connection, target)
+    elif old_score != target.overall_score:
+        rank_rescored(connection, target, old_score)
+
+
+@event.listens_for(DomainRanking, "after_delete")
+def _after_delete(mapper, connection, target):
+    rank_removed(connection, _previous(target, "domain"), _previous(target, "overall_score"), target.id)
@@ -0,0 +1,202 @@
+"""Composite interview session report.
+
+A session's results are spread over InterviewSession, InterviewQuestion,
+InterviewEvaluation/QuestionEvaluation, GrammarAnalysis/QuestionGrammarAnalysis,
+EmotionAnalysis, AttireAnalysis and DomainRanking. build_report() assembles
+them with a fixed number of queries (REPORT_MAX_QUERIES), whatever the
+question count: each table is read once for the session, and per-question
+scores are joined in Python on question_id.
+
+Reports of completed sessions are cached in interview_reports. Mapper events
+below bump interview_sessions.report_version in the same transaction as any
+insert, update or delete of the session or one of its child rows. A cached
+payload is used only while its version matches, and the version is read
+before the children, so a report built concurrently with a change is never
+served afterwards. The ranking is not cached: ranking.py shifts other rows'
+domain_rank with set-based SQL, so it is read fresh on every request.
+Bulk Core writes bypass the mapper events; call clear_report_cache() after them.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, event, insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from db import db
+from fieldsets import default_tree, load_options, serialize
+from models import (AttireAnalysis, DomainRanking, EmotionAnalysis, GrammarAnalysis, InterviewEvaluation,
+                    InterviewQuestion, InterviewReport, InterviewSession, QuestionEvaluation,
+                    QuestionGrammarAnalysis)
+
+# Bump when the report shape changes; payloads cached in another format are rebuilt
+REPORT_FORMAT = 1
+
+# questions, evaluation, question evaluations, grammar analysis, question
+# grammar analyses, emotion, attire
+REPORT_MAX_QUERIES = 7
+
+CACHED_STATUSES = ('completed',)
+
+_table = InterviewReport.__table__
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _latest(model, session_id, *options):
+    return (model.query.options(*options).filter_by(session_id=session_id)
+            .order_by(model.id.desc()).first())
+
+
+def build_report(session):
+    """Serialize `session` and its results (everything but the ranking)."""
+    questions = InterviewQuestion.query.filter_by(session_id=session.id).order_by(InterviewQuestion.id).all()
+    evaluation = _latest(InterviewEvaluation, session.id, selectinload(InterviewEvaluation.qa_evaluations))
+    grammar = _latest(GrammarAnalysis, session.id, selectinload(GrammarAnalysis.question_analyses))
+    emotion = _latest(EmotionAnalysis, session.id, *load_options(EmotionAnalysis))
+    attire = _latest(AttireAnalysis, session.id, *load_options(AttireAnalysis))
+
+    scores = {}
+    for qa in (evaluation.qa_evaluations if evaluation else ()):
+        # interview_question is already in the identity map, so to_dict() runs no SQL
+        entry = qa.to_dict()
+        del entry['question'], entry['answer']
+        scores[qa.question_id] = entry
+
+    qga_fields = default_tree(QuestionGrammarAnalysis.FIELDS)
+    del qga_fields['question'], qga_fields['question_id']
+    speech = {qa.question_id: serialize(qa, qga_fields) for qa in (grammar.question_analyses if grammar else ())}
+
+    grammar_fields = default_tree(GrammarAnalysis.FIELDS)
+    del grammar_fields['question_analyses']
+
+    return {
+        'session': {
+            'id': session.id,
+            'email': session.email,
+            'profile_id': session.profile_id,
+            'applied_role': session.applied_role,
+            'status': session.status,
+            'start_time': _iso(session.start_time),
+            'end_time': _iso(session.end_time),
+        },
+        'questions': [{
+            'id': question.id,
+            'question': question.question,
+            'answer': question.answer,
+            'timestamp': _iso(question.timestamp),
+            'evaluation': scores.get(question.id),
+            'grammar': speech.get(question.id),
+        } for question in questions],
+        'evaluation': {
+            'id': evaluation.id,
+            'overall_feedback': evaluation.overall_feedback,
+            'final_average_score': evaluation.final_average_score,
+            'timestamp': _iso(evaluation.timestamp),
+        } if evaluation else None,
+        'grammar': serialize(grammar, grammar_fields) if grammar else None,
+        'emotion': emotion.to_dict() if emotion else None,
+        'attire': attire.to_dict() if attire else None,
+    }
+
+
+def _cached(session_id, version):
+    row = db.session.execute(select(_table.c.version, _table.c.payload)
+                             .where(_table.c.session_id == session_id)).first()
+    if row is None or row.version != version:
+        return None
+    payload = json.loads(row.payload)
+    return payload['report'] if payload.get('format') == REPORT_FORMAT else None
+
+
+def _store(session_id, version, report):
+    try:
+        db.session.execute(delete(_table).where(_table.c.session_id == session_id))
+        db.session.execute(insert(_table).values(
+            session_id=session_id, version=version, built_at=datetime.utcnow(),
+            payload=json.dumps({'format': REPORT_FORMAT, 'report': report})))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # a concurrent request stored it first
+
+
+def get_report(session_id, email):
+    """(report, cached) for the user's session, or (None, False) if it is not theirs."""
+    session = InterviewSession.query.filter_by(id=session_id, email=email).first()
+    if session is None:
+        return None, False
+
+    version = session.report_version or 0
+    cacheable = session.status in CACHED_STATUSES
+    report = _cached(session_id, version) if cacheable else None
+    cached = report is not None
+    if report is None:
+        report = build_report(session)
+        if cacheable:
+            _store(session_id, version, report)
+
+    ranking = DomainRanking.query.filter_by(session_id=session_id).first()
+    report['ranking'] = ranking.to_dict() if ranking else None
+    return report, cached
+
+
+def clear_report_cache():
+    """Drop every cached report (after bulk or Core writes that skip the mapper events)."""
+    deleted = db.session.execute(delete(_table)).rowcount
+    db.session.commit()
+    return deleted
+
+
+# --- invalidation ------------------------------------------------------------
+
+# model -> (foreign key attribute, table that maps it to a session id, or None if it is the session id)
+_PARENTS = {
+    InterviewSession: ('id', None),
+    InterviewQuestion: ('session_id', None),
+    InterviewEvaluation: ('session_id', None),
+    GrammarAnalysis: ('session_id', None),
+    EmotionAnalysis: ('session_id', None),
+    AttireAnalysis: ('session_id', None),
+    QuestionEvaluation: ('evaluation_id', 'interview_evaluations'),
+    QuestionGrammarAnalysis: ('grammar_analysis_id', 'grammar_analysis'),
+}
+
+
+def _bump(connection, target):
+    attr, via = _PARENTS[type(target)]
+    history = inspect(target).attrs[attr].history
+    ids = {value for value in (getattr(target, attr), *history.deleted) if value is not None}
+    session_id = ':id' if via is None else f'(SELECT session_id FROM {via} WHERE id = :id)'
+    for value in ids:
+        connection.execute(text(
+            "UPDATE interview_sessions SET report_version = coalesce(report_version, 0) + 1 "
+            f"WHERE id = {session_id}"), {'id': value})
+    session = inspect(target).session
+    if session is not None:
+        session.info['report_versions_changed'] = True
+
+
+def _on_change(mapper, connection, target):
+    _bump(connection, target)
+
+
+for _model in _PARENTS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _on_change)
+
+
+@event.listens_for(InterviewSession, 'after_delete')
+def _drop_report(mapper, connection, target):
+    connection.execute(delete(_table).where(_table.c.session_id == target.id))
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_report_versions(session, flush_context):
+    """The version was bumped with SQL; drop the in-memory copies."""
+    if not session.info.pop('report_versions_changed', False):
+        return
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, InterviewSession):
+            session.expire(obj, ['report_version'])
@@ -0,0 +1,307 @@
+"""Full-text search over resumes.
+
+The inverted index lives in the database and is maintained there, so bulk
+Core inserts are indexed as well as ORM writes:
+
+- SQLite: an FTS5 table (resume_fts, rowid = resumes.id) kept in sync by
+  AFTER INSERT/UPDATE/DELETE triggers on resumes. structured_resume_data is
+  flattened to its string values with json_tree().
+- PostgreSQL: a generated tsvector column resumes.search_vector with a GIN
+  index. Resume text is weighted A, structured data B, job description D.
+
+Queries such as `kubernetes AND terraform`, `"site reliability" OR sre` or
+`python -django` are parsed by parse_query() into OR-ed groups of AND-ed
+terms. They are then rendered for each dialect with every term quoted or
+bound, so user input never reaches the MATCH / tsquery grammar directly.
+Ranking is bm25 (SQLite) or ts_rank_cd (PostgreSQL). Snippets are built
+only for the returned page.
+
+Scoring every match of a broad term ("python" in half of a million resumes)
+would dominate latency. Unscoped searches therefore rank only the newest
+RANK_WINDOW matches (highest ids), which a posting-list scan finds cheaply.
+The same scan tells whether older matches were left out, and
+search_resumes() reports that (`truncated`) so callers can say so. Searches
+scoped to one candidate filter first and rank the few rows left.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+
+import config
+from db import db
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+MAX_LIMIT = 100
+RANK_WINDOW = config.env_int("SEARCH_RANK_WINDOW", 10000)
+
+# Column weights for bm25(): resume text, structured data, job description
+_BM25_WEIGHTS = '10.0, 4.0, 1.0'
+
+_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchQueryError(ValueError):
+    pass
+
+
+def parse_query(query):
+    """'a AND b OR "c d" -e' -> [[(False, 'a'), (False, 'b')], [(False, 'c d'), (True, 'e')]]
+
+    Terms in a group are AND-ed (AND is optional); groups are OR-ed. NOT or a
+    leading '-' negates the next term.
+    """
+    groups, group, negate = [], [], False
+    for match in _TOKEN.finditer(query or ''):
+        phrase, word = match.groups()
+        if word == 'AND':
+            continue
+        if word == 'OR':
+            groups.append(group)
+            group, negate = [], False
+            continue
+        if word == 'NOT':
+            negate = True
+            continue
+        if word and word.startswith('-') and len(word) > 1:
+            negate, word = True, word[1:]
+        term = (phrase if phrase is not None else word).strip()
+        if term:
+            group.append((negate, term))
+        negate = False
+    groups.append(group)
+
+    groups = [group for group in groups if group]
+    if not groups:
+        raise SearchQueryError("Search query is empty")
+    if any(all(negated for negated, _ in group) for group in groups):
+        raise SearchQueryError("Each OR-group needs at least one term that is not negated")
+    return groups
+
+
+def _fts5_query(groups):
+    def quote(term):
+        return '"' + term.replace('"', '""') + '"'
+
+    rendered = []
+    for group in groups:
+        positive = ' AND '.join(quote(term) for negated, term in group if not negated)
+        negative = ''.join(f' NOT {quote(term)}' for negated, term in group if negated)
+        rendered.append(f'({positive}{negative})')
+    return ' OR '.join(rendered)
+
+
+def _tsquery(groups, params):
+    rendered = []
+    for group in groups:
+        parts = []
+        for negated, term in group:
+            name = f'term_{len(params)}'
+            params[name] = term
+            parts.append(f"{'!!' if negated else ''}phraseto_tsquery('english', :{name})")
+        rendered.append('(' + ' && '.join(parts) + ')')
+    return ' || '.join(rendered)
+
+
+# --- index DDL ---------------------------------------------------------------
+
+def _flatten_json(column):
+    return (f"CASE WHEN json_valid({column}) "
+            f"THEN (SELECT group_concat(value, ' ') FROM json_tree({column}) WHERE type = 'text') "
+            f"ELSE {column} END")
+
+
+def _fts_insert(prefix):
+    return (f"INSERT INTO resume_fts(rowid, resume_text, structured_text, job_description) "
+            f"VALUES ({prefix}.id, {prefix}.original_resume_text, "
+            f"{_flatten_json(prefix + '.structured_resume_data')}, {prefix}.job_description);")
+
+
+_SQLITE_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS resumes_fts_insert AFTER INSERT ON resumes BEGIN
+        {_fts_insert('new')}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS resumes_fts_delete AFTER DELETE ON resumes BEGIN
+        DELETE FROM resume_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS resumes_fts_update
+        AFTER UPDATE OF original_resume_text, structured_resume_data, job_description ON resumes BEGIN
+        DELETE FROM resume_fts WHERE rowid = old.id;
+        {_fts_insert('new')}
+    END""",
+)
+
+_SQLITE_BACKFILL = f"""
+    INSERT INTO resume_fts(rowid, resume_text, structured_text, job_description)
+    SELECT id, original_resume_text, {_flatten_json('structured_resume_data')}, job_description FROM resumes
+"""
+
+_POSTGRES_DDL = (
+    """ALTER TABLE resumes ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(original_resume_text, '')), 'A') ||
+        setweight(json_to_tsvector('english', coalesce(structured_resume_data, '{}'::json), '["string"]'), 'B') ||
+        setweight(to_tsvector('english', coalesce(job_description, '')), 'D')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_resumes_search_vector ON resumes USING GIN (search_vector)",
+)
+
+
+def ensure_search_index():
+    """Create the search index (and backfill it) if missing. Must run in an app context.
+
+    Returns the names of the objects created, for run_migrations() to report.
+    """
+    dialect = db.engine.dialect.name
+    created = []
+    if dialect == 'sqlite':
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resume_fts'")).first()
+        if not exists:
+            db.session.execute(text(
+                "CREATE VIRTUAL TABLE resume_fts USING fts5("
+                "resume_text, structured_text, job_description, tokenize = 'porter unicode61')"))
+            db.session.execute(text("INSERT INTO resume_fts(resume_fts, rank) VALUES ('rank', :rank)"),
+                               {'rank': f'bm25({_BM25_WEIGHTS})'})
+            db.session.execute(text(_SQLITE_BACKFILL))
+            created.append('resume_fts')
+        for statement in _SQLITE_TRIGGERS:
+            db.session.execute(text(statement))
+    elif dialect == 'postgresql':
+        has_column = db.session.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'resumes' AND column_name = 'search_vector'")).first()
+        for statement in _POSTGRES_DDL:
+            db.session.execute(text(statement))
+        if not has_column:
+            created.append('resumes.search_vector')
+    else:
+        print(f"⚠️ Full-text search is not supported on {dialect}")
+    db.session.commit()
+    return created
+
+
+def rebuild_search_index():
+    """Rebuild the index from the resumes table (repair path)."""
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text("DELETE FROM resume_fts"))
+        db.session.execute(text(_SQLITE_BACKFILL))
+        db.session.execute(text("INSERT INTO resume_fts(resume_fts) VALUES ('optimize')"))
+    elif db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("REINDEX INDEX ix_resumes_search_vector"))
+    db.session.commit()
+
+
+# --- queries -----------------------------------------------------------------
+
+def _sqlite_search(groups, email, limit, offset):
+    """(rows, truncated) for SQLite."""
+    params = {'match': _fts5_query(groups), 'limit': limit, 'offset': offset,
+              'start': SNIPPET_START, 'end': SNIPPET_END}
+    bound = None
+    if email is None:
+        # ORDER BY rank lets FTS5 sort internally, so snippet() runs only for
+        # the page; the rowid bound is the (RANK_WINDOW + 1)-th newest match.
+        bound = db.session.execute(
+            text("SELECT rowid FROM resume_fts WHERE resume_fts MATCH :match ORDER BY rowid DESC "
+                 "LIMIT 1 OFFSET :window"), {'match': params['match'], 'window': RANK_WINDOW}).scalar()
+        rank, order = 'rank', 'rank'
+        scope = "AND rowid > :bound"
+        params['bound'] = bound or 0
+    else:
+        # '+rowid' keeps the IN list out of the FTS5 lookup (one MATCH per id);
+        # the posting list is scanned once and only the candidate's rows scored.
+        rank, order = f'bm25(resume_fts, {_BM25_WEIGHTS})', 'score'
+        scope = ("AND +rowid IN (SELECT r.id FROM resumes r JOIN candidate_profiles p ON p.id = r.profile_id "
+                 "WHERE p.email = :email)")
+        params['email'] = email
+    sql = f"""
+        SELECT m.rowid AS resume_id, r.profile_id, p.email, r.created_at, -m.score AS score, m.snippet
+        FROM (
+            SELECT rowid, {rank} AS score, snippet(resume_fts, -1, :start, :end, '…', 16) AS snippet
+            FROM resume_fts
+            WHERE resume_fts MATCH :match {scope}
+            ORDER BY {order}
+            LIMIT :limit OFFSET :offset
+        ) m
+        JOIN resumes r ON r.id = m.rowid
+        JOIN candidate_profiles p ON p.id = r.profile_id
+        ORDER BY m.score
+    """
+    return db.session.execute(text(sql), params).mappings().all(), bound is not None
+
+
+def _postgres_search(groups, email, limit, offset):
+    """(rows, truncated) for PostgreSQL."""
+    params = {'limit': limit, 'offset': offset,
+              'headline': f'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=30, MinWords=12, '
+                          f'MaxFragments=2, FragmentDelimiter=" … "'}
+    tsquery = _tsquery(groups, params)
+    bound = None
+    if email is None:
+        scope_join = ''
+        # 'w.id + 0' keeps the planner on the GIN index instead of walking the
+        # primary key backwards, which is slow for rare terms.
+        bound = db.session.execute(
+            text(f"SELECT w.id FROM resumes w WHERE w.search_vector @@ {tsquery} "
+                 "ORDER BY w.id + 0 DESC OFFSET :window LIMIT 1"),
+            dict({k: v for k, v in params.items() if k.startswith('term_')}, window=RANK_WINDOW)).scalar()
+        scope_where = "AND r.id > :bound"
+        params['bound'] = bound or 0
+    else:
+        scope_join = 'JOIN candidate_profiles p ON p.id = r.profile_id'
+        scope_where = 'AND p.email = :email'
+        params['email'] = email
+    sql = f"""
+        WITH query AS (SELECT {tsquery} AS q),
+        matches AS (
+            SELECT r.id, ts_rank_cd(r.search_vector, query.q) AS score
+            FROM resumes r {scope_join}, query
+            WHERE r.search_vector @@ query.q {scope_where}
+            ORDER BY score DESC, r.id
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT m.id AS resume_id, r.profile_id, p.email, r.created_at, m.score,
+               ts_headline('english', r.original_resume_text, query.q, :headline) AS snippet
+        FROM matches m
+        JOIN resumes r ON r.id = m.id
+        JOIN candidate_profiles p ON p.id = r.profile_id
+        CROSS JOIN query
+        ORDER BY m.score DESC, m.id
+    """
+    return db.session.execute(text(sql), params).mappings().all(), bound is not None
+
+
+def search_resumes(query, email=None, limit=20, offset=0):
+    """Ranked resume matches for `query`, best first, and whether matches were left unranked.
+
+    `email` restricts results to that candidate's resumes (None searches
+    all). Returns ([{'resume_id', 'profile_id', 'email', 'created_at',
+    'score', 'snippet'}], truncated); higher score is better. truncated is
+    True when an unscoped query matched more than RANK_WINDOW resumes and
+    only the newest RANK_WINDOW were ranked. Raises SearchQueryError for an
+    empty or all-negative query.
+    """
+    groups = parse_query(query)
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    offset = max(0, int(offset))
+    if db.engine.dialect.name == 'postgresql':
+        rows, truncated = _postgres_search(groups, email, limit, offset)
+    else:
+        rows, truncated = _sqlite_search(groups, email, limit, offset)
+
+    results = []
+    for row in rows:
+        created_at = row['created_at']
+        if isinstance(created_at, str):
+            # SQLite returns DATETIME columns as text from raw SQL
+            created_at = datetime.fromisoformat(created_at)
+        results.append({
+            'resume_id': row['resume_id'],
+            'profile_id': row['profile_id'],
+            'email': row['email'],
+            'created_at': created_at.isoformat() if created_at else None,
+            'score': round(float(row['score']), 6),
+            'snippet': row['snippet'],
+        })
+    return results, truncated
@@ -0,0 +1,74 @@
+"""Query-bounded serialization of CandidateProfile graphs.
+
+CandidateProfile.to_dict() walks github_profile -> repositories -> code_files
+through lazy relationships. That is one query per repository, and it inlines
+every README and source file. The helpers here build a fieldsets.py selection
+for the profile and load the whole graph with select-in loading in a fixed
+number of queries (PROFILE_MAX_QUERIES) regardless of repository count. The
+heavy text columns are left out of both the SELECT and the output unless the
+caller asks for them.
+"""
+from fieldsets import default_tree, load_options, resolve_fields, serialize
+from models import CandidateProfile, GitHubProfile, Repository
+
+# Heavy text fields that are omitted unless named in `include`.
+HEAVY_FIELDS = ("readme", "code_content")
+
+# profile, resume_data, github_profile, repositories, code_files, plus the text
+# blobs of READMEs and file contents when included
+PROFILE_MAX_QUERIES = 7
+
+
+def parse_include(value):
+    """Turn "readme,code_content" into a validated set of heavy field names."""
+    if not value:
+        return frozenset()
+    requested = {part.strip() for part in value.split(",") if part.strip()}
+    unknown = requested - set(HEAVY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown include field(s): {', '.join(sorted(unknown))}")
+    return frozenset(requested)
+
+
+def profile_fields(include=(), fields=None):
+    """Field selection for a profile response.
+
+    An explicit `fields` value (?fields=...) is used as-is. Otherwise this is
+    the full to_dict() shape minus the heavy fields not in `include`.
+    """
+    if fields:
+        return resolve_fields(CandidateProfile, fields)
+
+    repo = default_tree(Repository.FIELDS)
+    if "readme" not in include:
+        del repo['readme']
+    repo['code_files'] = True if "code_content" in include else {'filename': True}
+
+    github = default_tree(GitHubProfile.FIELDS)
+    github['repos'] = repo
+
+    tree = default_tree(CandidateProfile.FIELDS)
+    tree['github'] = github
+    return tree
+
+
+def profile_load_options(include=(), fields=None):
+    """Loader options that fetch a profile's selected graph in at most PROFILE_MAX_QUERIES."""
+    return load_options(CandidateProfile, profile_fields(include, fields))
+
+
+def load_profile(email=None, profile_id=None, include=(), fields=None):
+    query = CandidateProfile.query.options(*profile_load_options(include, fields))
+    if profile_id is not None:
+        query = query.filter_by(id=profile_id)
+    else:
+        query = query.filter_by(email=email)
+    return query.first()
+
+
+def serialize_profile(profile, include=(), fields=None):
+    """Same shape as CandidateProfile.to_dict(), minus heavy fields not in `include`.
+
+    Expects a profile loaded with profile_load_options(include, fields).
+    """
+    return serialize(profile, profile_fields(include, fields))
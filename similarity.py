@@ -0,0 +1,378 @@
+"""Local top-k resume-to-job similarity index.
+
+Each resume becomes a sparse hashed feature vector. Features are its word
+unigrams and bigrams, plus (with SKILL_WEIGHT) those of the entries in its
+structured `skills` and project `technologies` lists. They are hashed into
+DIM buckets with CRC32, so the mapping is stable across processes. Weights
+are sublinear term frequencies, L2-normalized per resume. A job description
+is scored against every resume as sum(idf * query tf * resume weight) over
+the features they share, with idf from the current document frequencies.
+
+Resumes are stored in segments: feature-major CSR arrays (indptr, docs,
+weights) saved as .npy files and memory-mapped on load, so a query only
+reads the posting lists of its own features. New resumes go to an in-memory
+delta segment. flush() writes the delta as a new segment, and compact()
+merges all segments into one. Query features found in more than MAX_DF_RATIO
+of resumes are dropped, and the rest are capped at MAX_QUERY_FEATURES. This
+bounds query cost however many resumes are stored.
+
+sync_index() pulls resumes newer than the index into the delta. The
+/api/resumes/similar endpoint runs it (and picks up segments flushed by
+other processes) before each query. `flask --app app index-resumes` syncs
+and flushes to disk; it is the only writer of the on-disk segments.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import zlib
+
+from sqlalchemy import select
+
+from db import db
+from models import Resume
+
+DIM = 1 << 18
+SKILL_WEIGHT = 3.0
+MAX_QUERY_FEATURES = 64
+MAX_DF_RATIO = 0.3
+# Below this many postings a feature is never pruned, so small indexes still match.
+MIN_PRUNE_DF = 1000
+
+META_FILE = 'meta.json'
+_SEGMENT_ARRAYS = ('indptr', 'docs', 'weights', 'resume_ids')
+
+
+def _np():
+    import numpy as np  # deferred: keeps numpy off the app import path
+    return np
+
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+
+def _term_features(text):
+    """(unique feature ids, counts) of the unigrams and bigrams in `text`."""
+    np = _np()
+    words = _WORD.findall((text or '').lower())
+    tokens = words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+    hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), np.int64, len(tokens))
+    return np.unique((hashes % DIM).astype(np.int32), return_counts=True)
+
+
+def resume_skills(structured):
+    """Skill strings from structured_resume_data (dict or JSON text)."""
+    if isinstance(structured, str):
+        try:
+            structured = json.loads(structured)
+        except ValueError:
+            return []
+    if not isinstance(structured, dict):
+        return []
+    skills = [skill for skill in structured.get('skills') or [] if isinstance(skill, str)]
+    for project in structured.get('projects') or []:
+        if isinstance(project, dict):
+            skills.extend(tech for tech in project.get('technologies') or [] if isinstance(tech, str))
+    return skills
+
+
+def vectorize(text, skills=()):
+    """(features, weights) for one resume: int32 feature ids and L2-normalized float32 weights."""
+    np = _np()
+    text_features, counts = _term_features(text)
+    skill_features = np.unique(np.concatenate([_term_features(skill)[0] for skill in skills] or
+                                              [np.empty(0, np.int32)]))
+    features = np.union1d(text_features, skill_features)
+    if not len(features):
+        return features, np.empty(0, np.float32)
+
+    weights = np.zeros(len(features), np.float32)
+    weights[np.searchsorted(features, text_features)] = 1.0 + np.log(counts)
+    weights[np.searchsorted(features, skill_features)] += SKILL_WEIGHT
+    weights /= np.linalg.norm(weights)
+    return features, weights
+
+
+class _Segment:
+    """Feature-major CSR postings for a batch of resumes."""
+
+    def __init__(self, indptr, docs, weights, resume_ids, alive, path=None):
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        self.resume_ids = resume_ids
+        self.alive = alive
+        self.path = path
+
+    @classmethod
+    def build(cls, resume_ids, vectors):
+        np = _np()
+        lengths = [len(features) for features, _ in vectors]
+        features = np.concatenate([f for f, _ in vectors]) if vectors else np.empty(0, np.int32)
+        weights = np.concatenate([w for _, w in vectors]) if vectors else np.empty(0, np.float32)
+        docs = np.repeat(np.arange(len(vectors), dtype=np.int32), lengths)
+        return cls.from_postings(features, docs, weights, resume_ids)
+
+    @classmethod
+    def from_postings(cls, features, docs, weights, resume_ids):
+        np = _np()
+        order = np.argsort(features, kind='stable')
+        indptr = np.zeros(DIM + 1, np.int64)
+        np.cumsum(np.bincount(features, minlength=DIM), out=indptr[1:])
+        return cls(indptr, docs[order], weights[order], np.asarray(resume_ids, np.int64),
+                   np.ones(len(resume_ids), bool))
+
+    @classmethod
+    def load(cls, path):
+        np = _np()
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in _SEGMENT_ARRAYS}
+        alive = np.array(np.load(os.path.join(path, 'alive.npy')))
+        return cls(alive=alive, path=path, **arrays)
+
+    def save(self, path):
+        np = _np()
+        os.makedirs(path, exist_ok=True)
+        for name in _SEGMENT_ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        self.save_alive(path)
+
+    def save_alive(self, path=None):
+        np = _np()
+        np.save(os.path.join(path or self.path, 'alive.npy'), self.alive)
+
+    def __len__(self):
+        return len(self.resume_ids)
+
+    def document_frequencies(self):
+        np = _np()
+        return np.diff(self.indptr)
+
+    def locate(self, resume_id):
+        np = _np()
+        return np.flatnonzero(np.asarray(self.resume_ids) == resume_id)
+
+    def postings(self):
+        """(feature, doc, weight) arrays for every posting; used by compact()."""
+        np = _np()
+        features = np.repeat(np.arange(DIM, dtype=np.int32), np.diff(self.indptr))
+        return features, np.asarray(self.docs), np.asarray(self.weights)
+
+    def scores(self, features, query_weights):
+        np = _np()
+        docs, weights = [], []
+        for feature, query_weight in zip(features, query_weights):
+            start, end = self.indptr[feature], self.indptr[feature + 1]
+            if start != end:
+                docs.append(self.docs[start:end])
+                weights.append(self.weights[start:end] * query_weight)
+        if not docs:
+            return None
+        return np.bincount(np.concatenate(docs), weights=np.concatenate(weights), minlength=len(self))
+
+
+class SimilarityIndex:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._load()
+
+    def _meta_path(self):
+        return os.path.join(self.path, META_FILE)
+
+    def _load(self):
+        np = _np()
+        meta = {}
+        if os.path.exists(self._meta_path()):
+            with open(self._meta_path(), encoding='utf-8') as f:
+                meta = json.load(f)
+        self._meta_mtime = os.path.getmtime(self._meta_path()) if meta else None
+        self.segments = [_Segment.load(os.path.join(self.path, name)) for name in meta.get('segments', [])]
+        self.flushed_resume_id = meta.get('max_resume_id', 0)
+        self.max_resume_id = self.flushed_resume_id
+        self._pending_ids, self._pending_vectors, self._delta = [], [], None
+        self._df = np.zeros(DIM, np.int64)
+        for segment in self.segments:
+            self._df += segment.document_frequencies()
+
+    def reload_if_changed(self):
+        """Pick up segments flushed by another process; unflushed newer resumes are kept."""
+        mtime = os.path.getmtime(self._meta_path()) if os.path.exists(self._meta_path()) else None
+        if mtime == self._meta_mtime:
+            return False
+        with self._lock:
+            pending = list(zip(self._pending_ids, self._pending_vectors))
+            self._load()
+            for resume_id, vector in pending:
+                if resume_id > self.flushed_resume_id:
+                    self._add_vector(resume_id, vector)
+        return True
+
+    def __len__(self):
+        flushed = sum(int(segment.alive.sum()) for segment in self.segments)
+        return flushed + len(self._pending_ids)
+
+    def _segments(self):
+        if self._pending_ids and self._delta is None:
+            self._delta = _Segment.build(self._pending_ids, self._pending_vectors)
+        return self.segments + ([self._delta] if self._pending_ids else [])
+
+    def remove(self, resume_id):
+        with self._lock:
+            for segment in self.segments:
+                segment.alive[segment.locate(resume_id)] = False
+            if resume_id in self._pending_ids:
+                index = self._pending_ids.index(resume_id)
+                features, _ = self._pending_vectors[index]
+                self._df[features] -= 1
+                del self._pending_ids[index], self._pending_vectors[index]
+                self._delta = None
+
+    def _add_vector(self, resume_id, vector):
+        if resume_id <= self.max_resume_id:
+            self.remove(resume_id)
+        self._pending_ids.append(resume_id)
+        self._pending_vectors.append(vector)
+        self._df[vector[0]] += 1
+        self._delta = None
+        self.max_resume_id = max(self.max_resume_id, resume_id)
+
+    def add(self, resume_id, text, skills=()):
+        """Add (or replace) one resume in the in-memory delta."""
+        vector = vectorize(text, skills)
+        with self._lock:
+            self._add_vector(resume_id, vector)
+
+    def _query_vector(self, text):
+        np = _np()
+        total = max(len(self), 1)
+        features, weights = [], []
+        for feature, count in zip(*_term_features(text)):
+            df = self._df[feature]
+            if df == 0 or (df > MAX_DF_RATIO * total and df > MIN_PRUNE_DF):
+                continue
+            features.append(feature)
+            weights.append((1.0 + math.log(count)) * math.log((1.0 + total) / (1.0 + df)))
+        if len(features) > MAX_QUERY_FEATURES:
+            keep = np.argsort(weights)[::-1][:MAX_QUERY_FEATURES]
+            features = [features[i] for i in keep]
+            weights = [weights[i] for i in keep]
+        return features, weights
+
+    def query(self, text, k=10, resume_ids=None):
+        """Top-k [(resume_id, score)] for a job description, best first.
+
+        `resume_ids` restricts the candidates (e.g. to the caller's own resumes).
+        """
+        np = _np()
+        with self._lock:
+            segments = self._segments()
+            features, weights = self._query_vector(text)
+        allowed = None if resume_ids is None else np.asarray(list(resume_ids), np.int64)
+
+        best = []
+        for segment in segments:
+            scores = segment.scores(features, weights)
+            if scores is None:
+                continue
+            scores[~segment.alive] = 0
+            if allowed is not None:
+                scores[~np.isin(segment.resume_ids, allowed)] = 0
+            top = np.argpartition(scores, -k)[-k:] if len(scores) > k else np.arange(len(scores))
+            best.extend((int(segment.resume_ids[i]), float(scores[i])) for i in top if scores[i] > 0)
+        best.sort(key=lambda item: (-item[1], item[0]))
+        return best[:k]
+
+    def flush(self):
+        """Write the delta as a new on-disk segment. Returns the number of resumes written."""
+        with self._lock:
+            written = len(self._pending_ids)
+            names = [os.path.basename(segment.path) for segment in self.segments]
+            if written:
+                name = f"seg-{self._next_segment_number():06d}"
+                self._segments()[-1].save(os.path.join(self.path, name))
+                names.append(name)
+            for segment in self.segments:
+                segment.save_alive()
+            self._write_meta(names)
+            self._load()
+            return written
+
+    def compact(self):
+        """Merge all segments (dropping removed resumes) into one."""
+        np = _np()
+        with self._lock:
+            self.flush()
+            if len(self.segments) <= 1 and all(segment.alive.all() for segment in self.segments):
+                return
+            features, docs, weights, ids = [], [], [], []
+            offset = 0
+            for segment in self.segments:
+                segment_features, segment_docs, segment_weights = segment.postings()
+                keep = segment.alive[segment_docs]
+                new_doc = (np.cumsum(segment.alive) - 1 + offset).astype(np.int32)
+                features.append(segment_features[keep])
+                docs.append(new_doc[segment_docs[keep]])
+                weights.append(segment_weights[keep])
+                ids.append(np.asarray(segment.resume_ids)[segment.alive])
+                offset += int(segment.alive.sum())
+            merged = _Segment.from_postings(np.concatenate(features), np.concatenate(docs),
+                                            np.concatenate(weights), np.concatenate(ids))
+            old = [segment.path for segment in self.segments]
+            name = f"seg-{self._next_segment_number():06d}"
+            merged.save(os.path.join(self.path, name))
+            self._write_meta([name])
+            self._load()
+            for path in old:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _next_segment_number(self):
+        numbers = [int(name[4:]) for name in os.listdir(self.path) if name.startswith('seg-')] \
+            if os.path.isdir(self.path) else []
+        return max(numbers, default=0) + 1
+
+    def _write_meta(self, names):
+        os.makedirs(self.path, exist_ok=True)
+        meta = {'dim': DIM, 'segments': names, 'max_resume_id': self.max_resume_id}
+        with open(self._meta_path() + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(self._meta_path() + '.tmp', self._meta_path())
+
+
+def sync_index(index, batch_size=1000, max_batches=None):
+    """Add resumes newer than the index to its delta. Must run in an app context.
+
+    max_batches bounds the work per call (request path); the CLI passes None
+    to catch up fully. Returns the number of resumes added.
+    """
+    table = Resume.__table__
+    added, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        rows = db.session.execute(
+            select(table.c.id, table.c.original_resume_text, table.c.structured_resume_data)
+            .where(table.c.id > index.max_resume_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return added
+        for row in rows:
+            index.add(row.id, row.original_resume_text, resume_skills(row.structured_resume_data))
+        added += len(rows)
+    return added
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Process-wide index at SIMILARITY_INDEX_DIR (default "similarity_index")."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SimilarityIndex(os.getenv("SIMILARITY_INDEX_DIR", "similarity_index"))
+    return _index
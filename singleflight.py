@@ -0,0 +1,160 @@
+"""Single-flight coalescing of concurrent identical requests.
+
+Double-clicks, frontend retries and duplicate tabs send the same generation
+two or three times at once. SingleFlight.do(key, fn) runs fn once per key:
+the first caller (the leader) does the work, and callers arriving while it
+runs wait for its result and share it. An exception raised by the leader is
+re-raised in every waiter.
+
+With db_lock=True the leader also takes a lease row in inflight_generations,
+so duplicates handled by other worker processes wait as well. The leader
+stores a successful (payload, status) result in the row for `result_ttl`
+seconds, and other processes poll the row and return that result. A lease whose
+owner died expires after `lease_seconds` and is taken over.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+import config
+from db import db
+from models import InflightGeneration
+
+
+def request_key(*parts):
+    """Stable key from str/bytes parts; each part is hashed separately so no concatenation is ambiguous."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name, db_lock=False, lease_seconds=120.0, result_ttl=30.0, poll_interval=0.25):
+        self.name = name
+        self.db_lock = db_lock
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'executed': 0, 'shared_in_process': 0, 'shared_cross_process': 0}
+
+    def do(self, key, fn):
+        """Return (result, shared): fn() run once per in-flight key, shared=True for coalesced callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self._counters['shared_in_process'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        shared = False
+        try:
+            if self.db_lock:
+                call.result, shared = self._do_with_lease(key, fn)
+            else:
+                call.result, shared = fn(), False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._counters['shared_cross_process' if shared else 'executed'] += 1
+            call.done.set()
+        return call.result, shared
+
+    # --- cross-process lease ---------------------------------------------------
+
+    def _acquire_lease(self, key, now):
+        table = InflightGeneration.__table__
+        db.session.execute(delete(table).where(table.c.expires_at < now))
+        try:
+            db.session.execute(insert(table).values(
+                key=key, owner=self.owner, expires_at=now + timedelta(seconds=self.lease_seconds)))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    def _do_with_lease(self, key, fn):
+        table = InflightGeneration.__table__
+        deadline = time.monotonic() + self.lease_seconds
+        while True:
+            if self._acquire_lease(key, datetime.utcnow()):
+                break
+            row = db.session.execute(select(table.c.status_code, table.c.response)
+                                     .where(table.c.key == key)).first()
+            db.session.rollback()  # end the read so the next poll sees new commits
+            if row is not None and row.response is not None:
+                return (json.loads(row.response), row.status_code), True
+            if time.monotonic() > deadline:
+                break  # the other process is stuck; do the work rather than fail
+            time.sleep(self.poll_interval)
+
+        try:
+            result = fn()
+        except BaseException:
+            db.session.rollback()
+            db.session.execute(delete(table).where(table.c.key == key, table.c.owner == self.owner))
+            db.session.commit()
+            raise
+        payload, status = result
+        if status >= 400:
+            # Failures are not shared with later callers; let the next one retry
+            db.session.execute(delete(table).where(table.c.key == key, table.c.owner == self.owner))
+            db.session.commit()
+            return result, False
+        db.session.execute(table.update().where(table.c.key == key).values(
+            owner=self.owner, status_code=status, response=json.dumps(payload),
+            expires_at=datetime.utcnow() + timedelta(seconds=self.result_ttl)))
+        db.session.commit()
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            executed = self._counters['executed']
+            shared = self._counters['shared_in_process'] + self._counters['shared_cross_process']
+            total = executed + shared
+            return {
+                'name': self.name,
+                'db_lock': self.db_lock,
+                'in_flight': len(self._calls),
+                **self._counters,
+                'dedupe_rate': round(shared / total, 4) if total else 0.0,
+            }
+
+
+# Resume generation, keyed on (user, file digest, job-description digest).
+# Results are (payload, status) tuples.
+generation = SingleFlight(
+    "generate-resume",
+    db_lock=config.env_flag("SINGLEFLIGHT_DB_LOCK"),
+    lease_seconds=config.env_float("SINGLEFLIGHT_LEASE_SECONDS", 120.0),
+    result_ttl=config.env_float("SINGLEFLIGHT_RESULT_TTL", 30.0),
+)
@@ -0,0 +1,402 @@
+"""Skills facet index over structured resumes.
+
+structured_resume_data keeps a resume's `skills` list and
+`work_experience[].position` titles inside a JSON blob, so questions such
+as "how many candidates list Go and Kafka" or "top 20 skills this month"
+used to mean decoding every row. Each resume's skills are now folded onto a
+taxonomy of canonical names (TAXONOMY, extended by SKILL_TAXONOMY_FILE) and
+stored as resume_skills rows: (resume, skill), with the resume's profile and
+created_at copied in. The two covering indexes on that table answer facet
+counts and filters without touching resumes.
+
+Matching is a token trie over every alias, walked once per string with
+longest match first ("google cloud platform" before "google cloud"). Aliases
+written as "=go" only match a whole skills entry ("Go", not "go-to-market";
+lists such as "Python, Go" are split on commas and slashes first).
+Rows are written by mapper events when a Resume is inserted or its
+structured data changes. Core writers call index_resumes() themselves, and
+backfill() (`flask --app app index-skills`) rebuilds every resume in batches,
+which is also the step to run after changing the taxonomy.
+"""
+import json
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db import db
+from models import CandidateProfile, Resume, ResumeSkill, Skill
+
+MAX_FACETS = 100
+MAX_FILTER_SKILLS = 10
+
+SOURCE_SKILLS, SOURCE_POSITION = 1, 2
+
+# Canonical name -> aliases (lowercase). "=alias" matches only a whole skills entry (or a
+# comma/slash-separated part of one): for names that are ordinary words elsewhere.
+TAXONOMY = {
+    'Python': ['python3', '=py'],
+    'Java': ['java se', 'java ee', 'core java'],
+    'JavaScript': ['js', 'javascript es6', 'es6', 'ecmascript'],
+    'TypeScript': ['=ts'],
+    'Go': ['=go', 'golang', 'go lang'],
+    'Rust': ['rust lang'],
+    'C': ['=c'],
+    'C++': ['cpp', 'c plus plus'],
+    'C#': ['csharp', 'c sharp'],
+    'Kotlin': [],
+    'Swift': [],
+    'Scala': [],
+    'Ruby': [],
+    'PHP': [],
+    'R': ['=r', 'r programming', 'rstudio'],
+    'SQL': ['sql queries'],
+    'Bash': ['shell scripting', '=shell', 'bash scripting'],
+    'HTML': ['html5'],
+    'CSS': ['css3'],
+    'React': ['react.js', 'reactjs', 'react js'],
+    'Angular': ['angular.js', 'angularjs'],
+    'Vue.js': ['vue', 'vuejs', 'vue js'],
+    'Next.js': ['nextjs', 'next js'],
+    'Node.js': ['node', 'nodejs', 'node js'],
+    'Express': ['express.js', 'expressjs'],
+    'Django': [],
+    'Flask': [],
+    'FastAPI': ['fast api'],
+    'Spring Boot': ['=spring', 'springboot', 'spring framework'],
+    '.NET': ['dotnet', 'asp.net', 'asp.net core', '.net core'],
+    'Ruby on Rails': ['rails', 'ror'],
+    'GraphQL': [],
+    'REST APIs': ['=rest', 'rest api', 'restful', 'restful apis', 'restful services'],
+    'gRPC': [],
+    'PostgreSQL': ['postgres', 'psql', 'postgre sql'],
+    'MySQL': [],
+    'SQLite': [],
+    'MongoDB': ['mongo'],
+    'Redis': [],
+    'Elasticsearch': ['elastic search', 'elk', 'opensearch'],
+    'Cassandra': ['apache cassandra'],
+    'DynamoDB': ['dynamo db'],
+    'Kafka': ['apache kafka'],
+    'RabbitMQ': ['rabbit mq'],
+    'Spark': ['apache spark', 'pyspark'],
+    'Hadoop': ['hdfs'],
+    'Airflow': ['apache airflow'],
+    'Snowflake': [],
+    'AWS': ['amazon web services', 'ec2', 's3', '=lambda', 'aws lambda'],
+    'Google Cloud': ['gcp', 'google cloud platform'],
+    'Azure': ['microsoft azure'],
+    'Docker': ['=containers', 'containerization'],
+    'Kubernetes': ['k8s', 'kube', 'eks', 'gke', 'aks'],
+    'Terraform': ['=iac', 'infrastructure as code'],
+    'Ansible': [],
+    'Jenkins': [],
+    'CI/CD': ['ci cd', 'cicd', 'continuous integration', 'continuous delivery', 'continuous deployment'],
+    'GitHub Actions': ['gh actions'],
+    'Git': ['github', 'gitlab', 'version control'],
+    'Linux': ['unix', 'ubuntu'],
+    'Prometheus': [],
+    'Grafana': [],
+    'Microservices': ['microservice', 'micro services', 'microservices architecture'],
+    'System Design': ['distributed systems', 'system architecture'],
+    'Machine Learning': ['ml', 'machine learning models'],
+    'Deep Learning': ['=dl', 'neural networks'],
+    'TensorFlow': ['=tf', 'tensorflow 2'],
+    'PyTorch': ['torch'],
+    'scikit-learn': ['sklearn', 'scikit learn'],
+    'Pandas': [],
+    'NumPy': [],
+    'NLP': ['natural language processing'],
+    'Computer Vision': ['=cv', 'opencv'],
+    'LLMs': ['llm', 'large language models', 'generative ai', 'genai'],
+    'Data Analysis': ['data analytics', '=analytics'],
+    'Tableau': [],
+    'Power BI': ['powerbi'],
+    'Excel': ['ms excel', 'microsoft excel', 'advanced excel'],
+    'Figma': [],
+    'Android': ['android development'],
+    'iOS': ['ios development'],
+    'Flutter': [],
+    'React Native': ['react-native'],
+    'Agile': ['scrum', 'kanban', 'agile methodologies'],
+    'Selenium': [],
+    'Jest': [],
+    'Unit Testing': ['pytest', 'junit', '=testing', 'tdd'],
+    'DevOps': ['dev ops'],
+    'Security': ['cybersecurity', 'cyber security', 'application security'],
+    'Leadership': ['team leadership', 'people management', 'mentoring'],
+    'Communication': ['communication skills'],
+    'Project Management': ['program management'],
+    'Product Management': ['product manager', 'product owner'],
+}
+
+_TOKEN = re.compile(r'\.?[a-z0-9+#]+(?:[.\-][a-z0-9+#]+)*')
+_PARTS = re.compile(r'[,;:/|()]')
+
+
+class SkillQueryError(ValueError):
+    pass
+
+
+def tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def load_taxonomy(path=None):
+    """TAXONOMY, with the canonical names and aliases from a JSON file merged in."""
+    taxonomy = {name: list(aliases) for name, aliases in TAXONOMY.items()}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for name, aliases in json.load(f).items():
+                taxonomy.setdefault(name, []).extend(aliases)
+    return taxonomy
+
+
+class SkillMatcher:
+    """Finds the canonical skills mentioned in a string, all aliases in one pass."""
+
+    def __init__(self, taxonomy):
+        self._trie = {}
+        self._whole = {}
+        for name, aliases in taxonomy.items():
+            terms = list(aliases)
+            if '=' + name.lower() not in terms:
+                terms.append(name.lower())
+            for term in terms:
+                if term.startswith('='):
+                    self._whole[' '.join(tokens(term[1:]))] = name
+                    continue
+                node = self._trie
+                for token in tokens(term):
+                    node = node.setdefault(token, {})
+                node[None] = name
+
+    def find(self, text, whole_entry=False):
+        """Canonical names found in `text`. With whole_entry, "=alias" aliases can match the whole string."""
+        found = set()
+        if whole_entry:
+            for part in _PARTS.split(text):
+                name = self._whole.get(' '.join(tokens(part)))
+                if name:
+                    found.add(name)
+        words = tokens(text)
+        i = 0
+        while i < len(words):
+            node, match, end = self._trie, None, i
+            for j in range(i, len(words)):
+                node = node.get(words[j])
+                if node is None:
+                    break
+                if None in node:
+                    match, end = node[None], j + 1
+            if match is None:
+                i += 1
+            else:
+                found.add(match)
+                i = end
+        return found
+
+    def canonical(self, term):
+        """The canonical name for one skill as a user would type it ("k8s", "golang"), or None."""
+        found = self.find(term, whole_entry=True)
+        return found.pop() if len(found) == 1 else None
+
+
+matcher = SkillMatcher(load_taxonomy(os.getenv("SKILL_TAXONOMY_FILE")))
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def extract_skills(structured):
+    """{canonical name: source bits} from structured resume data (a dict or its JSON text)."""
+    if isinstance(structured, str):
+        try:
+            structured = json.loads(structured)
+        except ValueError:
+            return {}
+    if not isinstance(structured, dict):
+        return {}
+    found = {}
+    for entry in _strings(structured.get('skills') or []):
+        for name in matcher.find(entry, whole_entry=True):
+            found[name] = found.get(name, 0) | SOURCE_SKILLS
+    for job in structured.get('work_experience') or []:
+        position = job.get('position') if isinstance(job, dict) else None
+        if isinstance(position, str):
+            for name in matcher.find(position):
+                found[name] = found.get(name, 0) | SOURCE_POSITION
+    return found
+
+
+# --- index writes -------------------------------------------------------------
+
+def _insert_ignore(connection, table):
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is None:
+        raise RuntimeError(f"skill_facets needs SQLite or PostgreSQL, not {connection.dialect.name}")
+    return dialect.insert(table).on_conflict_do_nothing()
+
+
+def skill_ids(connection, names):
+    """{name: skills.id}, inserting names not stored yet.
+
+    Looked up in the caller's transaction every time: an id cached across
+    transactions would outlive a rollback of the insert that created it.
+    """
+    if not names:
+        return {}
+    table = Skill.__table__
+    connection.execute(_insert_ignore(connection, table), [{'name': name} for name in names])
+    return dict(connection.execute(select(table.c.name, table.c.id).where(table.c.name.in_(names))).all())
+
+
+def index_resumes(connection, rows):
+    """Replace the resume_skills rows of `rows`: (resume id, profile id, created_at, structured data) tuples."""
+    table = ResumeSkill.__table__
+    rows = list(rows)
+    if not rows:
+        return 0
+    connection.execute(delete(table).where(table.c.resume_id.in_([row[0] for row in rows])))
+    extracted = [(row, extract_skills(row[3])) for row in rows]
+    ids = skill_ids(connection, sorted({name for _, found in extracted for name in found}))
+    values = [{'resume_id': resume_id, 'skill_id': ids[name], 'profile_id': profile_id,
+               'created_at': created_at or datetime.utcnow(), 'source': source}
+              for (resume_id, profile_id, created_at, _), found in extracted for name, source in found.items()]
+    if values:
+        connection.execute(insert(table), values)
+    return len(values)
+
+
+@event.listens_for(Resume, 'after_insert')
+def _after_insert(mapper, connection, target):
+    index_resumes(connection, [(target.id, target.profile_id, target.created_at, target.structured_resume_data)])
+
+
+@event.listens_for(Resume, 'after_update')
+def _after_update(mapper, connection, target):
+    if inspect(target).attrs.structured_resume_data.history.has_changes():
+        index_resumes(connection, [(target.id, target.profile_id, target.created_at, target.structured_resume_data)])
+
+
+@event.listens_for(Resume, 'before_delete')
+def _before_delete(mapper, connection, target):
+    connection.execute(delete(ResumeSkill.__table__).where(ResumeSkill.__table__.c.resume_id == target.id))
+
+
+def backfill(batch_size=500):
+    """Re-index every resume in keyset batches, one transaction each. Must run in an app context.
+
+    Returns (resumes, resume_skills rows) written.
+    """
+    resumes = Resume.__table__
+    last_id = done = written = 0
+    while True:
+        rows = db.session.execute(
+            select(resumes.c.id, resumes.c.profile_id, resumes.c.created_at, resumes.c.structured_resume_data)
+            .where(resumes.c.id > last_id).order_by(resumes.c.id).limit(batch_size)).all()
+        if not rows:
+            return done, written
+        written += index_resumes(db.session.connection(), rows)
+        db.session.commit()
+        done += len(rows)
+        last_id = rows[-1][0]
+
+
+# --- queries --------------------------------------------------------------------
+
+def parse_skills(value):
+    """"Go, k8s" -> ['Go', 'Kubernetes']. Raises SkillQueryError for terms not in the taxonomy."""
+    names = []
+    for term in (value or '').split(','):
+        if not term.strip():
+            continue
+        name = matcher.canonical(term)
+        if name is None:
+            raise SkillQueryError(f"Unknown skill: {term.strip()}")
+        if name not in names:
+            names.append(name)
+    if len(names) > MAX_FILTER_SKILLS:
+        raise SkillQueryError(f"At most {MAX_FILTER_SKILLS} skills can be combined")
+    return names
+
+
+def parse_time(value, name):
+    """An ISO date or datetime query parameter, or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise SkillQueryError(f"{name} must be an ISO date or datetime")
+
+
+def _range(table, since, until):
+    conditions = []
+    if since is not None:
+        conditions.append(table.c.created_at >= since)
+    if until is not None:
+        conditions.append(table.c.created_at < until)
+    return conditions
+
+
+def _matching_profiles(skills, since, until, profile_id):
+    """Profiles with every skill in `skills` on resumes created in the range, as a subquery of profile_id."""
+    table, names = ResumeSkill.__table__, Skill.__table__
+    ids = db.session.execute(select(names.c.id).where(names.c.name.in_(skills))).scalars().all()
+    conditions = [table.c.skill_id.in_(ids), *_range(table, since, until)]
+    if profile_id is not None:
+        conditions.append(table.c.profile_id == profile_id)
+    # A skill no resume has yet has no id, so the count can never reach len(skills)
+    return select(table.c.profile_id).where(*conditions).group_by(table.c.profile_id) \
+        .having(func.count(table.c.skill_id.distinct()) == len(skills))
+
+
+def facet_counts(skills=(), since=None, until=None, profile_id=None, limit=20):
+    """Candidates having all `skills` in the range, and the top `limit` skills among them.
+
+    Counts are distinct candidates (profiles), from resume_skills alone.
+    limit=0 returns the candidate count only.
+    """
+    table, names = ResumeSkill.__table__, Skill.__table__
+    conditions = _range(table, since, until)
+    if profile_id is not None:
+        conditions.append(table.c.profile_id == profile_id)
+    if skills:
+        matched = _matching_profiles(skills, since, until, profile_id)
+        conditions.append(table.c.profile_id.in_(matched))
+        total = db.session.execute(select(func.count()).select_from(matched.subquery())).scalar()
+    else:
+        total = db.session.execute(select(func.count(table.c.profile_id.distinct())).where(*conditions)).scalar()
+
+    if limit <= 0:
+        return {'candidates': total, 'facets': []}
+    candidates = func.count(table.c.profile_id.distinct()).label('candidates')
+    top = select(table.c.skill_id, candidates).where(*conditions).group_by(table.c.skill_id) \
+        .order_by(candidates.desc(), table.c.skill_id).limit(min(limit, MAX_FACETS)).subquery()
+    rows = db.session.execute(select(names.c.name, top.c.candidates).join(top, top.c.skill_id == names.c.id)
+                              .order_by(top.c.candidates.desc(), names.c.name)).all()
+    return {'candidates': total, 'facets': [{'skill': name, 'candidates': count} for name, count in rows]}
+
+
+def candidates_with_skills(skills, since=None, until=None, profile_id=None, limit=50, after=None):
+    """Profiles having every skill in `skills`, by profile id, `limit` per page after `after`."""
+    profiles = CandidateProfile.__table__
+    matched = _matching_profiles(skills, since, until, profile_id)
+    if after is not None:
+        matched = matched.where(ResumeSkill.__table__.c.profile_id > after)
+    matched = matched.order_by(ResumeSkill.__table__.c.profile_id).limit(max(1, min(limit, MAX_FACETS))).subquery()
+    rows = db.session.execute(select(profiles.c.id, profiles.c.username)
+                              .join(matched, matched.c.profile_id == profiles.c.id)
+                              .order_by(profiles.c.id)).all()
+    return [{'profile_id': row.id, 'username': row.username} for row in rows]
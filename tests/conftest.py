@@ -0,0 +1,38 @@
+"""Shared fixtures: the app against a throwaway SQLite database.
+
+db.py reads DATABASE_URL at import time, so it is set here before app is
+imported. The schema is migrated once per run and emptied after each test.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["WARMUP_ON_START"] = "0"
+
+import app as app_module  # noqa: E402
+from db import db  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    with app_module.app.app_context():
+        run_migrations()
+    return app_module.app
+
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, exc, insert, select, text
+
+import db as db_module
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_module, 'SQLITE_BUSY_TIMEOUT_MS', 50)
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    db_module.configure_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize('statement, write', [
+    ("INSERT INTO t VALUES (1)", True),
+    ("  update t SET id = 2", True),
+    ("-- note\nDELETE FROM t", True),
+    ("/* bulk */ REPLACE INTO t VALUES (1)", True),
+    ("WITH s AS (SELECT 1 AS id) INSERT INTO t SELECT id FROM s", True),
+    ("SELECT * FROM t", False),
+    ("-- INSERT\nSELECT 1", False),
+    ("WITH s AS (SELECT 1) SELECT * FROM s", False),
+    ("PRAGMA journal_mode", False),
+])
+def test_textual_write_detection(statement, write):
+    assert db_module._is_write(statement, None) is write
+
+
+def test_compiled_statements_use_the_execution_context(engine):
+    table = Table('t', MetaData(), Column('id', Integer, primary_key=True))
+    table.metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(select(table))
+        assert 'writer_lock' not in conn.connection.info
+        conn.execute(table.insert().from_select(['id'], select(text('1'))).prefix_with('OR IGNORE'))
+        assert conn.connection.info['writer_lock']
+        conn.rollback()
+    assert not db_module._writer_lock.locked()
+
+
+def test_writer_lock_timeout_raises_instead_of_writing(engine):
+    table = Table('t', MetaData(), Column('id', Integer, primary_key=True))
+    table.metadata.create_all(engine)
+    assert db_module._writer_lock.acquire(timeout=1)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(exc.OperationalError, match='writer lock'):
+                conn.execute(insert(table).values(id=1))
+    finally:
+        db_module._writer_lock.release()
+    with engine.connect() as conn:
+        assert conn.execute(select(table)).all() == []
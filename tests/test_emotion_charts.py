@@ -0,0 +1,79 @@
+import base64
+import hashlib
+
+import pytest
+
+import blobstore
+from blobstore import BlobStore, LocalBlobBackend
+from emotion_charts import offload_chart_images
+from models import CandidateProfile, EmotionAnalysis, InterviewSession
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BlobStore(LocalBlobBackend(str(tmp_path)))
+    monkeypatch.setattr(blobstore, '_store', store)
+    return store
+
+
+def _chart(session, data):
+    profile = CandidateProfile(email="c@example.com", username="c", github_username="c")
+    interview = InterviewSession(email="c@example.com", candidate_profile=profile)
+    session.add_all([profile, interview])
+    session.flush()
+    return EmotionAnalysis(session_id=interview.id, email="c@example.com",
+                           chart_image=base64.b64encode(data).decode())
+
+
+def test_rolled_back_chart_leaves_no_blob(session, store):
+    analysis = _chart(session, b'\x89PNG\r\n\x1a\nrolled back')
+    session.add(analysis)
+    session.flush()
+    digest = analysis.chart_digest
+    assert store.exists(digest)
+
+    session.rollback()
+    assert not store.exists(digest)
+
+
+def test_closing_without_commit_leaves_no_blob(session, store):
+    analysis = _chart(session, b'\x89PNG\r\n\x1a\nclosed')
+    session.add(analysis)
+    session.flush()
+    digest = analysis.chart_digest
+
+    session.close()  # what request teardown does after an unhandled error
+    assert not store.exists(digest)
+
+
+def test_committed_chart_keeps_its_blob(session, store):
+    analysis = _chart(session, b'\x89PNG\r\n\x1a\ncommitted')
+    session.add(analysis)
+    session.commit()
+    digest = analysis.chart_digest
+    session.rollback()
+    assert store.exists(digest)
+
+    # A later transaction that reuses the blob and rolls back must not delete it
+    other = EmotionAnalysis(session_id=analysis.session_id, email="c@example.com",
+                            chart_image=base64.b64encode(b'\x89PNG\r\n\x1a\ncommitted').decode())
+    session.add(other)
+    session.flush()
+    session.rollback()
+    assert store.exists(digest)
+
+
+def test_failed_offload_batch_leaves_no_blobs(session, store, monkeypatch):
+    data = b'\x89PNG\r\n\x1a\ninline'
+    monkeypatch.setattr(blobstore, '_store', BlobStore(LocalBlobBackend(store.backend.root, durable=False)))
+    session.add(_chart(session, data))
+    session.commit()  # not durable: the chart stays inline, as in rows from before the store
+    monkeypatch.setattr(blobstore, '_store', store)
+
+    def fail():
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(session, 'commit', fail)
+    with pytest.raises(RuntimeError):
+        offload_chart_images()
+    assert not store.exists(hashlib.sha256(data).hexdigest())
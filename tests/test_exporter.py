@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+import exporter
+from exporter import export_tables
+from test_ranking import _ranking
+
+
+def _exported(results):
+    rows = []
+    for path in results[0]['files']:
+        with open(path, encoding='utf-8') as f:
+            rows += [json.loads(line) for line in f]
+    return {row['email']: row['domain_rank'] for row in rows}
+
+
+def test_incremental_export_includes_shifted_ranks(session, tmp_path):
+    session.add_all([_ranking(session, "a@example.com", "Backend", 6.0),
+                     _ranking(session, "b@example.com", "Backend", 8.0)])
+    session.commit()
+    first = export_tables(str(tmp_path), ['domain_rankings'], formats=('jsonl',), incremental=True)
+    assert _exported(first) == {"a@example.com": 2, "b@example.com": 1}
+
+    session.add(_ranking(session, "c@example.com", "Backend", 9.0))
+    session.commit()
+    second = export_tables(str(tmp_path), ['domain_rankings'], formats=('jsonl',), incremental=True)
+    assert _exported(second) == {"a@example.com": 3, "b@example.com": 2, "c@example.com": 1}
+
+
+def test_failed_writer_open_leaves_no_temp_files(session, tmp_path, monkeypatch):
+    session.add(_ranking(session, "a@example.com", "Backend", 6.0))
+    session.commit()
+
+    def open_writer(fmt, path, table, json_columns):
+        if fmt == 'parquet':
+            open(path, 'wb').close()  # created, then failed
+            raise OSError("disk full")
+        return exporter.JsonlWriter(path, json_columns)
+
+    monkeypatch.setattr(exporter, '_open_writer', open_writer)
+    with pytest.raises(OSError):
+        export_tables(str(tmp_path), ['domain_rankings'], formats=('jsonl', 'parquet'))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
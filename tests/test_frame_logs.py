@@ -0,0 +1,50 @@
+import json
+import math
+
+import pytest
+
+from frame_logs import decode_json, encode
+
+
+def _same(a, b):
+    """Equal values of the same type, telling -0.0 from 0.0 (NaN equals NaN)."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, float):
+        return (math.isnan(a) and math.isnan(b)) or (a == b and math.copysign(1.0, a) == math.copysign(1.0, b))
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    return a == b
+
+
+@pytest.mark.parametrize('values', [
+    [2 ** 63 - 1, -2 ** 63, 0],
+    [2 ** 64, 1, 2],
+    [-2 ** 70, -2 ** 70, 5],
+    [2 ** 53 + 1, 0.5],
+    [-2 ** 63, 2 ** 63 - 1],
+    [0, 2 ** 62, 2 ** 63 - 2],
+    [-0.0, 0.0, 1.5],
+    [-0.0, -0.0, -0.0],
+    [-0.0, 1, 2.5],
+    [1, 2.5, float('nan')],
+    [0.1, 0.2, 0.30000000000000004],
+    [1, 2.5],
+    [0, 0.5, 1, 1.5, 2],
+    [0, 0.04, 0.08, 0.12],
+    [1, 1.0, 2.5],
+    [3, 2.0],
+    [10 ** 400, 0.5],
+])
+def test_numbers_round_trip(values):
+    assert _same(decode_json(encode(values)), values)
+
+
+def test_records_round_trip():
+    frames = [{'timestamp': n * 0.04, 't': n // 2 if n % 2 == 0 else n / 2, 'frame': n, 'offset': -0.0 if n % 2 else 0.0,
+               'id': 2 ** 64 + n, 'posture': 'Straight' if n < 5 else 'Slouched', 'ok': n % 3 == 0}
+              for n in range(10)]
+    assert _same(decode_json(encode(frames)), frames)
+    assert _same(json.loads(json.dumps(decode_json(encode(frames)))), json.loads(json.dumps(frames)))
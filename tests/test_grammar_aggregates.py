@@ -0,0 +1,93 @@
+from sqlalchemy import text
+
+from db import db
+from grammar_aggregates import TOTAL_COLUMNS
+from migrations import run_migrations
+from models import (CandidateProfile, GrammarAnalysis, InterviewQuestion, InterviewSession,
+                    QuestionGrammarAnalysis)
+
+
+def _analysis(session):
+    profile = CandidateProfile(email="c@example.com", username="c", github_username="c")
+    interview = InterviewSession(email="c@example.com", candidate_profile=profile)
+    question = InterviewQuestion(question="Tell me about yourself", session=interview)
+    analysis = GrammarAnalysis(email="c@example.com", interview_session=interview)
+    session.add_all([profile, interview, question, analysis])
+    session.flush()
+    return analysis, question
+
+
+def _answer(analysis, question, vocabulary):
+    return QuestionGrammarAnalysis(grammar_analysis=analysis, interview_question=question, transcript="...",
+                                   vocabulary_score=vocabulary, question_average_score=vocabulary)
+
+
+def _averages(session, analysis_id):
+    session.expire_all()
+    analysis = session.get(GrammarAnalysis, analysis_id)
+    return analysis.avg_vocabulary_score, analysis.overall_average_score, analysis.total_questions_analyzed
+
+
+def test_updates_to_expired_rows_adjust_the_averages(session):
+    analysis, question = _analysis(session)
+    first, second = _answer(analysis, question, 4), _answer(analysis, question, 8)
+    session.add_all([first, second])
+    session.commit()  # expires the rows: the old scores are no longer loaded
+    assert _averages(session, analysis.id) == (6.0, 6.0, 2)
+
+    first.vocabulary_score = 10
+    session.commit()
+    assert _averages(session, analysis.id) == (9.0, 6.0, 2)
+
+    first.vocabulary_score = None
+    session.commit()
+    assert _averages(session, analysis.id) == (8.0, 6.0, 2)
+
+    session.delete(first)
+    session.commit()
+    assert _averages(session, analysis.id) == (8.0, 8.0, 1)
+
+
+def test_moving_an_expired_row_to_another_analysis(session):
+    analysis, question = _analysis(session)
+    other = GrammarAnalysis(email="c@example.com", session_id=analysis.session_id)
+    answer = _answer(analysis, question, 4)
+    session.add_all([other, answer, _answer(analysis, question, 8)])
+    session.commit()
+
+    answer.grammar_analysis_id = other.id
+    session.commit()
+    assert _averages(session, analysis.id) == (8.0, 8.0, 1)
+    assert _averages(session, other.id) == (4.0, 4.0, 1)
+
+
+def test_rows_from_before_running_totals_are_rebuilt_after_upgrade(session):
+    profile = CandidateProfile(email="c@example.com", username="c", github_username="c")
+    interview = InterviewSession(email="c@example.com", candidate_profile=profile)
+    question = InterviewQuestion(question="Tell me about yourself", session=interview)
+    session.add_all([profile, interview, question])
+    session.flush()
+    session_id, question_id = interview.id, question.id
+    session.commit()
+
+    # An analysis with two answers, written before the running-total columns existed
+    try:
+        with db.engine.begin() as conn:
+            for column in TOTAL_COLUMNS:
+                conn.execute(text(f"ALTER TABLE grammar_analysis DROP COLUMN {column}"))
+            analysis_id = conn.execute(text(
+                "INSERT INTO grammar_analysis (session_id, email, avg_vocabulary_score, overall_average_score, "
+                "total_questions_analyzed) VALUES (:session_id, 'c@example.com', 6.0, 6.0, 2) RETURNING id"),
+                {'session_id': session_id}).scalar()
+            for score in (4, 8):
+                conn.execute(text(
+                    "INSERT INTO question_grammar_analysis (grammar_analysis_id, question_id, transcript, "
+                    "vocabulary_score, question_average_score) VALUES (:a, :q, '...', :s, :s)"),
+                    {'a': analysis_id, 'q': question_id, 's': score})
+    finally:
+        run_migrations()
+
+    analysis = session.get(GrammarAnalysis, analysis_id)
+    session.add(_answer(analysis, question, 6))
+    session.commit()
+    assert _averages(session, analysis_id) == (6.0, 6.0, 3)
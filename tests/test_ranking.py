@@ -0,0 +1,42 @@
+from models import CandidateProfile, DomainRanking, InterviewSession
+
+
+def _ranking(session, email, domain, score):
+    profile = CandidateProfile(email=email, username=email.split("@")[0],
+                               github_username=email.split("@")[0])
+    interview = InterviewSession(email=email, candidate_profile=profile)
+    session.add_all([profile, interview])
+    session.flush()
+    return DomainRanking(session_id=interview.id, email=email, candidate_name=email, domain=domain,
+                         overall_level="Good", overall_score=score)
+
+
+def _ranks(session, domain):
+    session.expire_all()
+    rows = DomainRanking.query.filter_by(domain=domain).order_by(DomainRanking.domain_rank).all()
+    return [(row.email, row.domain_rank) for row in rows]
+
+
+def test_rows_added_in_one_flush_get_consecutive_ranks(session):
+    session.add_all([_ranking(session, f"c{n}@example.com", "Backend", score)
+                     for n, score in enumerate([6.0, 9.0, 7.5])])
+    session.commit()
+
+    assert _ranks(session, "Backend") == [("c1@example.com", 1), ("c2@example.com", 2), ("c0@example.com", 3)]
+
+
+def test_rescoring_an_expired_row(session):
+    rows = [_ranking(session, f"c{n}@example.com", "Backend", score) for n, score in enumerate([6.0, 9.0, 7.5])]
+    for row in rows:
+        session.add(row)
+        session.flush()
+    session.commit()  # expires the rows: the old score is no longer loaded
+
+    rows[0].overall_score = 9.5
+    session.commit()
+    assert _ranks(session, "Backend") == [("c0@example.com", 1), ("c1@example.com", 2), ("c2@example.com", 3)]
+
+    rows[1].domain = "Frontend"
+    session.commit()
+    assert _ranks(session, "Backend") == [("c0@example.com", 1), ("c2@example.com", 2)]
+    assert _ranks(session, "Frontend") == [("c1@example.com", 1)]
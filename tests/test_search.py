@@ -0,0 +1,33 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import search
+
+
+class _PostgresSession:
+    """Answers the rank-window bound query and the page query the way PostgreSQL would."""
+
+    def __init__(self, bound, hits):
+        self.bound, self.hits = bound, hits
+
+    def execute(self, statement, params):
+        if 'OFFSET :window' in str(statement):
+            return SimpleNamespace(scalar=lambda: self.bound)
+        rows = [{'resume_id': n, 'profile_id': n, 'email': f"c{n}@example.com", 'created_at': datetime(2026, 1, n),
+                 'score': 1.0 / n, 'snippet': "…"} for n in range(1, self.hits + 1)]
+        return SimpleNamespace(mappings=lambda: SimpleNamespace(all=lambda: rows))
+
+
+@pytest.mark.parametrize('hits', [0, 1, 2, 3])
+@pytest.mark.parametrize('bound', [None, 41])
+def test_postgres_search_returns_rows_and_truncated(monkeypatch, hits, bound):
+    fake_db = SimpleNamespace(engine=SimpleNamespace(dialect=SimpleNamespace(name='postgresql')),
+                              session=_PostgresSession(bound, hits))
+    monkeypatch.setattr(search, 'db', fake_db)
+
+    results, truncated = search.search_resumes("python")
+
+    assert [result['resume_id'] for result in results] == list(range(1, hits + 1))
+    assert truncated is (bound is not None)
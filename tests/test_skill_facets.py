@@ -0,0 +1,28 @@
+import json
+
+from models import CandidateProfile, Resume
+from skill_facets import facet_counts
+
+
+def _resume(session, username, skills):
+    profile = CandidateProfile(email=f"{username}@example.com", username=username, github_username=username)
+    session.add(profile)
+    session.flush()
+    resume = Resume(profile_id=profile.id, original_resume_text="...", job_description="...",
+                    structured_resume_data=json.dumps({'skills': skills}))
+    session.add(resume)
+    return resume
+
+
+def test_skill_ids_do_not_outlive_a_rollback(session):
+    _resume(session, "a", ["Go"])
+    session.flush()
+    session.rollback()  # the skills row for Go is gone, and its id is free again
+
+    _resume(session, "b", ["Python"])
+    session.commit()
+    _resume(session, "c", ["Golang"])
+    session.commit()
+
+    facets = {facet['skill']: facet['candidates'] for facet in facet_counts()['facets']}
+    assert facets == {'Go': 1, 'Python': 1}
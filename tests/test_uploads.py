@@ -0,0 +1,40 @@
+import threading
+
+from uploads import SpeculativeExtractor
+
+
+def test_upload_is_done_before_its_follow_up_finishes(session):
+    release, followed = threading.Event(), []
+
+    def follow_up(text):
+        release.wait(5)
+        followed.append(text)
+
+    extractor = SpeculativeExtractor(lambda data, content_type: data.decode(), follow_up=follow_up, workers=1)
+    try:
+        upload = extractor.submit("a@example.com", "cv.pdf", "application/pdf", b"resume text")
+        assert extractor.text(upload, timeout=2) == "resume text"
+        session.refresh(upload)
+        assert upload.status == 'done' and upload.file_data is None
+        assert not extractor.settle(upload.id, timeout=0.05)
+
+        release.set()
+        assert extractor.settle(upload.id, timeout=2)
+        assert followed == ["resume text"]
+    finally:
+        release.set()
+        extractor._executor.shutdown(wait=True)
+
+
+def test_follow_up_is_skipped_without_text(session):
+    followed = []
+    extractor = SpeculativeExtractor(lambda data, content_type: '', follow_up=followed.append, workers=1)
+    try:
+        upload = extractor.submit("a@example.com", "cv.png", "image/png", b"")
+        assert extractor.text(upload, timeout=2) == ''
+        extractor._executor.shutdown(wait=True)
+        session.refresh(upload)
+        assert upload.status == 'failed'
+        assert followed == []
+    finally:
+        extractor._executor.shutdown(wait=True)
@@ -0,0 +1,233 @@
+"""Content-addressed storage for README and source file text.
+
+GitHub imports store the same LICENSE files, boilerplate configs, vendored
+libraries and forked READMEs over and over. Each distinct text is now stored
+once in text_blobs, keyed by the SHA-256 of its UTF-8 bytes, and
+CodeFile.content_digest / Repository.readme_digest point at it. The inline
+columns (code_files.content, repositories.readme) only hold text that has
+not been moved yet.
+
+ref_count is the number of rows pointing at a blob. It is kept in the same
+transaction as those rows: ORM flushes move newly assigned text and adjust
+counts in the mapper events below, and Core writers (bulk ingestion) call
+acquire() / release() themselves. acquire() is an upsert, so a blob that
+was garbage collected in the meantime is simply inserted again.
+
+collect_garbage() deletes blobs whose count is zero and that no row
+references, both checked by the DELETE itself. A concurrent writer
+increments the count before inserting its row, so the DELETE either
+sees the new count or runs first, and then the writer's upsert inserts
+the blob again. Miscounted blobs are never deleted while referenced;
+recount() repairs the counts.
+
+dedupe_existing() moves rows written before this existed, in keyset
+batches (`flask --app app dedupe-text`).
+"""
+import hashlib
+from collections import Counter
+
+from sqlalchemy import bindparam, event, exists, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db import db
+from models import CodeFile, Repository, TextBlob
+
+_blobs = TextBlob.__table__
+
+# model -> (inline attribute, digest column, value that clears the inline column)
+TEXT_COLUMNS = {
+    CodeFile: ('_content', 'content_digest', ''),
+    Repository: ('_readme', 'readme_digest', None),
+}
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _insert(connection):
+    dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(connection.dialect.name)
+    if dialect is None:
+        raise RuntimeError(f"text_blobs needs SQLite or PostgreSQL, not {connection.dialect.name}")
+    return dialect.insert(_blobs)
+
+
+def acquire(connection, texts):
+    """Take one reference per item of `texts` (a list of strings). Returns their digests.
+
+    Blobs are inserted or have their ref_count raised in one upsert per distinct text.
+    """
+    digests = [text_digest(text) for text in texts]
+    counts = Counter(digests)
+    if counts:
+        contents = dict(zip(digests, texts))
+        statement = _insert(connection)
+        statement = statement.on_conflict_do_update(
+            index_elements=[_blobs.c.digest],
+            set_={'ref_count': _blobs.c.ref_count + statement.excluded.ref_count})
+        connection.execute(statement, [
+            {'digest': digest, 'content': contents[digest], 'size': len(contents[digest].encode('utf-8')),
+             'ref_count': count} for digest, count in counts.items()])
+    return digests
+
+
+def _retain(connection, digest):
+    connection.execute(update(_blobs).where(_blobs.c.digest == digest).values(ref_count=_blobs.c.ref_count + 1))
+
+
+def release(connection, digests):
+    """Drop one reference per digest in `digests` (None entries are ignored)."""
+    counts = Counter(digest for digest in digests if digest)
+    if counts:
+        connection.execute(
+            update(_blobs).where(_blobs.c.digest == bindparam('b_digest'))
+            .values(ref_count=_blobs.c.ref_count - bindparam('b_count')),
+            [{'b_digest': digest, 'b_count': count} for digest, count in counts.items()])
+
+
+# --- ORM writes ---------------------------------------------------------------
+
+def _stored_digest(connection, target, column):
+    """The digest the row has in the database before this flush."""
+    history = inspect(target).attrs[column].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    table = type(target).__table__
+    return connection.execute(select(table.c[column]).where(table.c.id == target.id)).scalar()
+
+
+def _before_insert(mapper, connection, target):
+    inline, column, cleared = TEXT_COLUMNS[mapper.class_]
+    text = getattr(target, inline)
+    if text:
+        setattr(target, column, acquire(connection, [text])[0])
+        setattr(target, inline, cleared)
+    elif getattr(target, column):
+        _retain(connection, getattr(target, column))  # pointed at an existing blob directly
+
+
+def _before_update(mapper, connection, target):
+    inline, column, cleared = TEXT_COLUMNS[mapper.class_]
+    state = inspect(target)
+    text_changes, digest_changes = state.attrs[inline].history, state.attrs[column].history
+    if not (text_changes.added or digest_changes.added):
+        return
+    old = _stored_digest(connection, target, column)
+    text = text_changes.added[0] if text_changes.added else None
+    new = text_digest(text) if text else getattr(target, column)
+    if new != old:
+        if text:
+            acquire(connection, [text])
+        elif new:
+            _retain(connection, new)
+        release(connection, [old])
+    if text:
+        setattr(target, column, new)
+        setattr(target, inline, cleared)
+
+
+def _before_delete(mapper, connection, target):
+    release(connection, [_stored_digest(connection, target, TEXT_COLUMNS[mapper.class_][1])])
+
+
+for _model in TEXT_COLUMNS:
+    event.listen(_model, 'before_insert', _before_insert)
+    event.listen(_model, 'before_update', _before_update)
+    event.listen(_model, 'before_delete', _before_delete)
+
+
+# --- maintenance --------------------------------------------------------------
+
+def dedupe_existing(batch_size=500):
+    """Move inline code_files.content and repositories.readme into text_blobs. Must run in an app context.
+
+    Each batch reads (id, text) in id order, upserts the distinct texts with
+    their counts, points the rows at them and clears the inline column in one
+    executemany UPDATE, then commits. Returns a stats dict; bytes_saved is
+    the inline bytes moved minus the bytes of the blobs created for them.
+    """
+    stats = {'rows': 0, 'bytes_moved': 0, 'blobs_created': 0, 'bytes_stored': 0}
+    for model, (inline, column, cleared) in TEXT_COLUMNS.items():
+        table = model.__table__
+        text_column = getattr(model, inline).expression
+        statement = update(table).where(table.c.id == bindparam('b_id')) \
+            .values({column: bindparam('v_digest'), text_column.name: cleared})
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(table.c.id, text_column)
+                .where(table.c.id > last_id, table.c[column].is_(None), text_column.isnot(None), text_column != '')
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            texts = [text for _, text in rows]
+            connection = db.session.connection()
+            digests = [text_digest(text) for text in texts]
+            known = set(connection.execute(select(_blobs.c.digest).where(_blobs.c.digest.in_(set(digests)))).scalars())
+            acquire(connection, texts)
+            connection.execute(statement, [{'b_id': row_id, 'v_digest': digest}
+                                           for (row_id, _), digest in zip(rows, digests)])
+            db.session.commit()
+
+            created = {digest: text for digest, text in zip(digests, texts) if digest not in known}
+            stats['rows'] += len(rows)
+            stats['bytes_moved'] += sum(len(text.encode('utf-8')) for text in texts)
+            stats['blobs_created'] += len(created)
+            stats['bytes_stored'] += sum(len(text.encode('utf-8')) for text in created.values())
+            last_id = rows[-1][0]
+
+    stats['bytes_saved'] = stats['bytes_moved'] - stats['bytes_stored']
+    return stats
+
+
+def _referenced(digest_column):
+    return exists().where(CodeFile.__table__.c.content_digest == digest_column) | \
+        exists().where(Repository.__table__.c.readme_digest == digest_column)
+
+
+def collect_garbage(batch_size=1000):
+    """Delete unreferenced blobs, `batch_size` per transaction. Returns (blobs, bytes) deleted."""
+    deleted = freed = 0
+    last = ''
+    while True:
+        candidates = db.session.execute(
+            select(_blobs.c.digest, _blobs.c.size).where(_blobs.c.ref_count <= 0, _blobs.c.digest > last)
+            .order_by(_blobs.c.digest).limit(batch_size)).all()
+        if not candidates:
+            return deleted, freed
+        sizes = dict(candidates)
+        # Both conditions are re-checked by the DELETE itself. Referenced blobs with a
+        # zero count are skipped; recount() repairs them.
+        gone = db.session.execute(
+            _blobs.delete().where(_blobs.c.digest.in_(sizes), _blobs.c.ref_count <= 0,
+                                  ~_referenced(_blobs.c.digest))
+            .returning(_blobs.c.digest)).scalars().all()
+        db.session.commit()
+        deleted += len(gone)
+        freed += sum(sizes[digest] for digest in gone)
+        last = candidates[-1].digest
+
+
+def recount():
+    """Recompute every ref_count from the referencing rows. Returns the number of blobs corrected."""
+    files, repos = CodeFile.__table__, Repository.__table__
+    actual = select(func.count()).where(files.c.content_digest == _blobs.c.digest).scalar_subquery() + \
+        select(func.count()).where(repos.c.readme_digest == _blobs.c.digest).scalar_subquery()
+    corrected = db.session.execute(update(_blobs).where(_blobs.c.ref_count != actual)
+                                   .values(ref_count=actual)).rowcount
+    db.session.commit()
+    return corrected
+
+
+def stored_bytes():
+    """(inline text bytes still in code_files/repositories, bytes in text_blobs)."""
+    inline = 0
+    for model, (name, _, _) in TEXT_COLUMNS.items():
+        column = getattr(model, name).expression
+        inline += db.session.execute(select(func.coalesce(func.sum(func.length(column)), 0))).scalar()
+    return inline, db.session.execute(select(func.coalesce(func.sum(_blobs.c.size), 0))).scalar()
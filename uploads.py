@@ -0,0 +1,230 @@
+"""Two-phase resume upload with speculative text extraction.
+
+Users upload a resume and then spend half a minute writing the job
+description, so extraction can run in that gap. POST /api/resume-uploads
+stores the file in resume_uploads and starts extracting its text on a
+background thread. /api/generate-resume accepts the returned upload id in
+place of the file and uses the stored text, waiting only if extraction is
+still running:
+
+- in the process that started it, the caller waits on its Future;
+- otherwise it polls the row until it is finished. A row still marked as
+  running after its lease (UPLOAD_EXTRACT_LEASE_SECONDS) belonged to a
+  process that died, and the text is extracted inline from the stored file.
+
+The upload is marked done as soon as its text is extracted. Follow-up work
+on the text (the app parses it for existing profiles) runs afterwards on the
+same thread, so it never holds up callers that only need the text; settle()
+lets a caller that needs that work too wait for it.
+
+The file bytes are dropped once the text is extracted. Uploads expire after
+UPLOAD_TTL_MINUTES. A user's expired uploads are deleted on their next
+upload, and purge_expired() deletes all of them in batches (`flask --app app
+purge-uploads`).
+"""
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+
+from flask import current_app, g
+from sqlalchemy import delete, func, select, update
+
+import config
+from db import db
+from models import ResumeUpload
+
+TTL = timedelta(minutes=config.env_float("UPLOAD_TTL_MINUTES", 60))
+LEASE = timedelta(seconds=config.env_float("UPLOAD_EXTRACT_LEASE_SECONDS", 120))
+MAX_PENDING = config.env_int("UPLOAD_MAX_PENDING", 3)
+WAIT_SECONDS = config.env_float("UPLOAD_WAIT_SECONDS", 45)
+POLL_INTERVAL = 0.25
+
+_table = ResumeUpload.__table__
+
+
+class TooManyUploads(Exception):
+    pass
+
+
+def get_upload(upload_id, user_email, now=None):
+    """The user's unexpired upload, or None."""
+    now = now or datetime.utcnow()
+    return db.session.execute(select(ResumeUpload).where(
+        ResumeUpload.id == upload_id, ResumeUpload.user_email == user_email,
+        ResumeUpload.expires_at >= now)).scalar_one_or_none()
+
+
+def _finish(upload_id, text):
+    values = {'status': 'done', 'extracted_text': text, 'file_data': None} if text else \
+        {'status': 'failed', 'error': 'No text found in the uploaded file'}
+    db.session.execute(update(_table).where(_table.c.id == upload_id).values(finished_at=datetime.utcnow(), **values))
+    db.session.commit()
+
+
+class SpeculativeExtractor:
+    def __init__(self, extract, follow_up=None, workers=None):
+        self.extract = extract  # (file_bytes, content_type) -> text, '' when none is found
+        self.follow_up = follow_up  # (text) -> None, run once the upload is marked done
+        self._executor = ThreadPoolExecutor(workers or config.env_int("UPLOAD_EXTRACT_WORKERS", 4),
+                                            thread_name_prefix="upload-extract")
+        self._futures = {}  # upload id -> Future of the text
+        self._follow_ups = {}  # upload id -> Future of the whole background job
+        self._lock = threading.Lock()
+        self._counters = {'started': 0, 'ready': 0, 'waited': 0, 'polled': 0, 'inline': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def submit(self, user_email, filename, content_type, data):
+        """Store the file and start extracting it. Returns the ResumeUpload row.
+
+        Raises TooManyUploads if the user already has MAX_PENDING extractions running.
+        """
+        now = datetime.utcnow()
+        db.session.execute(delete(_table).where(_table.c.user_email == user_email, _table.c.expires_at < now))
+        running = db.session.execute(select(func.count()).select_from(_table).where(
+            _table.c.user_email == user_email, _table.c.status == 'running', _table.c.lease_until >= now)).scalar()
+        if running >= MAX_PENDING:
+            db.session.commit()
+            raise TooManyUploads(f"{running} uploads are still being processed")
+
+        upload = ResumeUpload(id=uuid.uuid4().hex, user_email=user_email, filename=filename,
+                              content_type=content_type, size=len(data), sha256=hashlib.sha256(data).hexdigest(),
+                              status='running', file_data=data, lease_until=now + LEASE,
+                              created_at=now, expires_at=now + TTL)
+        db.session.add(upload)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        text_future = Future()
+        with self._lock:
+            self._futures[upload.id] = text_future
+            self._follow_ups[upload.id] = self._executor.submit(self._run, app, upload.id, user_email, data,
+                                                                content_type, text_future)
+            self._counters['started'] += 1
+        return upload
+
+    def _extract(self, upload_id, data, content_type):
+        text = ''
+        try:
+            text = self.extract(data, content_type)
+        finally:
+            _finish(upload_id, text)
+        return text
+
+    def _run(self, app, upload_id, user_email, data, content_type, text_future):
+        try:
+            with app.app_context():
+                g.user_email = user_email  # model call telemetry
+                try:
+                    text = self._extract(upload_id, data, content_type)
+                except BaseException as e:
+                    text_future.set_exception(e)
+                    raise
+                text_future.set_result(text)
+                with self._lock:
+                    self._futures.pop(upload_id, None)
+                if text and self.follow_up is not None:
+                    try:
+                        self.follow_up(text)
+                    except Exception as e:
+                        db.session.rollback()
+                        print("⚠️ Upload follow-up failed:", e)
+        finally:
+            with self._lock:
+                self._futures.pop(upload_id, None)
+                self._follow_ups.pop(upload_id, None)
+
+    def text(self, upload, timeout=WAIT_SECONDS):
+        """The upload's extracted text ('' if none was found), waiting up to `timeout` seconds.
+
+        Raises concurrent.futures.TimeoutError if extraction has not finished by then.
+        """
+        db.session.refresh(upload)
+        if upload.status != 'running':
+            self._count('ready')
+            return upload.extracted_text or ''
+
+        with self._lock:
+            future = self._futures.get(upload.id)
+        if future is not None:
+            self._count('waited')
+            return future.result(timeout)
+
+        # Started by another process: poll until it finishes or its lease runs out
+        upload_id, deadline = upload.id, time.monotonic() + timeout
+        db.session.rollback()
+        while True:
+            row = db.session.execute(select(_table.c.status, _table.c.extracted_text, _table.c.lease_until)
+                                     .where(_table.c.id == upload_id)).first()
+            db.session.rollback()  # end the read so the next poll sees new commits
+            if row is None:
+                return ''
+            if row.status != 'running':
+                self._count('polled')
+                return row.extracted_text or ''
+            if row.lease_until < datetime.utcnow():
+                break
+            if time.monotonic() > deadline:
+                raise FutureTimeoutError()
+            time.sleep(POLL_INTERVAL)
+
+        # Abandoned by a dead process: take the lease and extract here
+        claimed = db.session.execute(update(_table).where(
+            _table.c.id == upload_id, _table.c.status == 'running', _table.c.lease_until < datetime.utcnow())
+            .values(lease_until=datetime.utcnow() + LEASE))
+        db.session.commit()
+        if not claimed.rowcount:
+            # Another request took it over (or it finished) in the meantime
+            upload = db.session.get(ResumeUpload, upload_id)
+            return self.text(upload, max(0.0, deadline - time.monotonic())) if upload is not None else ''
+        self._count('inline')
+        data, content_type = db.session.execute(select(_table.c.file_data, _table.c.content_type)
+                                                .where(_table.c.id == upload_id)).one()
+        return self._extract(upload_id, data, content_type)
+
+    def settle(self, upload_id, timeout=WAIT_SECONDS):
+        """Wait up to `timeout` seconds for the upload's follow-up work in this process.
+
+        Returns False if it is still running by then. Follow-up errors are not raised here.
+        """
+        with self._lock:
+            future = self._follow_ups.get(upload_id)
+        if future is None:
+            return True
+        try:
+            future.result(timeout)
+        except FutureTimeoutError:
+            return False
+        except Exception:
+            pass
+        return True
+
+    def stats(self):
+        with self._lock:
+            used = self._counters['ready'] + self._counters['waited'] + self._counters['polled'] + \
+                self._counters['inline']
+            return {
+                'in_flight': len(self._futures),
+                **self._counters,
+                'ready_rate': round(self._counters['ready'] / used, 4) if used else 0.0,
+            }
+
+
+def purge_expired(batch_size=1000, now=None):
+    """Delete expired uploads, `batch_size` rows per transaction. Returns the number deleted."""
+    now = now or datetime.utcnow()
+    deleted = 0
+    while True:
+        ids = db.session.execute(select(_table.c.id).where(_table.c.expires_at < now)
+                                 .order_by(_table.c.expires_at).limit(batch_size)).scalars().all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(_table).where(_table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
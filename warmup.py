@@ -0,0 +1,86 @@
+"""Deferred loading of the heavy third-party modules.
+
+PyMuPDF, google.generativeai (grpc + protobuf) and Pillow dominate the import
+time of app.py, yet none of them is needed to answer /api/health. They are
+loaded on first use, or ahead of time by a background warm-up thread started
+once the app object exists, so a fresh Cloud Run instance can serve its first
+request while they are still loading.
+"""
+import importlib
+import os
+import threading
+import time
+
+import config
+
+_lock = threading.Lock()
+_modules = {}
+_genai_configured = False
+_warmup_thread = None
+
+# Seconds spent importing each deferred module, for the health endpoint and
+# benchmarks/cold_start.py.
+load_times = {}
+
+
+def _load(name):
+    module = _modules.get(name)
+    if module is not None:
+        return module
+
+    with _lock:
+        module = _modules.get(name)
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(name)
+            load_times[name] = round(time.perf_counter() - start, 4)
+            _modules[name] = module
+    return module
+
+
+def load_fitz():
+    return _load("fitz")
+
+
+def load_pil_image():
+    return _load("PIL.Image")
+
+
+def load_genai():
+    """Import google.generativeai and configure it with GEMINI_API_KEY once."""
+    global _genai_configured
+    genai = _load("google.generativeai")
+    if not _genai_configured:
+        with _lock:
+            if not _genai_configured:
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _genai_configured = True
+    return genai
+
+
+def _warm():
+    for loader in (load_genai, load_fitz, load_pil_image):
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Warm-up failed for {loader.__name__}: {e}")
+
+
+def start_background_warmup():
+    """Start importing the heavy modules in a daemon thread (idempotent).
+
+    Disabled with WARMUP_ON_START=0, e.g. for CLI commands that never call
+    Gemini.
+    """
+    global _warmup_thread
+    if not config.env_flag("WARMUP_ON_START", True):
+        return None
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warm, name="warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def is_warm():
+    return all(name in _modules for name in ("google.generativeai", "fitz", "PIL.Image"))